@@ -6,17 +6,47 @@ Analyzes scanned codes and provides intelligent information about what they cont
 
 from fastapi import FastAPI
 from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
-import re
+import asyncio
 from urllib.parse import urlparse
+import time
 import uvicorn
+from barcode_schema import barcode_db_path
+from gs1_parser import describe_gs1
+from label_payloads import LabelResolver, describe_label
+from scan_classification import classify
+from service_metrics import MetricsRegistry, instrument_fastapi, set_branch
+from blocking_detector import BlockingCallDetector, install_blocking_detector
+from service_logging import configure_logging, shutdown_logging
+from url_fetcher import URLFetcher, FetchError
+from url_metadata_cache import URLMetadataCache
+
+configure_logging("barcode_analyzer")
 
 app = FastAPI(title="Barcode Analyzer", description="Analyzes barcodes and QR codes")
 
+# Request, branch, URL fetch and event-loop metrics at GET /metrics
+metrics = MetricsRegistry()
+instrument_fastapi(app, metrics)
+upstream_duration = metrics.histogram("upstream_duration_seconds", "URL metadata fetch latency by outcome",
+                                      ("provider", "outcome"))
+
+# Event-loop stall sampling; slowest blocking sites at GET /debug/blocking
+blocking_detector = install_blocking_detector(app, BlockingCallDetector.from_env(), metrics)
+
+# Pooled, bounded, time-budgeted page fetches for QR links
+url_fetcher = URLFetcher.from_env()
+metrics.collector(url_fetcher.metrics)
+
+# Analyzed links with their validators (revalidated after URL_CACHE_TTL_S) and cached fetch failures
+url_cache = URLMetadataCache.from_env()
+metrics.collector(url_cache.metrics)
+
 class ScanRequest(BaseModel):
     scanned_value: str
 
+# Our own generated labels resolve from the local barcode database (the same file server.py reads)
+label_resolver = LabelResolver(barcode_db_path())
+
 def auto_analyze_url(url: str):
     """Generic analyzer for any domain/URL"""
     parsed = urlparse(url)
@@ -48,6 +78,16 @@ def auto_analyze_url(url: str):
 
     return title, category, description
 
+def url_result(code: str, title: str, category: str, description: str, confidence: str):
+    return {
+        "scanned_code": code,
+        "title": title,
+        "category": category,
+        "description": description,
+        "type": "qr_code",
+        "confidence": confidence
+    }
+
 @app.post("/scan")
 async def scan_code(data: ScanRequest):
     """Handle ESP32 scan data - same as analyze but with different endpoint"""
@@ -65,10 +105,12 @@ async def scan_code_get(scanned_value: str = ""):
 @app.post("/analyze")
 async def analyze_code(data: ScanRequest):
     """Analyze a scanned barcode or QR code"""
-    code = data.scanned_value.strip()
+    scan = classify(data.scanned_value)
+    code = scan.code
 
     # Case 1: Barcode (numeric only)
-    if re.fullmatch(r"\d+", code):
+    if scan.kind in ("gtin", "numeric"):
+        set_branch("numeric")
         return {
             "scanned_code": code,
             "title": "Numeric Barcode",
@@ -79,52 +121,95 @@ async def analyze_code(data: ScanRequest):
         }
 
     # Case 2: QR Code (URL)
-    elif code.startswith("http://") or code.startswith("https://"):
+    elif scan.kind == "url":
+        set_branch("url")
+        url = scan.url
+        state, entry = await asyncio.to_thread(url_cache.lookup, url)
+        if state in ("fresh", "stale_failed"):
+            # stale_failed: revalidation failed recently; keep serving the stale analysis without fetching
+            return url_result(code, entry["title"], entry["category"], entry["description"], "high")
+        if state == "failed":
+            # Host unreachable (or page erroring) recently; don't spend the fetch budget again
+            title, category, description = auto_analyze_url(url)
+            return url_result(code, title, category, description, "medium")
+
+        started = time.perf_counter()
         try:
-            response = requests.get(code, timeout=8, headers={"User-Agent": "Mozilla/5.0"})
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Try to get title & description
-            title = soup.title.string.strip() if soup.title and soup.title.string else None
-            description = None
-
-            meta = soup.find("meta", attrs={"name": "description"})
-            if meta and meta.get("content"):
-                description = meta["content"].strip()
-            elif soup.find("p"):
-                description = soup.find("p").get_text().strip()
-
+            # Title, meta description or first paragraph, read from the page head as it streams in
+            try:
+                page = await url_fetcher.fetch_metadata(
+                    url,
+                    etag=entry["etag"] if entry else None,
+                    last_modified=entry["last_modified"] if entry else None,
+                )
+            except FetchError as e:
+                upstream_duration.observe(time.perf_counter() - started, "url_fetch", e.outcome)
+                await asyncio.to_thread(url_cache.record_failure, url, e.outcome)
+                raise
+            upstream_duration.observe(time.perf_counter() - started, "url_fetch",
+                                      "not_modified" if page["not_modified"] else "ok")
+
+            if page["not_modified"] and entry is not None:
+                await asyncio.to_thread(url_cache.mark_revalidated, entry, page)
+                return url_result(code, entry["title"], entry["category"], entry["description"], "high")
+
+            title, description = page["title"], page["description"]
             # If missing → auto analyze
             if not title or not description:
-                title, category, description = auto_analyze_url(code)
+                title, category, description = auto_analyze_url(url)
             else:
                 category = "Website (QR Code)"
+            title = title if title else "Unknown Website"
+            description = description if description else "No description available."
 
-            return {
-                "scanned_code": code,
-                "title": title if title else "Unknown Website",
-                "category": category,
-                "description": description if description else "No description available.",
-                "type": "qr_code",
-                "confidence": "high"
-            }
+            await asyncio.to_thread(url_cache.store, url, title, category, description, page)
+            return url_result(code, title, category, description, "high")
 
         except Exception:
+            if entry is not None:
+                # Revalidation failed; the stale analysis beats guessing from the URL
+                return url_result(code, entry["title"], entry["category"], entry["description"], "high")
             # Total fallback → auto analyze
-            title, category, description = auto_analyze_url(code)
-            return {
-                "scanned_code": code,
-                "title": title,
-                "category": category,
-                "description": description,
-                "type": "qr_code",
-                "confidence": "medium"
-            }
-
-    # Case 3: Alphanumeric barcode (mixed characters)
-    elif re.match(r"^[A-Za-z0-9\-_]+$", code):
+            title, category, description = auto_analyze_url(url)
+            return url_result(code, title, category, description, "medium")
+
+    # Case 3: Robridge label (JSON QR structure or pipe-separated product data)
+    elif scan.kind == "label":
+        set_branch("label")
+        label = scan.label
+        try:
+            record = await asyncio.to_thread(label_resolver.resolve, code, label)
+        except Exception:
+            record = None
+        product = describe_label(label, record)
+        return {
+            "scanned_code": code,
+            "title": product["title"],
+            "category": product["category"],
+            "description": f"Robridge label for product {product['product_id']}"
+                           + (f", price {product['price']}" if product["price"] not in (None, "") else "")
+                           + f", location {product['location']}.",
+            "type": "robridge_label",
+            "confidence": "high" if product["in_database"] else "medium",
+            "product": product
+        }
+
+    # Case 4: GS1 element string (GS1-128 / DataMatrix / QR with application identifiers)
+    elif scan.kind == "gs1":
+        set_branch("gs1")
+        return {
+            "scanned_code": code,
+            "title": f"GS1 Product {scan.gtin}" if scan.gtin else "GS1 Logistics Label",
+            "category": "GS1 Barcode",
+            "description": f"GS1 element string: {describe_gs1(scan.gs1)}.",
+            "type": "gs1",
+            "confidence": "high",
+            "gs1": scan.gs1
+        }
+
+    # Case 5: Alphanumeric barcode (mixed characters)
+    elif scan.kind == "sku":
+        set_branch("alphanumeric")
         return {
             "scanned_code": code,
             "title": "Alphanumeric Code",
@@ -134,8 +219,9 @@ async def analyze_code(data: ScanRequest):
             "confidence": "medium"
         }
 
-    # Case 4: Other text
+    # Case 6: Other text
     else:
+        set_branch("unknown")
         return {
             "scanned_code": code,
             "title": "Unknown Format",
@@ -150,6 +236,16 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "barcode_analyzer"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """URL metadata cache hit ratio and bytes saved"""
+    return url_cache.stats()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await url_fetcher.close()
+    shutdown_logging()
+
 if __name__ == "__main__":
     print("Starting Barcode Analyzer Service...")
     print("Service will be available at: http://localhost:5001")
@@ -1,83 +1,85 @@
-import sqlite3
 import qrcode
 import barcode
 from barcode.writer import ImageWriter
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g, stream_with_context
 from flask_cors import CORS
 import os
 import json
+import time
 from datetime import datetime
 import io
+import logging
+import zlib
 from PIL import Image
+from barcode_schema import LIST_FIELDS, LIST_FILTERS, LOOKUP_BARCODE_SQL, build_list_query, migrate
+from catalog_package import CatalogPackager
+from gs1_parser import lookup_gtin, parse_gs1
+from id_generator import new_id
+from label_payloads import parse_pipe_payload
+from traffic_capture import TrafficCapture
+from service_logging import configure_logging, get_logger
+from sqlite_pool import SQLitePool
+
+configure_logging('barcode_service')
+log = get_logger('barcode')
+http_log = get_logger('http')
 
 app = Flask(__name__)
 CORS(app)
 
+# Opt-in request capture for replay_traffic.py (enabled by TRAFFIC_CAPTURE_DIR)
+traffic_capture = TrafficCapture.from_env('barcode')
+traffic_capture.start()
+
+# Pooled, pre-tuned (WAL) connections; a request borrows one on first use and returns it at teardown
+db_pool = SQLitePool.from_env()
+
+def get_db():
+    """This request's database connection"""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+@app.before_request
+def start_capture_timer():
+    if traffic_capture.enabled:
+        g.capture_started_at = time.time()
+        g.capture_started = time.perf_counter()
+
+@app.after_request
+def capture_request(response):
+    if traffic_capture.enabled and 'capture_started' in g:
+        payload = request.get_json(silent=True) if request.method in ('POST', 'PUT') else None
+        traffic_capture.record(request.method, request.path, request.query_string.decode('utf-8', 'replace'),
+                               payload, response.status_code,
+                               (time.perf_counter() - g.capture_started) * 1000, g.capture_started_at)
+    return response
+
 # Database setup
 def init_database():
-    """Initialize SQLite database with barcode and racks tables"""
-    conn = sqlite3.connect('barcodes.db')
-    cursor = conn.cursor()
-    
-    # Create barcodes table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS barcodes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            barcode_id TEXT UNIQUE NOT NULL,
-            barcode_data TEXT NOT NULL,
-            barcode_type TEXT NOT NULL,
-            source TEXT NOT NULL,
-            product_name TEXT,
-            product_id TEXT,
-            price REAL,
-            location_x REAL,
-            location_y REAL,
-            location_z REAL,
-            category TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            file_path TEXT,
-            metadata TEXT
-        )
-    ''')
-    
-    # Create racks table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS racks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rack_name TEXT UNIQUE NOT NULL,
-            product_name TEXT NOT NULL,
-            product_id TEXT NOT NULL,
-            quantity INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Add quantity column to existing racks table if it doesn't exist
+    """Bring barcodes.db up to the current schema version (tables, columns, indexes)"""
+    conn = db_pool.acquire()
     try:
-        cursor.execute('ALTER TABLE racks ADD COLUMN quantity INTEGER DEFAULT 0')
-        print("Added quantity column to existing racks table")
-    except sqlite3.OperationalError:
-        # Column already exists, ignore the error
-        pass
-    
-    conn.commit()
-    conn.close()
+        return migrate(conn)
+    finally:
+        db_pool.release(conn)
 
-def generate_barcode_id(barcode_type, product_id):
-    """Generate unique barcode ID"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join([str(ord(c) % 10) for c in product_id[:3]]) if product_id else '000'
-    return f"{barcode_type.upper()}_{timestamp}_{random_suffix}"
+def generate_barcode_id(barcode_type, uid):
+    """Barcode ID for a new row: its type and its sortable uid (id_generator)"""
+    return f"{barcode_type.upper()}_{uid}"
 
-def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path, metadata=None):
+def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path, metadata=None, uid=None):
     """Save barcode information to database"""
-    conn = sqlite3.connect('barcodes.db')
+    conn = get_db()
     cursor = conn.cursor()
     
-    # Debug logging
-    print(f"DEBUG: metadata type: {type(metadata)}")
-    print(f"DEBUG: metadata content: {metadata}")
+    log.debug("Saving %s with metadata %s", barcode_id, metadata)
     
     # Extract location and product info from metadata
     product_name = metadata.get('product_name') if metadata else None
@@ -90,9 +92,6 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
     location_y = None
     location_z = None
     
-    print(f"DEBUG: location_str type: {type(location_str)}")
-    print(f"DEBUG: location_str content: {location_str}")
-    
     if location_str:
         if isinstance(location_str, str):
             # Parse location string like "12.3,12,60" or "Warehouse A"
@@ -106,12 +105,12 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
                         location_y = float(coords[1].strip())
                     if len(coords) >= 3:
                         location_z = float(coords[2].strip())
-                    print(f"DEBUG: Parsed coordinates - x:{location_x}, y:{location_y}, z:{location_z}")
+                    log.debug("Parsed coordinates - x:%s, y:%s, z:%s", location_x, location_y, location_z)
                 else:
                     # It's a location name, not coordinates
-                    print(f"DEBUG: Location is a name: {location_str}")
+                    log.debug("Location is a name: %s", location_str)
             except (ValueError, IndexError) as e:
-                print(f"DEBUG: Error parsing location: {e}")
+                log.debug("Error parsing location %r: %s", location_str, e)
                 # Don't fail, just continue with None values
                 pass
         elif isinstance(location_str, dict):
@@ -119,36 +118,32 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
             location_x = location_str.get('x')
             location_y = location_str.get('y')
             location_z = location_str.get('z')
-            print(f"DEBUG: Location is a dict - x:{location_x}, y:{location_y}, z:{location_z}")
+            log.debug("Location is a dict - x:%s, y:%s, z:%s", location_x, location_y, location_z)
         else:
-            print(f"DEBUG: Unknown location type: {type(location_str)}")
+            log.warning("Unknown location type %s for %s", type(location_str).__name__, barcode_id)
     
     category = metadata.get('category') if metadata else None
     
     cursor.execute('''
         INSERT INTO barcodes (
             barcode_id, barcode_data, barcode_type, source, file_path, metadata,
-            product_name, product_id, price, location_x, location_y, location_z, category
+            product_name, product_id, price, location_x, location_y, location_z, category, uid
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (
         barcode_id, barcode_data, barcode_type, source, file_path, 
         json.dumps(metadata) if metadata else None,
-        product_name, product_id, price, location_x, location_y, location_z, category
+        product_name, product_id, price, location_x, location_y, location_z, category, uid or new_id()
     ))
     
     conn.commit()
-    conn.close()
 
 def generate_qr_code(data, filename):
     """Generate QR code"""
-    print(f"DEBUG: Generating QR code with data: '{data}'")
-    print(f"DEBUG: Data type: {type(data)}")
-    print(f"DEBUG: Data length: {len(data) if data else 0}")
-    print(f"DEBUG: Filename: {filename}")
+    log.debug("Generating QR code %s (%d chars)", filename, len(data) if data else 0)
     
     if not data or data.strip() == '':
-        print("ERROR: Empty data provided for QR code generation")
+        log.error("Empty data provided for QR code generation")
         raise ValueError("Empty data provided for QR code generation")
     
     try:
@@ -168,31 +163,26 @@ def generate_qr_code(data, filename):
         
         # Save the image
         full_path = f"{filename}.png"
-        print(f"DEBUG: Saving QR code to: {full_path}")
         img.save(full_path)
         
         # Verify the file was created
         if os.path.exists(full_path):
-            file_size = os.path.getsize(full_path)
-            print(f"DEBUG: QR code saved successfully. File size: {file_size} bytes")
+            log.debug("QR code saved to %s", full_path)
         else:
-            print(f"ERROR: File was not created: {full_path}")
+            log.error("File was not created: %s", full_path)
             raise FileNotFoundError(f"Failed to create file: {full_path}")
             
         return f"{filename}.png"
     except Exception as e:
-        print(f"ERROR: Failed to generate QR code: {e}")
+        log.error("Failed to generate QR code: %s", e)
         raise e
 
 def generate_1d_barcode(data, barcode_type, filename):
     """Generate 1D barcode (Code128, EAN13, etc.)"""
-    print(f"DEBUG: Generating 1D barcode with data: '{data}'")
-    print(f"DEBUG: Barcode type: {barcode_type}")
-    print(f"DEBUG: Data type: {type(data)}")
-    print(f"DEBUG: Data length: {len(data) if data else 0}")
+    log.debug("Generating %s barcode %s (%d chars)", barcode_type, filename, len(data) if data else 0)
     
     if not data or data.strip() == '':
-        print("ERROR: Empty data provided for 1D barcode generation")
+        log.error("Empty data provided for 1D barcode generation")
         raise ValueError("Empty data provided for 1D barcode generation")
     
     try:
@@ -200,18 +190,15 @@ def generate_1d_barcode(data, barcode_type, filename):
         barcode_instance = barcode_class(data, writer=ImageWriter())
         # The ImageWriter automatically adds .png extension
         barcode_instance.save(filename)
-        print(f"DEBUG: 1D barcode saved to: {filename}.png")
         # Return the filename with .png extension
         return f"{filename}.png"
     except Exception as e:
-        print(f"DEBUG: Error generating {barcode_type}: {e}")
         # Fallback to Code128 if the specified type fails
         if barcode_type != 'code128':
-            print(f"Warning: {barcode_type} failed, falling back to Code128")
+            log.warning("%s failed (%s), falling back to Code128", barcode_type, e)
             barcode_class = barcode.get_barcode_class('code128')
             barcode_instance = barcode_class(data, writer=ImageWriter())
             barcode_instance.save(filename)
-            print(f"DEBUG: Fallback Code128 barcode saved to: {filename}.png")
             return f"{filename}.png"
         else:
             raise e
@@ -221,17 +208,12 @@ def generate_barcode():
     """API endpoint to generate barcode"""
     try:
         data = request.get_json()
-        
-        # Debug logging
-        print("=" * 60)
-        print(f"DEBUG: Received barcode generation request")
-        print(f"DEBUG: Received data: {data}")
-        print(f"DEBUG: Data type: {type(data)}")
+        log.debug("Barcode generation request: %s", data)
         
         # Validate request data
         if not data:
             error_msg = 'No data received in request'
-            print(f"ERROR: {error_msg}")
+            log.warning(error_msg)
             return jsonify({'success': False, 'error': error_msg}), 400
         
         # Extract parameters
@@ -240,30 +222,20 @@ def generate_barcode():
         source = data.get('source', 'web')  # web, mobile
         metadata = data.get('metadata', {})
         
-        print(f"DEBUG: barcode_data: '{barcode_data}'")
-        print(f"DEBUG: barcode_type: '{barcode_type}'")
-        print(f"DEBUG: source: '{source}'")
-        print(f"DEBUG: metadata: {metadata}")
-        print(f"DEBUG: metadata type: {type(metadata)}")
-        
         if not barcode_data or barcode_data.strip() == '':
             error_msg = 'Barcode data is required and cannot be empty'
-            print(f"ERROR: {error_msg}")
+            log.warning(error_msg)
             return jsonify({'success': False, 'error': error_msg}), 400
         
         # Create barcodes directory if it doesn't exist
         os.makedirs('barcodes', exist_ok=True)
-        print(f"DEBUG: Created barcodes directory")
         
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"barcodes/{barcode_type}_{timestamp}"
-        print(f"DEBUG: Generated filename: {filename}")
+        # One uid names the image file and the row, so concurrent requests never overwrite each other's file
+        uid = new_id()
+        filename = f"barcodes/{barcode_type}_{uid}"
         
         # Generate barcode based on type
-        print(f"DEBUG: Starting barcode generation for type: {barcode_type}")
         if barcode_type.lower() == 'qr':
-            print(f"DEBUG: Calling generate_qr_code")
             # For QR codes, create comprehensive data structure with all metadata
             if metadata and len(metadata) > 0:
                 # Create a comprehensive data structure for QR codes
@@ -278,33 +250,25 @@ def generate_barcode():
                 }
                 # Convert to JSON string for QR code
                 qr_data_string = json.dumps(qr_data, indent=2)
-                print(f"DEBUG: QR code data structure: {qr_data_string}")
                 final_filename = generate_qr_code(qr_data_string, filename)
             else:
                 # Fallback to original data if no metadata
                 final_filename = generate_qr_code(barcode_data, filename)
-            print(f"DEBUG: QR code generation returned: {final_filename}")
         else:
-            print(f"DEBUG: Calling generate_1d_barcode")
             final_filename = generate_1d_barcode(barcode_data, barcode_type, filename)
-            print(f"DEBUG: 1D barcode generation returned: {final_filename}")
         
         # Verify file was created
         if not os.path.exists(final_filename):
-            print(f"ERROR: File was not created: {final_filename}")
+            log.error("File was not created: %s", final_filename)
             return jsonify({'error': f'Failed to create barcode file: {final_filename}'}), 500
         
-        print(f"DEBUG: File exists: {final_filename}")
-        
         # Generate unique barcode ID
-        product_id_from_metadata = metadata.get('product_id', 'UNKNOWN') if metadata else 'UNKNOWN'
-        barcode_id = generate_barcode_id(barcode_type, product_id_from_metadata)
-        print(f"DEBUG: Generated barcode ID: {barcode_id}")
+        barcode_id = generate_barcode_id(barcode_type, uid)
         
         # Save to database with the final filename (including .png extension)
-        print(f"DEBUG: Saving to database")
-        save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, final_filename, metadata)
-        print(f"DEBUG: Saved to database successfully")
+        save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, final_filename, metadata, uid)
+        log.info("Generated %s barcode %s", barcode_type, barcode_id,
+                 extra={'barcode_id': barcode_id, 'type': barcode_type, 'source': source})
         
         # Return just the filename without the path for the frontend
         filename_only = os.path.basename(final_filename)
@@ -318,86 +282,133 @@ def generate_barcode():
             'type': barcode_type,
             'source': source
         }
-        print(f"DEBUG: Returning success response: {response_data}")
-        print("=" * 60)
         return jsonify(response_data)
         
     except Exception as e:
         error_msg = str(e)
-        print(f"ERROR: Exception in generate_barcode: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        print("=" * 60)
+        log.error("Exception in generate_barcode: %s", error_msg, exc_info=True)
         return jsonify({'success': False, 'error': error_msg}), 500
 
 @app.route('/get_barcode/<filename>')
 def get_barcode(filename):
     """Serve generated barcode image"""
     try:
-        print(f"DEBUG: Requesting barcode file: {filename}")
-        
         # Handle both full path and just filename
         if filename.startswith('barcodes/'):
             file_path = filename
         else:
             file_path = os.path.join('barcodes', filename)
             
-        print(f"DEBUG: Full file path: {file_path}")
-        print(f"DEBUG: File exists: {os.path.exists(file_path)}")
-        
         if os.path.exists(file_path):
-            print(f"DEBUG: Serving file: {file_path}")
+            http_log.debug("Serving file: %s", file_path)
             return send_file(file_path, mimetype='image/png')
         else:
-            print(f"DEBUG: File not found: {file_path}")
-            # List files in barcodes directory for debugging
-            if os.path.exists('barcodes'):
-                files = os.listdir('barcodes')
-                print(f"DEBUG: Files in barcodes directory: {files}")
-            else:
-                print(f"DEBUG: barcodes directory does not exist")
+            http_log.info("Barcode file not found: %s", file_path)
+            # Listing the directory is only worth it when someone is debugging
+            if http_log.isEnabledFor(logging.DEBUG):
+                http_log.debug("Files in barcodes directory: %s",
+                               os.listdir('barcodes') if os.path.exists('barcodes') else None)
             return jsonify({'error': 'Barcode not found'}), 404
     except Exception as e:
-        print(f"DEBUG: Error serving file: {e}")
+        http_log.error("Error serving file %s: %s", filename, e)
         return jsonify({'error': str(e)}), 500
 
+LIST_MAX_LIMIT = 1000
+LIST_BATCH_ROWS = 200
+
+def stream_barcodes(rows, fields, limit, ndjson):
+    """
+    Yield the listing in chunks as rows come off the cursor, so memory stays
+    flat however many rows match. JSON: {"barcodes": [...], "next_cursor": ...};
+    NDJSON: one barcode per line, then a final {"next_cursor": ...} line
+    (null on the last page).
+
+    The 200 status is sent before the first row is read, so a database error
+    mid-listing can only be logged and the body cut short. Clients detect that
+    by the missing next_cursor key: the JSON document never closes and the
+    NDJSON stream has no trailing next_cursor line.
+    """
+    if not ndjson:
+        yield '{"barcodes":['
+    wants_metadata = 'metadata' in fields
+    count, last = 0, None
+    try:
+        while True:
+            batch = rows.fetchmany(LIST_BATCH_ROWS)
+            if not batch:
+                break
+            items = []
+            for row in batch:
+                item = dict(zip(fields, row))
+                if wants_metadata and item['metadata']:
+                    item['metadata'] = json.loads(item['metadata'])
+                items.append(json.dumps(item, separators=(',', ':')))
+            last = batch[-1][-1]
+            if ndjson:
+                yield '\n'.join(items) + '\n'
+            else:
+                yield (',' if count else '') + ','.join(items)
+            count += len(batch)
+    except Exception:
+        log.exception("Barcode listing failed after %d rows; response truncated", count)
+        return
+    next_cursor = last if limit and count == limit else None
+    if ndjson:
+        yield json.dumps({'next_cursor': next_cursor}) + '\n'
+    else:
+        yield '],"next_cursor":' + json.dumps(next_cursor) + '}'
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        # Flush per chunk so the client can start parsing before the listing ends
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
 @app.route('/list_barcodes')
 def list_barcodes():
-    """List all generated barcodes"""
+    """
+    List barcodes, newest first, streamed.
+
+    Query parameters (all optional; without limit every matching row is streamed):
+        limit       page size, at most LIST_MAX_LIMIT
+        cursor      next_cursor from the previous page
+        fields      comma-separated projection, e.g. barcode_id,data,created_at
+        source, category, type, product_id   exact-match filters
+        since, until                         creation time range (ISO timestamps, UTC unless offset given)
+        format      json (default) or ndjson
+    Responses are gzip-compressed when the client accepts it. A body without
+    next_cursor was cut short by a server error (see stream_barcodes).
+    """
     try:
-        conn = sqlite3.connect('barcodes.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, barcode_id, barcode_data, barcode_type, source, created_at, file_path, metadata,
-                   product_name, product_id, price, location_x, location_y, location_z, category
-            FROM barcodes
-            ORDER BY created_at DESC
-        ''')
-        
-        barcodes = []
-        for row in cursor.fetchall():
-            barcodes.append({
-                'id': row[0],
-                'barcode_id': row[1],
-                'data': row[2],
-                'type': row[3],
-                'source': row[4],
-                'created_at': row[5],
-                'file_path': row[6],
-                'metadata': json.loads(row[7]) if row[7] else None,
-                'product_name': row[8],
-                'product_id': row[9],
-                'price': row[10],
-                'location_x': row[11],
-                'location_y': row[12],
-                'location_z': row[13],
-                'category': row[14]
-            })
-        
-        conn.close()
-        return jsonify({'barcodes': barcodes})
-        
+        args = request.args
+        fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()] or list(LIST_FIELDS)
+        unknown = [field for field in fields if field not in LIST_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        limit = args.get('limit', type=int)
+        if limit is not None and not 1 <= limit <= LIST_MAX_LIMIT:
+            return jsonify({'error': f'limit must be between 1 and {LIST_MAX_LIMIT}'}), 400
+        filters = {name: args[name] for name in LIST_FILTERS if args.get(name)}
+        ndjson = args.get('format') == 'ndjson'
+        
+        sql, params = build_list_query(fields, filters, since=args.get('since'), until=args.get('until'),
+                                       cursor=args.get('cursor'), limit=limit)
+        # Executed here so query errors still get a proper status before streaming starts
+        rows = get_db().execute(sql, params)
+        chunks = stream_barcodes(rows, fields, limit, ndjson)
+        headers = {'Vary': 'Accept-Encoding'}
+        if request.accept_encodings['gzip']:
+            chunks = gzip_stream(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -405,7 +416,7 @@ def list_barcodes():
 def get_barcode_by_id(barcode_id):
     """Get barcode details by barcode ID"""
     try:
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -416,7 +427,6 @@ def get_barcode_by_id(barcode_id):
         ''', (barcode_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             barcode = {
@@ -447,9 +457,9 @@ def get_barcode_by_id(barcode_id):
 def get_barcode_data(barcode_id):
     """Get structured barcode data by ID"""
     try:
-        print(f"DEBUG: Requesting barcode data for ID: {barcode_id}")
+        http_log.debug("Requesting barcode data for ID: %s", barcode_id)
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -459,7 +469,6 @@ def get_barcode_data(barcode_id):
         ''', (barcode_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             barcode_data, barcode_type, metadata, created_at, source = result
@@ -476,7 +485,7 @@ def get_barcode_data(barcode_id):
             return jsonify({'error': 'Barcode not found'}), 404
             
     except Exception as e:
-        print(f"ERROR: Exception in get_barcode_data: {e}")
+        log.error("Exception in get_barcode_data: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Rack Management API Endpoints
@@ -484,7 +493,7 @@ def get_barcode_data(barcode_id):
 def get_racks():
     """Get all racks with optional search and filter"""
     try:
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get query parameters
@@ -524,7 +533,6 @@ def get_racks():
                 'updatedAt': row[6]
             })
         
-        conn.close()
         return jsonify({'success': True, 'racks': racks})
         
     except Exception as e:
@@ -540,13 +548,12 @@ def create_rack():
         if not data.get('rackName') or not data.get('productName') or not data.get('productId'):
             return jsonify({'success': False, 'error': 'Rack name, product name, and product ID are required'}), 400
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if rack name already exists
         cursor.execute('SELECT id FROM racks WHERE rack_name = ?', (data['rackName'],))
         if cursor.fetchone():
-            conn.close()
             return jsonify({'success': False, 'error': 'Rack name already exists'}), 400
         
         # Insert new rack
@@ -562,7 +569,6 @@ def create_rack():
         
         rack_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -589,19 +595,17 @@ def update_rack(rack_id):
         if not data.get('rackName') or not data.get('productName') or not data.get('productId'):
             return jsonify({'success': False, 'error': 'Rack name, product name, and product ID are required'}), 400
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if rack exists
         cursor.execute('SELECT id FROM racks WHERE id = ?', (rack_id,))
         if not cursor.fetchone():
-            conn.close()
             return jsonify({'success': False, 'error': 'Rack not found'}), 404
         
         # Check if rack name already exists (excluding current rack)
         cursor.execute('SELECT id FROM racks WHERE rack_name = ? AND id != ?', (data['rackName'], rack_id))
         if cursor.fetchone():
-            conn.close()
             return jsonify({'success': False, 'error': 'Rack name already exists'}), 400
         
         # Update rack
@@ -618,7 +622,6 @@ def update_rack(rack_id):
         ))
         
         conn.commit()
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -639,19 +642,17 @@ def update_rack(rack_id):
 def delete_rack(rack_id):
     """Delete a rack"""
     try:
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if rack exists
         cursor.execute('SELECT id FROM racks WHERE id = ?', (rack_id,))
         if not cursor.fetchone():
-            conn.close()
             return jsonify({'success': False, 'error': 'Rack not found'}), 404
         
         # Delete rack
         cursor.execute('DELETE FROM racks WHERE id = ?', (rack_id,))
         conn.commit()
-        conn.close()
         
         return jsonify({'success': True, 'message': 'Rack deleted successfully'})
         
@@ -662,7 +663,7 @@ def delete_rack(rack_id):
 def get_rack_stats():
     """Get rack statistics"""
     try:
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get total racks
@@ -681,7 +682,6 @@ def get_rack_stats():
         cursor.execute('SELECT COUNT(DISTINCT product_id) FROM racks')
         unique_products = cursor.fetchone()[0]
         
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -705,7 +705,7 @@ def search_racks():
         if not query:
             return jsonify({'success': False, 'error': 'Search query is required'}), 400
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Search by rack ID (exact match) or rack name (partial match)
@@ -734,7 +734,6 @@ def search_racks():
                 'updatedAt': row[6]
             })
         
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -750,7 +749,7 @@ def search_racks():
 def get_rack_status():
     """Get rack status for operational monitoring"""
     try:
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get all racks with their operational status
@@ -807,7 +806,6 @@ def get_rack_status():
             }
             racks.append(rack_data)
         
-        conn.close()
         
         # Calculate statistics
         total_racks = len(racks)
@@ -845,7 +843,7 @@ def update_rack_quantity(rack_id):
         if quantity_change <= 0:
             return jsonify({'success': False, 'error': 'Quantity must be positive'}), 400
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get current rack quantity
@@ -853,7 +851,6 @@ def update_rack_quantity(rack_id):
         result = cursor.fetchone()
         
         if not result:
-            conn.close()
             return jsonify({'success': False, 'error': 'Rack not found'}), 404
         
         current_quantity = result[0]
@@ -872,7 +869,6 @@ def update_rack_quantity(rack_id):
         ''', (new_quantity, rack_id))
         
         conn.commit()
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -902,28 +898,7 @@ def init_database_endpoint():
 
 def parse_structured_barcode(barcode_data):
     """Parse pipe-separated barcode data into structured format"""
-    if '|' not in barcode_data:
-        return None
-    
-    parts = barcode_data.split('|')
-    if len(parts) < 4:
-        return None
-    
-    try:
-        # Common format: product_id|product_name|category|price|location_x|location_y|location_z|type
-        parsed = {
-            'product_id': parts[0].strip(),
-            'product_name': parts[1].strip(),
-            'category': parts[2].strip(),
-            'price': float(parts[3].strip()) if parts[3].strip().replace('.', '').isdigit() else 0.0,
-            'location_x': float(parts[4].strip()) if len(parts) > 4 and parts[4].strip().replace('.', '').isdigit() else 0.0,
-            'location_y': float(parts[5].strip()) if len(parts) > 5 and parts[5].strip().replace('.', '').isdigit() else 0.0,
-            'location_z': float(parts[6].strip()) if len(parts) > 6 and parts[6].strip().replace('.', '').isdigit() else 0.0,
-            'barcode_type': parts[7].strip() if len(parts) > 7 else 'UNKNOWN'
-        }
-        return parsed
-    except (ValueError, IndexError):
-        return None
+    return parse_pipe_payload(barcode_data)
 
 @app.route('/api/lookup_barcode', methods=['POST'])
 def lookup_barcode():
@@ -938,22 +913,18 @@ def lookup_barcode():
                 'error': 'Barcode is required'
             }), 400
         
-        # First, try to parse structured data
+        # First, try to parse structured data (our pipe format, then GS1 element strings)
         parsed_data = parse_structured_barcode(barcode)
+        gs1 = parse_gs1(barcode) if parsed_data is None else None
+        gtin = gs1.get('gtin') if gs1 else None
+        # A GS1 label matches its product by GTIN, whatever batch/expiry it carries
+        codes = (barcode, gtin, lookup_gtin(gtin)) if gtin else (barcode, barcode, barcode)
         
-        conn = sqlite3.connect('barcodes.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Look up barcode in database
-        cursor.execute('''
-            SELECT barcode_id, barcode_data, barcode_type, product_name, 
-                   product_id, price, location_x, location_y, location_z, 
-                   category, created_at, metadata
-            FROM barcodes 
-            WHERE barcode_data = ? OR barcode_id = ?
-            ORDER BY created_at DESC
-            LIMIT 1
-        ''', (barcode, barcode))
+        cursor.execute(LOOKUP_BARCODE_SQL, (*codes, barcode))
         
         result = cursor.fetchone()
         
@@ -971,13 +942,18 @@ def lookup_barcode():
                 'status': 'Active',
                 'barcodeData': result[1],
                 'barcodeType': result[2],
-                'productId': result[4]
+                'productId': result[4],
+                'gs1': gs1
             })
         else:
             # Barcode not found - create new entry automatically
             try:
+                # GS1 labels are stored under their product's GTIN, not the per-batch element string
+                stored_barcode = lookup_gtin(gtin) if gtin else barcode
+                
                 # Generate a unique barcode ID
-                barcode_id = f"NEW_{barcode}_{int(datetime.now().timestamp())}"
+                uid = new_id()
+                barcode_id = f"NEW_{stored_barcode}_{uid}"
                 
                 # Use parsed data if available, otherwise use defaults
                 if parsed_data:
@@ -991,6 +967,17 @@ def lookup_barcode():
                     product_id = parsed_data['product_id']
                     status = 'Active'  # Structured data is considered valid
                     needs_review = False
+                elif gs1:
+                    product_name = f'New Product {stored_barcode}'
+                    category = 'Unknown'
+                    price = 0.00
+                    location_x = 0.0
+                    location_y = 0.0
+                    location_z = 0.0
+                    barcode_type = 'GS1'
+                    product_id = gtin or barcode
+                    status = 'Needs Review'
+                    needs_review = True
                 else:
                     product_name = f'New Product {barcode}'
                     category = 'Unknown'
@@ -1008,11 +995,11 @@ def lookup_barcode():
                     INSERT INTO barcodes (
                         barcode_id, barcode_data, barcode_type, source,
                         product_name, product_id, price, location_x, location_y, location_z,
-                        category, created_at, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        category, created_at, metadata, uid
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     barcode_id,
-                    barcode,
+                    stored_barcode,
                     barcode_type,
                     'esp32_scan',
                     product_name,
@@ -1027,12 +1014,13 @@ def lookup_barcode():
                         'auto_created': True,
                         'created_by': 'esp32_scanner',
                         'needs_review': needs_review,
-                        'structured_data': parsed_data is not None
-                    })
+                        'structured_data': parsed_data is not None,
+                        'gs1': gs1['elements'] if gs1 else None
+                    }),
+                    uid
                 ))
                 
                 conn.commit()
-                conn.close()
                 
                 # Return the newly created product information
                 return jsonify({
@@ -1046,15 +1034,15 @@ def lookup_barcode():
                     'location': f'X:{location_x}, Y:{location_y}, Z:{location_z}' if location_x != 0 or location_y != 0 or location_z != 0 else 'Unknown',
                     'lastUpdated': datetime.now().isoformat(),
                     'status': status,
-                    'barcodeData': barcode,
+                    'barcodeData': stored_barcode,
                     'barcodeType': barcode_type,
                     'productId': product_id,
                     'message': 'New product created automatically' + (' (from structured data)' if parsed_data else ''),
-                    'structured': parsed_data is not None
+                    'structured': parsed_data is not None,
+                    'gs1': gs1
                 })
                 
             except Exception as create_error:
-                conn.close()
                 return jsonify({
                     'success': True,
                     'found': False,
@@ -1068,6 +1056,47 @@ def lookup_barcode():
             'error': str(e)
         }), 500
 
+# Offline Catalog Package Endpoints (ESP32 local lookups)
+catalog_packager = CatalogPackager.from_env(db_pool.db_path)
+
+@app.route('/api/catalog/version', methods=['GET'])
+def get_catalog_version():
+    """Get the latest offline catalog package version"""
+    try:
+        latest = catalog_packager.refresh()
+        return jsonify({'success': True, 'catalog': latest})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/catalog/package', methods=['GET'])
+def get_catalog_package():
+    """Download the offline catalog package, or a binary delta from ?since=<version>"""
+    try:
+        latest = catalog_packager.refresh()
+        version = latest['version']
+        since = request.args.get('since', type=int)
+        
+        # Device is already up to date
+        if since == version:
+            return Response(status=204, headers={'X-Catalog-Version': str(version)})
+        
+        package = catalog_packager.package(version)
+        data, kind = package, 'full'
+        if since:
+            delta = catalog_packager.delta(since, version)
+            # Fall back to the full package when the old version is gone or the delta isn't smaller
+            if delta is not None and len(delta) < len(package):
+                data, kind = delta, 'delta'
+        
+        return Response(data, mimetype='application/octet-stream', headers={
+            'X-Catalog-Version': str(version),
+            'X-Catalog-Kind': kind,
+            'X-Catalog-Records': str(latest['records'])
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -1077,12 +1106,11 @@ def health_check():
 def test_generate():
     """Test endpoint to verify barcode generation works"""
     try:
-        print("=" * 60)
-        print("TEST: Running test barcode generation")
+        log.info("Running test barcode generation")
         
         # Create test data
         test_data = "TEST_" + datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"barcodes/qr_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        filename = f"barcodes/qr_test_{new_id()}"
         
         # Generate QR code
         qr = qrcode.QRCode(
@@ -1106,11 +1134,7 @@ def test_generate():
         file_exists = os.path.exists(full_path)
         file_size = os.path.getsize(full_path) if file_exists else 0
         
-        print(f"TEST: Generated test barcode successfully")
-        print(f"TEST: File: {full_path}")
-        print(f"TEST: Exists: {file_exists}")
-        print(f"TEST: Size: {file_size} bytes")
-        print("=" * 60)
+        log.info("Test barcode %s generated (exists: %s, %d bytes)", full_path, file_exists, file_size)
         
         return jsonify({
             'success': True,
@@ -1121,10 +1145,7 @@ def test_generate():
             'test_data': test_data
         })
     except Exception as e:
-        print(f"TEST ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        print("=" * 60)
+        log.error("Test barcode generation failed: %s", e, exc_info=True)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1147,6 +1168,7 @@ if __name__ == '__main__':
     print("- GET /api/racks - Rack management endpoints")
     print("- GET /api/racks/stats - Rack statistics")
     print("- GET /api/racks/search - Search racks")
+    print("- GET /api/catalog/package - Offline catalog package (?since=<version> for delta)")
     print("- GET /health - Health check")
     
     # Render-compatible port configuration
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Robridge Barcode Database Schema
+Versioned migrations for barcodes.db, plus the hot queries whose plans the
+indexes exist for (the ESP32 lookup and the keyset-paginated listing).
+
+The schema version lives in PRAGMA user_version. migrate() applies every
+migration above it in order, each in its own BEGIN IMMEDIATE transaction
+together with the version bump, so a failed migration leaves the database at
+the previous version and two processes starting at once cannot both apply
+the same step. A database at the current version costs one PRAGMA read on
+startup.
+
+Add new schema changes by appending to MIGRATIONS; never edit one that has
+shipped.
+"""
+
+import os
+from datetime import datetime, timezone
+
+from id_generator import CROCKFORD, floor_id, is_sortable_id
+from service_logging import get_logger
+
+log = get_logger('db')
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def barcode_db_path():
+    """barcodes.db location: BARCODE_DB_PATH, else next to this code rather than in the working directory"""
+    return os.getenv('BARCODE_DB_PATH') or os.path.join(SERVICE_DIR, 'barcodes.db')
+
+
+def _create_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS barcodes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            barcode_id TEXT UNIQUE NOT NULL,
+            barcode_data TEXT NOT NULL,
+            barcode_type TEXT NOT NULL,
+            source TEXT NOT NULL,
+            product_name TEXT,
+            product_id TEXT,
+            price REAL,
+            location_x REAL,
+            location_y REAL,
+            location_z REAL,
+            category TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_path TEXT,
+            metadata TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS racks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rack_name TEXT UNIQUE NOT NULL,
+            product_name TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            quantity INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _add_rack_quantity(conn):
+    # Racks tables created before quantity tracking
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(racks)')}
+    if 'quantity' not in columns:
+        conn.execute('ALTER TABLE racks ADD COLUMN quantity INTEGER DEFAULT 0')
+        log.info("Added quantity column to existing racks table")
+
+
+def _add_indexes(conn):
+    # barcode_data and product_id lookups want the newest row, so created_at rides along in the index
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_barcodes_barcode_data ON barcodes (barcode_data, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_barcodes_product_id ON barcodes (product_id, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_barcodes_created_at ON barcodes (created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_barcodes_source ON barcodes (source)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_barcodes_category ON barcodes (category)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_racks_product_id ON racks (product_id)')
+    conn.execute('ANALYZE')
+
+
+def _sql_sortable_id(created_at, row_id):
+    """
+    SQL expression building an id_generator-format ID from a row's created_at
+    and rowid: the time as the 48-bit millisecond part, node 0, the rowid as
+    the sequence. Node 0 is never drawn by a live generator, so these cannot
+    collide with IDs the service issues, and they sort by created_at among them.
+    """
+    ms = f"CAST(round((julianday(COALESCE({created_at}, CURRENT_TIMESTAMP)) - 2440587.5) * 86400000) AS INTEGER)"
+    chars = [f"substr('{CROCKFORD}', (({ms} >> {shift}) & 31) + 1, 1)" for shift in range(45, -1, -5)]
+    chars += [f"substr('{CROCKFORD}', (({row_id} >> {shift}) & 31) + 1, 1)" for shift in range(75, -1, -5)]
+    return ' || '.join(chars)
+
+
+def _add_sortable_ids(conn):
+    # Every row gets a time-sortable uid (id_generator), the listing's one-column keyset.
+    # Rows written before, or by anything not passing one, get one derived from created_at.
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(barcodes)')}
+    if 'uid' not in columns:
+        conn.execute('ALTER TABLE barcodes ADD COLUMN uid TEXT')
+    conn.execute(f"UPDATE barcodes SET uid = {_sql_sortable_id('created_at', 'id')} WHERE uid IS NULL")
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_barcodes_uid ON barcodes (uid)')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS barcodes_default_uid AFTER INSERT ON barcodes
+        WHEN NEW.uid IS NULL
+        BEGIN
+            UPDATE barcodes SET uid = {_sql_sortable_id('NEW.created_at', 'NEW.id')} WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('ANALYZE')
+
+
+# Version N is reached by applying MIGRATIONS[N - 1]
+MIGRATIONS = [
+    _create_tables,
+    _add_rack_quantity,
+    _add_indexes,
+    _add_sortable_ids,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Newest row whose data or ID matches the scan. Written as one branch per index
+# so each is an index search whatever the table statistics say; the equivalent
+# "barcode_data IN (...) OR barcode_id = ?" leaves it to the planner, which with
+# ORDER BY created_at ... LIMIT 1 may walk the created_at index instead.
+# Parameters: three barcode_data candidates, then the barcode_id.
+LOOKUP_BARCODE_SQL = '''
+    SELECT barcode_id, barcode_data, barcode_type, product_name,
+           product_id, price, location_x, location_y, location_z,
+           category, created_at, metadata
+    FROM (
+        SELECT * FROM barcodes WHERE barcode_data IN (?, ?, ?)
+        UNION ALL
+        SELECT * FROM barcodes WHERE barcode_id = ?
+    )
+    ORDER BY created_at DESC
+    LIMIT 1
+'''
+
+# list_barcodes: output field -> column, and ?filter= parameter -> column
+LIST_FIELDS = {
+    'id': 'id', 'barcode_id': 'barcode_id', 'data': 'barcode_data', 'type': 'barcode_type',
+    'uid': 'uid', 'source': 'source', 'created_at': 'created_at', 'file_path': 'file_path', 'metadata': 'metadata',
+    'product_name': 'product_name', 'product_id': 'product_id', 'price': 'price',
+    'location_x': 'location_x', 'location_y': 'location_y', 'location_z': 'location_z', 'category': 'category',
+}
+LIST_FILTERS = {'source': 'source', 'category': 'category', 'type': 'barcode_type', 'product_id': 'product_id'}
+
+
+def _time_bound(value):
+    """uid lower bound for an ISO timestamp (UTC unless it carries an offset), or ValueError"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'invalid timestamp: {value!r}') from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return floor_id(int(moment.timestamp() * 1000))
+
+
+def build_list_query(fields, filters=None, since=None, until=None, cursor=None, limit=None):
+    """
+    Keyset-paginated list_barcodes query, newest first.
+
+    Selects the projected fields' columns followed by uid, the keyset: uids
+    sort by creation time, so the next page starts at uid < cursor and a
+    since/until window is a uid range too, both range searches on
+    idx_barcodes_uid instead of an OFFSET walk. The cursor is the last uid
+    of the previous page; anything else raises ValueError.
+    """
+    columns = [LIST_FIELDS[field] for field in fields] + ['uid']
+    conditions, params = [], []
+    for name, value in (filters or {}).items():
+        conditions.append(f'{LIST_FILTERS[name]} = ?')
+        params.append(value)
+    if since:
+        conditions.append('uid >= ?')
+        params.append(_time_bound(since))
+    if until:
+        conditions.append('uid < ?')
+        params.append(_time_bound(until))
+    if cursor:
+        if not is_sortable_id(cursor):
+            raise ValueError(f'invalid cursor: {cursor!r}')
+        conditions.append('uid < ?')
+        params.append(cursor)
+    sql = f"SELECT {', '.join(columns)} FROM barcodes"
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY uid DESC'
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the resulting schema version"""
+    version = schema_version(conn)
+    while version < SCHEMA_VERSION:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the write lock
+            version = schema_version(conn)
+            if version < SCHEMA_VERSION:
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        log.info("Database schema at version %d", version)
+    return version
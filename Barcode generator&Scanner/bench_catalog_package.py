@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline catalog package build time and size against catalog size
+Builds synthetic barcodes databases, cuts a package, changes ~1% of the
+catalog and measures the resulting delta, then renames products in place
+(no inserts) to check that updates alone still cut a new version.
+
+Usage: python bench_catalog_package.py [--sizes 1000,10000,100000] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from catalog_package import CatalogPackager, lookup
+
+CATEGORIES = ["Beverages", "Snacks", "Dairy", "Electronics", "Personal Care", "Household",
+              "Frozen Foods", "Bakery", "Stationery", "Toys", "Pet Supplies", "Hardware"]
+
+
+def create_database(db_path, size, rng):
+    """Create a barcodes table with `size` GTIN rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE barcodes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            barcode_id TEXT UNIQUE NOT NULL,
+            barcode_data TEXT NOT NULL,
+            barcode_type TEXT NOT NULL,
+            source TEXT NOT NULL,
+            product_name TEXT,
+            category TEXT
+        )
+    ''')
+    gtins = rng.sample(range(890000000000, 899999999999), size)
+    conn.executemany(
+        'INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, product_name, category) VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"EAN13_{i}", f"{gtin}0", "ean13", "bench", f"Product {i} {rng.choice(CATEGORIES)} Family Pack",
+          rng.choice(CATEGORIES)) for i, gtin in enumerate(gtins))
+    )
+    conn.commit()
+    return conn, [f"{gtin}0" for gtin in gtins]
+
+
+def rename_products(conn, gtins, rng, changes, suffix):
+    for gtin in rng.sample(gtins, changes):
+        conn.execute('UPDATE barcodes SET product_name = product_name || ? WHERE barcode_data = ?', (suffix, gtin))
+    conn.commit()
+
+
+def change_catalog(conn, gtins, rng, fraction=0.01):
+    """Rename ~fraction of the catalog and add as many new products"""
+    changes = max(1, int(len(gtins) * fraction))
+    rename_products(conn, gtins, rng, changes, " v2")
+    start = len(gtins)
+    conn.executemany(
+        'INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, product_name, category) VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"EAN13_{start + i}", f"{700000000000 + i}0", "ean13", "bench", f"New Product {i}", "New Arrivals")
+         for i in range(changes))
+    )
+    conn.commit()
+    return changes
+
+
+def bench_size(size, rng):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "barcodes.db")
+        conn, gtins = create_database(db_path, size, rng)
+        packager = CatalogPackager(db_path, os.path.join(temp_dir, "catalog_packages"))
+
+        started = time.perf_counter()
+        first = packager.refresh()
+        build_s = time.perf_counter() - started
+        package = packager.package(first["version"])
+
+        probes = [int(gtin) for gtin in rng.sample(gtins, min(1000, size))]
+        started = time.perf_counter()
+        for gtin in probes:
+            lookup(package, gtin)
+        lookup_us = (time.perf_counter() - started) / len(probes) * 1e6
+
+        changes = change_catalog(conn, gtins, rng)
+        second = packager.refresh()
+        started = time.perf_counter()
+        delta = packager.delta(first["version"], second["version"])
+        delta_s = time.perf_counter() - started
+
+        rename_products(conn, gtins, rng, changes, " v3")
+        conn.close()
+        third = packager.refresh()
+        if third["version"] != second["version"] + 1:
+            raise SystemExit("In-place renames did not cut a new package version")
+        update_delta = packager.delta(second["version"], third["version"])
+        packager.close()
+
+        return {
+            "records": first["records"],
+            "build_ms": round(build_s * 1000, 1),
+            "package_bytes": first["size"],
+            "bytes_per_record": round(first["size"] / first["records"], 2),
+            "lookup_us": round(lookup_us, 2),
+            "changed_records": changes * 2,
+            "delta_bytes": len(delta),
+            "delta_build_ms": round(delta_s * 1000, 1),
+            "delta_ratio": round(len(delta) / second["size"], 4),
+            "update_only_delta_bytes": len(update_delta),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline catalog packages")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated catalog sizes")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    print(f"{'Records':>10} {'Build ms':>10} {'Package KB':>11} {'B/rec':>7} {'Lookup us':>10} {'Delta KB':>9} {'Delta ms':>9}")
+    print("-" * 72)
+    for size in (int(value) for value in args.sizes.split(",")):
+        result = bench_size(size, rng)
+        results.append(result)
+        print(f"{result['records']:>10} {result['build_ms']:>10} {result['package_bytes'] / 1024:>11.1f} "
+              f"{result['bytes_per_record']:>7} {result['lookup_us']:>10} {result['delta_bytes'] / 1024:>9.1f} "
+              f"{result['delta_build_ms']:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
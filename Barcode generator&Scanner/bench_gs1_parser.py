@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark GS1 element string parsing throughput
+Generates realistic inbound label data (retail cases with batch and expiry,
+pharma DataMatrix packs with serials, variable-weight meat and SSCC pallet
+labels) in the encodings scanners actually send: symbology identifier plus
+GS separators, GS only, and the bracketed human-readable form. Reports
+gs1_parser.parse_gs1 parses per second per label type and per encoding, and
+the cost of classify() on the same strings.
+
+Usage: python bench_gs1_parser.py [--samples 20000] [--rounds 5] [--json results.json]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from gs1_parser import GS, check_digit_valid, parse_gs1
+from scan_classification import classify
+
+LABELS = ("retail_case", "pharma_pack", "variable_weight", "pallet")
+ENCODINGS = ("symbology", "gs_only", "bracketed")
+SYMBOLOGY = {"retail_case": "]C1", "pharma_pack": "]d2", "variable_weight": "]e0", "pallet": "]C1"}
+
+
+def with_check_digit(body):
+    return next(body + str(digit) for digit in range(10) if check_digit_valid(body + str(digit)))
+
+
+def gtin(rng, indicator="0"):
+    return with_check_digit(indicator + "".join(str(rng.randrange(10)) for _ in range(12)))
+
+
+def date(rng):
+    return f"{rng.randrange(24, 31):02d}{rng.randrange(1, 13):02d}{rng.choice([0, rng.randrange(1, 29)]):02d}"
+
+
+def alnum(rng, length):
+    return "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(length))
+
+
+def elements(label, rng):
+    """[(ai, value)] in the order they are printed on the label"""
+    if label == "retail_case":
+        return [("01", gtin(rng, "1")), ("17", date(rng)), ("10", alnum(rng, rng.randrange(4, 11)))]
+    if label == "pharma_pack":
+        return [("01", gtin(rng)), ("17", date(rng)), ("10", alnum(rng, 8)), ("21", alnum(rng, rng.randrange(10, 21)))]
+    if label == "variable_weight":
+        return [("01", gtin(rng, "9")), ("3103", f"{rng.randrange(250, 25000):06d}"), ("13", date(rng)),
+                ("10", alnum(rng, 6))]
+    return [("00", with_check_digit("0" + "".join(str(rng.randrange(10)) for _ in range(16)))),
+            ("02", gtin(rng)), ("37", str(rng.randrange(1, 500))), ("15", date(rng)), ("400", alnum(rng, 12))]
+
+
+def encode(label, pairs, encoding):
+    if encoding == "bracketed":
+        return "".join(f"({ai}){value}" for ai, value in pairs)
+    text = ""
+    for index, (ai, value) in enumerate(pairs):
+        text += ai + value
+        # Variable-length values are terminated by FNC1 unless they end the string
+        if index < len(pairs) - 1 and ai in ("10", "21", "37", "400"):
+            text += GS
+    return (SYMBOLOGY[label] if encoding == "symbology" else "") + text
+
+
+def throughput(function, codes, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for code in codes:
+            function(code)
+        best = min(best, time.perf_counter() - started)
+    return len(codes) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GS1 element string parsing throughput")
+    parser.add_argument("--samples", type=int, default=20000, help="Labels to generate")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    samples = []
+    for _ in range(args.samples):
+        label, encoding = rng.choice(LABELS), rng.choice(ENCODINGS)
+        pairs = elements(label, rng)
+        samples.append((label, encoding, pairs, encode(label, pairs, encoding)))
+    codes = [code for _, _, _, code in samples]
+
+    wrong = sum(1 for _, _, pairs, code in samples if (parse_gs1(code) or {}).get("elements") != dict(pairs))
+    print(f"🧪 {len(codes)} labels, {wrong} parsed incorrectly")
+
+    rate = throughput(parse_gs1, codes, args.rounds)
+    characters = sum(map(len, codes)) / len(codes)
+    results = {"samples": len(codes), "wrong": wrong, "parse_per_second": round(rate),
+               "mb_per_second": round(rate * characters / 1e6, 2), "per_label": {}, "per_encoding": {}}
+    print(f"⚡ parse_gs1: {rate:>12,.0f} labels/s ({results['mb_per_second']} MB/s)")
+
+    classify_rate = throughput(classify, codes, args.rounds)
+    results["classify_per_second"] = round(classify_rate)
+    print(f"⚡ classify:  {classify_rate:>12,.0f} labels/s")
+
+    for group, index in (("per_label", 0), ("per_encoding", 1)):
+        for name in (LABELS if index == 0 else ENCODINGS):
+            subset = [sample[3] for sample in samples if sample[index] == name]
+            if subset:
+                rate = throughput(parse_gs1, subset, args.rounds)
+                results[group][name] = round(rate)
+                print(f"   {name:>16}: {rate:>12,.0f}/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
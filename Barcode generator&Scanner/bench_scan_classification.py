@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark scan classification throughput
+Runs scan_classification.classify over a synthetic scan mix (GTINs, other
+numbers, URLs, our JSON and pipe labels, GS1 element strings, SKUs, free
+text) and reports classifications per second, per kind and overall, next to
+the regex chains the AI server and analyzer used before sharing it.
+
+Usage: python bench_scan_classification.py [--samples 20000] [--rounds 5] [--json results.json]
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from label_payloads import recognize_label_payload
+from scan_classification import classify
+
+MIX = {
+    "gtin": 0.40,
+    "numeric": 0.05,
+    "url": 0.25,
+    "label": 0.10,
+    "gs1": 0.05,
+    "sku": 0.10,
+    "text": 0.05,
+}
+
+
+def gtin(rng, length=13):
+    body = [rng.randrange(10) for _ in range(length - 1)]
+    total = sum(digit * (3 if position % 2 == 0 else 1) for position, digit in enumerate(reversed(body)))
+    return "".join(map(str, body)) + str((10 - total % 10) % 10)
+
+
+def sample(kind, rng):
+    if kind == "gtin":
+        return gtin(rng, rng.choice((8, 12, 13, 13, 13, 14)))
+    if kind == "numeric":
+        return str(rng.randrange(10 ** 5, 10 ** 7))
+    if kind == "url":
+        site = rng.choice(["example.com", "shop.robridgelabs.com", "instagram.com", "github.com", "youtu.be"])
+        return rng.choice(["https://", "http://", "www."]) + f"{site}/p/{rng.randrange(10 ** 6)}"
+    if kind == "label":
+        product_id = f"PRD{rng.randrange(10 ** 5):05d}"
+        if rng.random() < 0.5:
+            return json.dumps({"product_name": "Masala Chai", "product_id": product_id, "price": "120",
+                               "location": "A1", "category": "Beverages", "timestamp": "2025-10-01T10:00:00",
+                               "source": "web"}, indent=2)
+        return f"{product_id}|Masala Chai|Beverages|120|1.5|2|0.5|CODE128"
+    if kind == "gs1":
+        if rng.random() < 0.5:
+            return f"(01){gtin(rng, 14)}(17){rng.randrange(240101, 301231)}(10)B{rng.randrange(10 ** 4)}"
+        return f"]C101{gtin(rng, 14)}10LOT{rng.randrange(10 ** 3)}\x1d17{rng.randrange(240101, 301231)}"
+    if kind == "sku":
+        return f"SKU-{rng.randrange(10 ** 6)}_{rng.choice('ABCDEF')}"
+    return rng.choice(["Hello world!", "Wi-Fi: robridge / pass123", "Call me at +91 98765 43210"])
+
+
+def legacy_server(code):
+    """server.py before the shared module: numeric / url / label / unknown"""
+    if re.fullmatch(r"\d{8,14}", code):
+        return "numeric"
+    if code.startswith(("http://", "https://", "www.")):
+        return "url"
+    if recognize_label_payload(code) is not None:
+        return "label"
+    return "unknown"
+
+
+def legacy_analyzer(code):
+    """barcode_analyzer.py before the shared module"""
+    code = code.strip()
+    if re.fullmatch(r"\d+", code):
+        return "numeric"
+    if code.startswith("http://") or code.startswith("https://"):
+        return "url"
+    if recognize_label_payload(code) is not None:
+        return "label"
+    if re.match(r"^[A-Za-z0-9\-_]+$", code):
+        return "alphanumeric"
+    return "unknown"
+
+
+def throughput(function, codes, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for code in codes:
+            function(code)
+        best = min(best, time.perf_counter() - started)
+    return len(codes) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan classification throughput")
+    parser.add_argument("--samples", type=int, default=20000, help="Codes in the scan mix")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=args.samples)
+    codes = [sample(kind, rng) for kind in kinds]
+
+    mismatches = sum(1 for kind, code in zip(kinds, codes) if classify(code).kind != kind)
+    print(f"🧪 {len(codes)} codes, {mismatches} classified differently from how they were generated")
+
+    results = {"samples": len(codes), "mismatches": mismatches, "per_second": {}, "per_kind_per_second": {}}
+    for name, function in (("classify", classify), ("legacy_server", legacy_server), ("legacy_analyzer", legacy_analyzer)):
+        rate = throughput(function, codes, args.rounds)
+        results["per_second"][name] = round(rate)
+        print(f"⚡ {name:>16}: {rate:>12,.0f} classifications/s")
+
+    for kind in MIX:
+        subset = [code for code, code_kind in zip(codes, kinds) if code_kind == kind]
+        if subset:
+            rate = throughput(classify, subset, args.rounds)
+            results["per_kind_per_second"][kind] = round(rate)
+            print(f"   {kind:>8}: {rate:>12,.0f}/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Flask barcode service's database access under concurrent load
+Serves barcode_generator.app from Werkzeug's threaded server (the one
+app.run uses) and drives it with concurrent HTTP clients issuing an ESP32-like
+mix: barcode lookups, barcode detail reads, rack listings and rack quantity
+updates. Each mode runs against its own freshly seeded database:
+
+    connect_per_request  the old behaviour: sqlite3.connect per request, rollback journal
+    pool                 sqlite_pool.SQLitePool (WAL, synchronous=NORMAL, busy_timeout, mmap, cache)
+
+Reports requests per second, p50/p99 latency and failed requests (HTTP
+errors, mostly "database is locked" under the rollback journal).
+
+Usage: python bench_sqlite_pool.py [--rows 5000] [--requests 4000] [--concurrency 16] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+import barcode_generator
+from sqlite_pool import SQLitePool
+
+MIX = {"lookup": 0.70, "detail": 0.15, "racks": 0.10, "rack_update": 0.05}
+
+
+class ConnectPerRequest:
+    """Stand-in for the pool that behaves like the code before it: open, use, close"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def acquire(self):
+        return sqlite3.connect(self.db_path)
+
+    def release(self, conn):
+        conn.close()
+
+
+def seed(db_path, rows, racks):
+    barcode_generator.db_pool = ConnectPerRequest(db_path)
+    barcode_generator.init_database()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            'INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, product_name, product_id, '
+            'price, location_x, location_y, location_z, category, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((f'EAN13_BENCH_{n:07d}', f'890{n:010d}', 'EAN13', 'bench', f'Product {n}', f'PRD{n:06d}', 9.99,
+              n % 10, n % 7, n % 3, 'General', json.dumps({'seeded': True})) for n in range(rows)))
+        conn.executemany('INSERT INTO racks (rack_name, product_name, product_id, quantity) VALUES (?, ?, ?, ?)',
+                         ((f'RACK-{n}', f'Product {n}', f'PRD{n:06d}', 100) for n in range(racks)))
+    conn.close()
+
+
+def request(base, rng, rows, racks):
+    kind = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    if kind == "lookup":
+        body = {"barcode": f'890{rng.randrange(rows):010d}'}
+        req = urllib.request.Request(f"{base}/api/lookup_barcode", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    elif kind == "detail":
+        req = urllib.request.Request(f"{base}/get_barcode_by_id/EAN13_BENCH_{rng.randrange(rows):07d}")
+    elif kind == "racks":
+        req = urllib.request.Request(f"{base}/api/racks")
+    else:
+        body = {"quantity": 1, "type": rng.choice(["inbound", "outbound"])}
+        req = urllib.request.Request(f"{base}/api/racks/{rng.randrange(1, racks + 1)}/update-quantity",
+                                     data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.status
+
+
+def run(mode, db_path, args):
+    barcode_generator.db_pool = (SQLitePool(db_path, busy_timeout_ms=args.busy_timeout_ms) if mode == "pool"
+                                 else ConnectPerRequest(db_path))
+    server = make_server("127.0.0.1", 0, barcode_generator.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    latencies, failures = [], [0]
+    remaining = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                ok = request(base, rng, args.rows, args.racks) < 400
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                failures[0] += not ok
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(args.seed + n,)) for n in range(args.concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    if mode == "pool":
+        barcode_generator.db_pool.close()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failed": failures[0],
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-request SQLite connections")
+    parser.add_argument("--rows", type=int, default=5000, help="Seeded barcodes")
+    parser.add_argument("--racks", type=int, default=200, help="Seeded racks")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--busy-timeout-ms", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {"rows": args.rows, "requests": args.requests, "concurrency": args.concurrency, "modes": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in ("connect_per_request", "pool"):
+            db_path = os.path.join(workdir, f"{mode}.db")
+            seed(db_path, args.rows, args.racks)
+            result = run(mode, db_path, args)
+            results["modes"][mode] = result
+            print(f"⚡ {mode:>20}: {result['requests_per_second']:>8} req/s  p50 {result['p50_ms']} ms  "
+                  f"p99 {result['p99_ms']} ms  failed {result['failed']}")
+
+    before, after = results["modes"]["connect_per_request"], results["modes"]["pool"]
+    print(f"📈 throughput x{after['requests_per_second'] / before['requests_per_second']:.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Robridge Blocking-Call Detector
+Finds synchronous calls that freeze the event loop of the FastAPI services.
+
+A heartbeat task on the event loop stamps the time every few milliseconds;
+a watchdog thread notices when the stamp stops moving for longer than the
+threshold and, while the loop is still stuck, grabs the loop thread's stack
+with sys._current_frames(). That is the blocking call itself (requests.get,
+a sync SDK call, a slow sqlite query), not the callback that happened to
+run next. Stalls are grouped by the innermost frame in our own code and the
+slowest sites are logged and served from GET /debug/blocking.
+
+Modes (BLOCKING_DETECTOR_MODE):
+    off      - nothing runs
+    sampled  - default; every stall is counted, stacks are captured for
+               BLOCKING_SAMPLE_RATE of them (cheap enough for production)
+    debug    - stacks for every stall, plus asyncio debug mode's slow
+               callback warnings at the same threshold
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+
+from service_logging import get_logger
+
+logger = get_logger('blocking')
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BlockingCallDetector:
+    def __init__(self, mode='sampled', threshold_ms=100, sample_rate=0.1, app_root=APP_ROOT,
+                 max_sites=50, stack_depth=15):
+        self.mode = mode
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = 1.0 if mode == 'debug' else sample_rate
+        self.app_root = app_root
+        self.max_sites = max_sites
+        self.stack_depth = stack_depth
+        self.beat_interval = min(0.05, self.threshold / 4)
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self._sites = {}
+        self._lock = threading.Lock()
+        self._beat = None
+        self._loop_thread = None
+        self._heartbeat_task = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mode=os.getenv('BLOCKING_DETECTOR_MODE', 'sampled').lower(),
+            threshold_ms=float(os.getenv('BLOCKING_THRESHOLD_MS', 100)),
+            sample_rate=float(os.getenv('BLOCKING_SAMPLE_RATE', 0.1)),
+        )
+
+    @property
+    def enabled(self):
+        return self.mode in ('sampled', 'debug')
+
+    def start(self):
+        """Start monitoring the running event loop (call from a startup hook)"""
+        if not self.enabled or self._heartbeat_task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if self.mode == 'debug':
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name='blocking-detector', daemon=True)
+        self._watchdog.start()
+        logger.info("Blocking-call detector running in %s mode (threshold %.0f ms)", self.mode, self.threshold * 1000)
+
+    def stop(self):
+        if self._heartbeat_task is None:
+            return
+        self._stopping.set()
+        self._heartbeat_task.cancel()
+        self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.beat_interval)
+
+    def _watch(self):
+        check_interval = max(0.005, self.threshold / 4)
+        while not self._stopping.wait(check_interval):
+            beat = self._beat
+            if time.monotonic() - beat < self.beat_interval + self.threshold:
+                continue
+
+            # The loop is stuck right now: its current stack is the blocking call
+            stack = None
+            if random.random() < self.sample_rate:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    stack = traceback.extract_stack(frame, limit=self.stack_depth)
+                    del frame
+            while self._beat == beat and not self._stopping.wait(check_interval):
+                pass
+            self._record(max(0.0, self._beat - beat - self.beat_interval), stack)
+
+    def _site(self, stack):
+        """Innermost frame in our own code, falling back to the innermost frame"""
+        for entry in reversed(stack):
+            path = os.path.abspath(entry.filename)
+            if path.startswith(self.app_root) and 'site-packages' not in path and os.path.basename(path) != os.path.basename(__file__):
+                return f"{os.path.relpath(path, self.app_root)}:{entry.lineno} in {entry.name}"
+        entry = stack[-1]
+        return f"{entry.filename}:{entry.lineno} in {entry.name}"
+
+    def _record(self, duration, stack):
+        site = self._site(stack) if stack else 'unsampled'
+        with self._lock:
+            self.stalls += 1
+            self.stalled_seconds += duration
+            entry = self._sites.get(site)
+            if entry is None:
+                if len(self._sites) >= self.max_sites:
+                    # Forget the least costly site to keep the table bounded
+                    del self._sites[min(self._sites, key=lambda key: self._sites[key]['total_ms'])]
+                entry = self._sites[site] = {'site': site, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                             'last_seen': None, 'stack': None}
+            entry['count'] += 1
+            entry['total_ms'] += duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            entry['last_seen'] = time.time()
+            if stack:
+                entry['stack'] = traceback.format_list(stack)
+        if stack:
+            logger.warning("Event loop blocked for %.0f ms at %s\n%s", duration * 1000, site,
+                           ''.join(traceback.format_list(stack)), extra={"site": site, "blocked_ms": round(duration * 1000)})
+        else:
+            logger.warning("Event loop blocked for %.0f ms (stack not sampled)", duration * 1000,
+                           extra={"blocked_ms": round(duration * 1000)})
+
+    def report(self, limit=10):
+        """Slowest blocking sites by total stalled time"""
+        with self._lock:
+            sites = sorted(self._sites.values(), key=lambda entry: entry['total_ms'], reverse=True)[:limit]
+            sites = [dict(entry, total_ms=round(entry['total_ms'], 1), max_ms=round(entry['max_ms'], 1))
+                     for entry in sites]
+            return {
+                'mode': self.mode,
+                'threshold_ms': self.threshold * 1000,
+                'sample_rate': self.sample_rate,
+                'stalls': self.stalls,
+                'stalled_seconds': round(self.stalled_seconds, 3),
+                'sites': sites,
+            }
+
+    def metrics(self):
+        """Scrape-time collector for service_metrics.MetricsRegistry"""
+        yield ('event_loop_stalls_total', 'counter', 'Event loop stalls above the blocking threshold',
+               [({}, self.stalls)])
+        yield ('event_loop_stalled_seconds_total', 'counter', 'Time the event loop spent blocked',
+               [({}, self.stalled_seconds)])
+
+
+def install_blocking_detector(app, detector, registry=None):
+    """Run the detector with a FastAPI app and serve GET /debug/blocking"""
+
+    @app.on_event('startup')
+    async def start_blocking_detector():
+        detector.start()
+
+    @app.on_event('shutdown')
+    async def stop_blocking_detector():
+        detector.stop()
+
+    @app.get('/debug/blocking', include_in_schema=False)
+    async def blocking_report(limit: int = 10):
+        return detector.report(limit)
+
+    if registry is not None:
+        registry.collector(detector.metrics)
+    return detector
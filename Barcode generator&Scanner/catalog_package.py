@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Offline Catalog Packages for ESP32 Scanners
+Builds compact, versioned GTIN -> short name/category packages from the
+barcodes table and binary deltas between versions, so scanners can resolve
+common scans from flash without a round trip to the server.
+
+Package layout (little-endian, sized for microcontroller flash):
+
+    header   "RBCP" u8 format, u8 reserved, u16 category_count,
+             u32 version, u32 record_count, u32 names_size, u32 crc32
+    categories  category_count x (u8 length, utf-8 bytes)
+    records     record_count x 12 bytes, sorted by GTIN for binary search:
+                u48 gtin, u8 category index, u8 name length, u32 name offset
+    names       utf-8 short names, concatenated
+
+Delta layout:
+
+    header   "RBCD" u8 format, u8 reserved, u16 first_new_category,
+             u16 new_category_count, u16 reserved, u32 from_version,
+             u32 to_version, u32 removed_count, u32 upsert_count, u32 crc32
+    categories  new_category_count x (u8 length, utf-8 bytes), appended
+    removed     removed_count x u48 gtin, sorted
+    upserts     upsert_count x (u48 gtin, u8 category, u8 name length, name), sorted
+
+Category indices are stable across versions (the table is append-only), so a
+delta only carries newly added categories and devices never remap records.
+
+Configuration (environment):
+
+    CATALOG_PACKAGE_DIR      versions and cached deltas (catalog_packages next to the database)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+PACKAGE_MAGIC = b"RBCP"
+DELTA_MAGIC = b"RBCD"
+FORMAT_VERSION = 1
+
+PACKAGE_HEADER = struct.Struct("<4sBBHIIII")
+DELTA_HEADER = struct.Struct("<4sBBHHHIIIII")
+RECORD = struct.Struct("<6sBBI")
+
+NAME_MAX_BYTES = 32
+CATEGORY_MAX_BYTES = 24
+MAX_CATEGORIES = 255
+
+GTIN_PATTERN = re.compile(r"\d{8}|\d{12,14}")
+
+
+def _gtin_bytes(gtin: int) -> bytes:
+    return gtin.to_bytes(6, "little")
+
+
+def _short_text(text, max_bytes: int) -> bytes:
+    """UTF-8 encode text, truncated to max_bytes without splitting a character."""
+    encoded = (text or "").strip().encode("utf-8")[:max_bytes]
+    return encoded.decode("utf-8", "ignore").encode("utf-8")
+
+
+def _pack_strings(strings) -> bytes:
+    return b"".join(bytes([len(value)]) + value for value in strings)
+
+
+def _unpack_strings(buffer, offset: int, count: int):
+    strings = []
+    for _ in range(count):
+        length = buffer[offset]
+        strings.append(bytes(buffer[offset + 1:offset + 1 + length]))
+        offset += 1 + length
+    return strings, offset
+
+
+def load_catalog_rows(conn):
+    """Return {gtin: (short_name, category)} from the barcodes table, newest row winning."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT barcode_data, product_name, category
+        FROM barcodes
+        ORDER BY id
+    ''')
+
+    catalog = {}
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        for barcode_data, product_name, category in rows:
+            code = (barcode_data or "").strip()
+            if not GTIN_PATTERN.fullmatch(code):
+                continue
+            catalog[int(code)] = (
+                _short_text(product_name, NAME_MAX_BYTES),
+                _short_text(category if category and category != "Unknown" else "", CATEGORY_MAX_BYTES),
+            )
+    return catalog
+
+
+def catalog_signature(catalog: dict) -> int:
+    """CRC32 over the packaged fields of every record, so in-place renames change it too."""
+    crc = 0
+    for gtin in sorted(catalog):
+        name, category = catalog[gtin]
+        crc = zlib.crc32(b"%d\x00%s\x00%s\x00" % (gtin, name, category), crc)
+    return crc
+
+
+def build_package(catalog: dict, version: int, categories: list = None) -> bytes:
+    """
+    Encode {gtin: (name_bytes, category_bytes)} as a package.
+
+    `categories` is the previous version's category table; it is extended,
+    never reordered, so indices stay valid for devices applying deltas.
+    """
+    categories = list(categories or [b""])
+    category_index = {value: index for index, value in enumerate(categories)}
+
+    records = []
+    names = bytearray()
+    for gtin in sorted(catalog):
+        name, category = catalog[gtin]
+        index = category_index.get(category)
+        if index is None:
+            if len(categories) < MAX_CATEGORIES:
+                index = category_index[category] = len(categories)
+                categories.append(category)
+            else:
+                index = 0
+        records.append(RECORD.pack(_gtin_bytes(gtin), index, len(name), len(names)))
+        names += name
+
+    body = _pack_strings(categories) + b"".join(records) + bytes(names)
+    header = PACKAGE_HEADER.pack(
+        PACKAGE_MAGIC, FORMAT_VERSION, 0, len(categories),
+        version, len(records), len(names), zlib.crc32(body),
+    )
+    return header + body
+
+
+def read_package(data: bytes) -> dict:
+    """Decode a package into its version, category table and {gtin: (name, category index)}."""
+    magic, fmt, _, category_count, version, record_count, names_size, crc = PACKAGE_HEADER.unpack_from(data)
+    if magic != PACKAGE_MAGIC or fmt != FORMAT_VERSION:
+        raise ValueError("Not a catalog package")
+    body = memoryview(data)[PACKAGE_HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("Catalog package checksum mismatch")
+
+    categories, offset = _unpack_strings(body, 0, category_count)
+    names_start = offset + record_count * RECORD.size
+    records = {}
+    for gtin, category, length, name_offset in RECORD.iter_unpack(body[offset:names_start]):
+        start = names_start + name_offset
+        records[int.from_bytes(gtin, "little")] = (bytes(body[start:start + length]), category)
+    return {"version": version, "categories": categories, "records": records}
+
+
+def lookup(data: bytes, gtin: int):
+    """Binary-search a package the way a device does; returns (name, category) or None."""
+    _, _, _, category_count, _, record_count, _, _ = PACKAGE_HEADER.unpack_from(data)
+    categories, offset = _unpack_strings(data, PACKAGE_HEADER.size, category_count)
+    names_start = offset + record_count * RECORD.size
+
+    low, high = 0, record_count - 1
+    while low <= high:
+        middle = (low + high) // 2
+        key, category, length, name_offset = RECORD.unpack_from(data, offset + middle * RECORD.size)
+        key = int.from_bytes(key, "little")
+        if key < gtin:
+            low = middle + 1
+        elif key > gtin:
+            high = middle - 1
+        else:
+            start = names_start + name_offset
+            return data[start:start + length].decode("utf-8"), categories[category].decode("utf-8")
+    return None
+
+
+def build_delta(old: bytes, new: bytes) -> bytes:
+    """Encode the changes that turn package `old` into package `new`."""
+    old_package = read_package(old)
+    new_package = read_package(new)
+    old_records = old_package["records"]
+    new_records = new_package["records"]
+    first_new = len(old_package["categories"])
+    new_categories = new_package["categories"][first_new:]
+
+    removed = sorted(gtin for gtin in old_records if gtin not in new_records)
+    upserts = sorted(gtin for gtin, record in new_records.items() if old_records.get(gtin) != record)
+
+    body = bytearray(_pack_strings(new_categories))
+    for gtin in removed:
+        body += _gtin_bytes(gtin)
+    for gtin in upserts:
+        name, category = new_records[gtin]
+        body += _gtin_bytes(gtin) + bytes([category, len(name)]) + name
+
+    header = DELTA_HEADER.pack(
+        DELTA_MAGIC, FORMAT_VERSION, 0, first_new, len(new_categories), 0,
+        old_package["version"], new_package["version"], len(removed), len(upserts), zlib.crc32(body),
+    )
+    return header + bytes(body)
+
+
+def apply_delta(old: bytes, delta: bytes) -> bytes:
+    """Reference implementation of the device-side merge; returns the new package."""
+    (magic, fmt, _, first_new, new_category_count, _, from_version, to_version,
+     removed_count, upsert_count, crc) = DELTA_HEADER.unpack_from(delta)
+    if magic != DELTA_MAGIC or fmt != FORMAT_VERSION:
+        raise ValueError("Not a catalog delta")
+    body = memoryview(delta)[DELTA_HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("Catalog delta checksum mismatch")
+
+    package = read_package(old)
+    if package["version"] != from_version or len(package["categories"]) != first_new:
+        raise ValueError("Catalog delta does not apply to this package version")
+
+    added, offset = _unpack_strings(body, 0, new_category_count)
+    categories = package["categories"] + added
+    records = package["records"]
+    for _ in range(removed_count):
+        records.pop(int.from_bytes(body[offset:offset + 6], "little"), None)
+        offset += 6
+    for _ in range(upsert_count):
+        gtin = int.from_bytes(body[offset:offset + 6], "little")
+        category, length = body[offset + 6], body[offset + 7]
+        records[gtin] = (bytes(body[offset + 8:offset + 8 + length]), category)
+        offset += 8 + length
+
+    catalog = {gtin: (name, categories[category]) for gtin, (name, category) in records.items()}
+    return build_package(catalog, to_version, categories)
+
+
+class CatalogPackager:
+    """
+    Keeps versioned packages (and cached deltas) for the barcodes table on disk.
+
+    A new version is only cut when the packaged content changes, so devices
+    polling with ?since=<version> get an empty answer most of the time. The
+    packager keeps one read connection open: SQLite's data_version on it
+    moves whenever another connection commits, so an unchanged database is
+    detected without reading the table. After a commit the rows are re-read
+    and compared to the source_signature stored with the latest version,
+    which also survives restarts.
+    """
+
+    def __init__(self, db_path: str = "barcodes.db", package_dir: str = "catalog_packages",
+                 keep_versions: int = 10):
+        self.db_path = db_path
+        self.package_dir = package_dir
+        self.keep_versions = keep_versions
+        self._conn = None
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, db_path: str):
+        package_dir = os.getenv("CATALOG_PACKAGE_DIR") or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), "catalog_packages")
+        return cls(db_path, package_dir)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.package_dir, name)
+
+    def _package_file(self, version: int) -> str:
+        return self._path(f"catalog_v{version:06d}.bin")
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._path("manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"versions": []}
+
+    def _save_manifest(self, manifest: dict):
+        temp_path = self._path("manifest.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self._path("manifest.json"))
+
+    def latest(self):
+        versions = self._load_manifest()["versions"]
+        return versions[-1] if versions else None
+
+    def refresh(self) -> dict:
+        """Cut a new package version if the barcodes table changed; return the latest version info."""
+        with self._lock:
+            return self._refresh()
+
+    def _connection(self):
+        if self._conn is None:
+            # Only used under self._lock, from whichever request thread holds it
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = self._data_version = None
+
+    def _refresh(self) -> dict:
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        latest = self.latest()
+        if latest and data_version == self._data_version:
+            return latest
+        catalog = load_catalog_rows(conn)
+        self._data_version = data_version
+        signature = catalog_signature(catalog)
+        if latest and latest.get("source_signature") == signature:
+            return latest
+
+        os.makedirs(self.package_dir, exist_ok=True)
+        previous = self.package(latest["version"]) if latest else None
+        categories = read_package(previous)["categories"] if previous else None
+        version = latest["version"] + 1 if latest else 1
+
+        started = time.perf_counter()
+        data = build_package(catalog, version, categories)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        content_crc = zlib.crc32(data[PACKAGE_HEADER.size:])
+        if latest and latest["content_crc"] == content_crc:
+            # Same package from rows that differ only outside the packaged fields
+            manifest = self._load_manifest()
+            manifest["versions"][-1]["source_signature"] = signature
+            self._save_manifest(manifest)
+            return manifest["versions"][-1]
+
+        temp_path = self._package_file(version) + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self._package_file(version))
+
+        manifest = self._load_manifest()
+        manifest["versions"].append({
+            "version": version,
+            "records": len(catalog),
+            "size": len(data),
+            "content_crc": content_crc,
+            "source_signature": signature,
+            "build_ms": round(build_ms, 2),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        for stale in manifest["versions"][:-self.keep_versions]:
+            for name in os.listdir(self.package_dir):
+                if name == os.path.basename(self._package_file(stale["version"])) or name.startswith(f"delta_{stale['version']:06d}_"):
+                    os.remove(self._path(name))
+        manifest["versions"] = manifest["versions"][-self.keep_versions:]
+        self._save_manifest(manifest)
+        return manifest["versions"][-1]
+
+    def package(self, version: int):
+        try:
+            with open(self._package_file(version), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def delta(self, from_version: int, to_version: int):
+        """Delta between two kept versions (cached on disk), or None if from_version is gone."""
+        cache_file = self._path(f"delta_{from_version:06d}_{to_version:06d}.bin")
+        try:
+            with open(cache_file, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+
+        old, new = self.package(from_version), self.package(to_version)
+        if old is None or new is None:
+            return None
+        data = build_delta(old, new)
+        with open(cache_file + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(cache_file + ".tmp", cache_file)
+        return data
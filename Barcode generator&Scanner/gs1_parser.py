@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Robridge GS1 Element String Parser
+Parses the application identifier (AI) data carried by GS1-128, GS1
+DataMatrix, GS1 QR, DataBar and DotCode labels, e.g. the GTIN, batch and
+expiry on inbound pallets and pharma packs.
+
+Accepted forms:
+
+    ]C1 / ]d2 / ]Q3 / ]e0 / ]J1 prefixed  symbology identifier sent by the scanner
+    0104006381333931<GS>10LOT7<GS>17...    FNC1 transmitted as GS (0x1D)
+    010400638133393117250101               only fixed-length AIs, no separators needed
+    (01)04006381333931(17)250101(10)LOT7   human-readable bracketed form
+
+parse_gs1() is a single left-to-right pass driven by AIS: the first two
+digits of an AI fix its length (GS1's own rule, precomputed into
+AI_LENGTH), the table then gives the value length, so fixed-length values
+are sliced directly and variable-length ones run to the next GS. Nothing is
+re-scanned and no regex is involved.
+"""
+
+import calendar
+import datetime
+
+GS = '\x1d'
+GS1_SYMBOLOGY_IDS = (']C1', ']d2', ']Q3', ']e0', ']J1')
+
+# ai: (title, length, fixed, numeric); length is the maximum for variable-length AIs
+AIS = {
+    '00': ('SSCC', 18, True, True),
+    '01': ('GTIN', 14, True, True),
+    '02': ('CONTENT', 14, True, True),
+    '10': ('BATCH/LOT', 20, False, False),
+    '11': ('PROD DATE', 6, True, True),
+    '12': ('DUE DATE', 6, True, True),
+    '13': ('PACK DATE', 6, True, True),
+    '15': ('BEST BEFORE', 6, True, True),
+    '16': ('SELL BY', 6, True, True),
+    '17': ('USE BY', 6, True, True),
+    '20': ('VARIANT', 2, True, True),
+    '21': ('SERIAL', 20, False, False),
+    '22': ('CPV', 20, False, False),
+    '235': ('TPX', 28, False, False),
+    '240': ('ADDITIONAL ID', 30, False, False),
+    '241': ('CUST. PART No.', 30, False, False),
+    '242': ('MTO VARIANT', 6, False, True),
+    '243': ('PCN', 20, False, False),
+    '250': ('SECONDARY SERIAL', 30, False, False),
+    '251': ('REF. TO SOURCE', 30, False, False),
+    '253': ('GDTI', 30, False, False),
+    '254': ('GLN EXTENSION COMPONENT', 20, False, False),
+    '255': ('GCN', 25, False, True),
+    '30': ('VAR. COUNT', 8, False, True),
+    '37': ('COUNT', 8, False, True),
+    '400': ('ORDER NUMBER', 30, False, False),
+    '401': ('GINC', 30, False, False),
+    '402': ('GSIN', 17, True, True),
+    '403': ('ROUTE', 30, False, False),
+    '410': ('SHIP TO LOC', 13, True, True),
+    '411': ('BILL TO', 13, True, True),
+    '412': ('PURCHASE FROM', 13, True, True),
+    '413': ('SHIP FOR LOC', 13, True, True),
+    '414': ('LOC No.', 13, True, True),
+    '415': ('PAY TO', 13, True, True),
+    '416': ('PROD/SERV LOC', 13, True, True),
+    '417': ('PARTY', 13, True, True),
+    '420': ('SHIP TO POST', 20, False, False),
+    '421': ('SHIP TO POST', 12, False, False),
+    '422': ('ORIGIN', 3, True, True),
+    '423': ('COUNTRY - INITIAL PROCESS.', 15, False, True),
+    '424': ('COUNTRY - PROCESS.', 3, True, True),
+    '425': ('COUNTRY - DISASSEMBLY', 15, False, True),
+    '426': ('COUNTRY - FULL PROCESS', 3, True, True),
+    '427': ('ORIGIN SUBDIVISION', 3, False, False),
+    '7001': ('NSN', 13, True, True),
+    '7002': ('MEAT CUT', 30, False, False),
+    '7003': ('EXPIRY TIME', 10, True, True),
+    '7004': ('ACTIVE POTENCY', 4, False, True),
+    '7006': ('FIRST FREEZE DATE', 6, True, True),
+    '7007': ('HARVEST DATE', 12, False, True),
+    '8001': ('DIMENSIONS', 14, True, True),
+    '8002': ('CMT No.', 20, False, False),
+    '8003': ('GRAI', 30, False, False),
+    '8004': ('GIAI', 30, False, False),
+    '8005': ('PRICE PER UNIT', 6, True, True),
+    '8006': ('ITIP', 18, True, True),
+    '8007': ('IBAN', 34, False, False),
+    '8008': ('PROD TIME', 12, False, True),
+    '8017': ('GSRN - PROVIDER', 18, True, True),
+    '8018': ('GSRN - RECIPIENT', 18, True, True),
+    '8020': ('REF No.', 25, False, False),
+    '8200': ('PRODUCT URL', 70, False, False),
+    '90': ('INTERNAL', 30, False, False),
+}
+AIS.update({f'9{n}': ('INTERNAL', 90, False, False) for n in range(1, 10)})
+
+# Trade measures: the fourth digit is the number of implied decimal places
+MEASURES = {
+    '310': 'NET WEIGHT (kg)', '311': 'LENGTH (m)', '312': 'WIDTH (m)', '313': 'HEIGHT (m)',
+    '314': 'AREA (m2)', '315': 'NET VOLUME (l)', '316': 'NET VOLUME (m3)',
+    '330': 'GROSS WEIGHT (kg)', '331': 'LENGTH (m), log', '332': 'WIDTH (m), log', '333': 'HEIGHT (m), log',
+    '334': 'AREA (m2), log', '335': 'VOLUME (l), log', '336': 'VOLUME (m3), log',
+}
+for _prefix, _title in MEASURES.items():
+    AIS.update({f'{_prefix}{decimals}': (_title, 6, True, True) for decimals in range(10)})
+for _prefix, _title, _length in (('390', 'AMOUNT', 15), ('391', 'AMOUNT', 18),
+                                 ('392', 'PRICE', 15), ('393', 'PRICE', 18)):
+    AIS.update({f'{_prefix}{decimals}': (_title, _length, False, True) for decimals in range(10)})
+
+# GS1 AIs are prefix-free and their first two digits determine their length
+AI_LENGTH = {}
+for _ai in AIS:
+    assert AI_LENGTH.setdefault(_ai[:2], len(_ai)) == len(_ai), _ai
+
+# AIs copied to top-level keys of the parse result
+NAMED = {'00': 'sscc', '01': 'gtin', '10': 'batch', '21': 'serial', '30': 'count', '37': 'count'}
+DATES = {'11': 'production_date', '13': 'pack_date', '15': 'best_before', '16': 'sell_by', '17': 'expiry'}
+CHECK_DIGIT_AIS = frozenset(('00', '01', '02', '410', '411', '412', '413', '414', '415', '416', '417'))
+
+
+def check_digit_valid(digits):
+    """GS1 mod-10 check used by GTINs, SSCCs and GLNs (weights 3,1,3,... from the right, excluding the check digit)"""
+    total = 3 * sum(map(int, digits[-2::-2])) + sum(map(int, digits[-3::-2]))
+    return (10 - total % 10) % 10 == ord(digits[-1]) - 48
+
+
+def gs1_date(value, today=None):
+    """
+    YYMMDD as an ISO date, or None if it is not a calendar date.
+    DD 00 means the last day of the month; the century follows GS1's rule
+    of keeping the year within -49/+50 years of today.
+    """
+    year, month, day = int(value[:2]), int(value[2:4]), int(value[4:6])
+    if not 1 <= month <= 12:
+        return None
+    current = (today or datetime.date.today()).year
+    difference = year - current % 100
+    century = current // 100 * 100 + (-100 if difference >= 51 else 100 if difference <= -50 else 0)
+    year += century
+    last_day = calendar.monthrange(year, month)[1]
+    if day == 0:
+        day = last_day
+    elif day > last_day:
+        return None
+    return f'{year:04d}-{month:02d}-{day:02d}'
+
+
+def _elements_raw(text):
+    elements = {}
+    position, end_of_text = 0, len(text)
+    while position < end_of_text:
+        if text[position] == GS:
+            position += 1
+            continue
+        ai_length = AI_LENGTH.get(text[position:position + 2])
+        if ai_length is None:
+            return None
+        ai = text[position:position + ai_length]
+        spec = AIS.get(ai)
+        if spec is None:
+            return None
+        _, length, fixed, numeric = spec
+        start = position + ai_length
+        if fixed:
+            position = start + length
+            if position > end_of_text:
+                return None
+        else:
+            position = text.find(GS, start, start + length + 1)
+            if position == -1:
+                position = end_of_text
+                if position - start > length:
+                    return None
+        value = text[start:position]
+        if not value or numeric and not (value.isascii() and value.isdigit()):
+            return None
+        elements[ai] = value
+    return elements
+
+
+def _elements_bracketed(text):
+    elements = {}
+    position, end_of_text = 0, len(text)
+    while position < end_of_text:
+        if text[position] != '(':
+            return None
+        close = text.find(')', position + 1)
+        if close == -1:
+            return None
+        ai = text[position + 1:close]
+        spec = AIS.get(ai)
+        if spec is None:
+            return None
+        _, length, fixed, numeric = spec
+        position = text.find('(', close + 1)
+        if position == -1:
+            position = end_of_text
+        value = text[close + 1:position].strip()
+        if not value or len(value) > length or fixed and len(value) != length:
+            return None
+        if numeric and not (value.isascii() and value.isdigit()):
+            return None
+        elements[ai] = value
+    return elements
+
+
+def parse_gs1(code):
+    """
+    Parse a GS1 element string.
+
+    Returns a dict with 'elements' ({ai: value} in label order) plus the
+    fields we act on when present: gtin, sscc, batch, serial, count,
+    expiry/best_before/... as ISO dates and net_weight_kg. Returns None for
+    anything that is not a well-formed element string or whose GTIN, SSCC or
+    GLN fails its check digit.
+    """
+    text = code.strip()
+    if text[:3] in GS1_SYMBOLOGY_IDS:
+        text = text[3:]
+    if not text:
+        return None
+    elements = _elements_bracketed(text) if text[0] == '(' else _elements_raw(text)
+    if not elements:
+        return None
+
+    result = {'elements': elements}
+    for ai, value in elements.items():
+        if ai in CHECK_DIGIT_AIS and not check_digit_valid(value):
+            return None
+        name = NAMED.get(ai)
+        if name is not None:
+            result[name] = int(value) if name == 'count' else value
+        elif ai in DATES:
+            result[DATES[ai]] = gs1_date(value)
+        elif ai[:3] == '310':
+            result['net_weight_kg'] = int(value) / 10 ** int(ai[3])
+    if 'gtin' not in result and '02' in elements:
+        # Logistic unit label: the GTIN of the trade items it contains
+        result['gtin'] = elements['02']
+    return result
+
+
+def lookup_gtin(gtin):
+    """GTIN-14 as the code product databases index: EAN-13 when the indicator digit is 0"""
+    return gtin[1:] if len(gtin) == 14 and gtin[0] == '0' else gtin
+
+
+def describe_gs1(gs1):
+    """One line summary, e.g. 'GTIN 04006381333931, batch LOT7, expiry 2025-01-31'"""
+    parts = []
+    for key, label in (('gtin', 'GTIN'), ('sscc', 'SSCC'), ('batch', 'batch'), ('serial', 'serial'),
+                       ('expiry', 'expiry'), ('best_before', 'best before'), ('count', 'count'),
+                       ('net_weight_kg', 'net weight (kg)')):
+        if gs1.get(key) is not None:
+            parts.append(f'{label} {gs1[key]}')
+    if not parts:
+        parts = [f'({ai}) {value}' for ai, value in gs1['elements'].items()]
+    return ', '.join(parts)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Robridge HTML Metadata Extractor
+Incremental extraction of a page's title and description for QR link
+analysis, without building a document tree.
+
+The analyzer only needs <title>, <meta name="description"> and, when a page
+has no description, the text of the first <p>. HeadMetadataParser is fed the
+response as it streams in and reports done as soon as those are known,
+which for most pages is at </head>, so the rest of the body is never
+downloaded or parsed.
+"""
+
+from html.parser import HTMLParser
+
+MAX_TEXT = 2000
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+def is_html(content_type):
+    """Whether a Content-Type header value is worth parsing (missing counts as HTML)"""
+    if not content_type:
+        return True
+    return content_type.split(';')[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+class HeadMetadataParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.description = None
+        self.paragraph = None
+        self.head_closed = False
+        self.done = False
+        self._capture = None
+        self._text = []
+
+    @property
+    def result(self):
+        """(title, description) in the shape the analyzer used to get from BeautifulSoup"""
+        description = self.description if self.description is not None else self.paragraph
+        return self.title, description
+
+    def _finish_capture(self):
+        text = ''.join(self._text).strip()[:MAX_TEXT]
+        if self._capture == 'title':
+            self.title = text or None
+        elif self._capture == 'p':
+            self.paragraph = text
+            self.done = True
+        self._capture = None
+        self._text = []
+
+    def _check_done(self):
+        if self.description is not None and (self.title is not None or self.head_closed):
+            self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        if self._capture == 'p' and tag == 'p':
+            # <p> without a closing tag ends at the next paragraph
+            self._finish_capture()
+            return
+        if self._capture is not None:
+            return
+        if tag == 'title' and self.title is None:
+            self._capture = 'title'
+        elif tag == 'meta' and self.description is None:
+            attributes = dict(attrs)
+            if (attributes.get('name') or '').lower() == 'description' and attributes.get('content'):
+                self.description = attributes['content'].strip()
+                self._check_done()
+        elif tag == 'body':
+            self.head_closed = True
+            self._check_done()
+        elif tag == 'p' and self.description is None and self.paragraph is None:
+            self._capture = 'p'
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if self._capture is not None and (tag == self._capture or tag in ('body', 'html')):
+            self._finish_capture()
+        if tag == 'head':
+            self.head_closed = True
+        self._check_done()
+
+    def handle_data(self, data):
+        if self._capture is not None and len(self._text) < MAX_TEXT:
+            self._text.append(data)
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def close(self):
+        super().close()
+        if self._capture is not None:
+            self._finish_capture()
+
+
+def extract_metadata(html):
+    """(title, description) from a complete HTML string"""
+    parser = HeadMetadataParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Robridge Sortable ID Generator
+Collision-free, time-sortable IDs for barcodes and their image files.
+
+IDs are ULID-compatible: 26 Crockford base32 characters encoding 128 bits,
+
+    48 bits  Unix time in milliseconds
+    32 bits  node: random per process, re-drawn after fork, never 0
+    48 bits  sequence: per-process counter starting at a random offset
+
+so they sort by creation time as plain strings, and the first 10 characters
+alone give a lower bound for a point in time (floor_id), which is what
+list_barcodes pages and filters on.
+
+Uniqueness does not depend on the clock: within a process the sequence
+never repeats (itertools.count hands out values atomically, so no lock is
+taken), and processes differ by node. If the wall clock steps back, IDs keep
+the last timestamp issued instead of sorting before earlier ones.
+"""
+
+import itertools
+import os
+import random
+import time
+
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ID_LENGTH = 26
+NODE_BITS = 32
+SEQUENCE_BITS = 48
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+_DECODE = {char: value for value, char in enumerate(CROCKFORD)}
+
+
+def encode(value):
+    """128-bit integer as 26 Crockford base32 characters"""
+    return ''.join([CROCKFORD[(value >> shift) & 31] for shift in range(125, -1, -5)])
+
+
+def is_sortable_id(text):
+    return (isinstance(text, str) and len(text) == ID_LENGTH and text[0] <= '7'
+            and all(char in _DECODE for char in text))
+
+
+def id_time_ms(sortable_id):
+    """Millisecond timestamp an ID was issued at"""
+    value = 0
+    for char in sortable_id[:10]:
+        value = value * 32 + _DECODE[char]
+    return value
+
+
+def floor_id(ms):
+    """Smallest ID issued at or after ms, for time-range comparisons against IDs"""
+    return encode(ms << (NODE_BITS + SEQUENCE_BITS))
+
+
+class SortableIdGenerator:
+    def __init__(self, node=None):
+        self.node = node or random.randrange(1, 1 << NODE_BITS)
+        self._sequence = itertools.count(random.getrandbits(SEQUENCE_BITS - 8))
+        self._last_ms = 0
+
+    def reseed(self):
+        """New node and sequence, e.g. in a forked child that inherited ours"""
+        self.node = random.randrange(1, 1 << NODE_BITS)
+        self._sequence = itertools.count(random.getrandbits(SEQUENCE_BITS - 8))
+
+    def new_id(self):
+        sequence = next(self._sequence) & _SEQUENCE_MASK
+        ms = time.time_ns() // 1_000_000
+        if ms < self._last_ms:
+            ms = self._last_ms
+        else:
+            self._last_ms = ms
+        return encode((ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | sequence)
+
+
+_generator = SortableIdGenerator()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_generator.reseed)
+
+
+def new_id():
+    """A new sortable ID from this process's generator"""
+    return _generator.new_id()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Robridge Label Payload Recognizer
+Recognizes the payloads our own barcode generator encodes (the JSON QR
+structure and the pipe-separated product format) and resolves them straight
+from the local barcode database, so our own labels never go through network
+enrichment.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+# Keys that identify the JSON document generate_barcode encodes into QR codes
+JSON_LABEL_KEYS = ("product_id", "product_name")
+
+
+def _number(value):
+    """Parse a price/coordinate field, returning 0.0 for anything non-numeric"""
+    value = value.strip()
+    return float(value) if value.replace('.', '').isdigit() else 0.0
+
+
+def parse_pipe_payload(barcode_data):
+    """Parse pipe-separated barcode data into structured format"""
+    if '|' not in barcode_data:
+        return None
+
+    parts = barcode_data.split('|')
+    if len(parts) < 4:
+        return None
+
+    try:
+        # Common format: product_id|product_name|category|price|location_x|location_y|location_z|type
+        return {
+            'product_id': parts[0].strip(),
+            'product_name': parts[1].strip(),
+            'category': parts[2].strip(),
+            'price': _number(parts[3]),
+            'location_x': _number(parts[4]) if len(parts) > 4 else 0.0,
+            'location_y': _number(parts[5]) if len(parts) > 5 else 0.0,
+            'location_z': _number(parts[6]) if len(parts) > 6 else 0.0,
+            'barcode_type': parts[7].strip() if len(parts) > 7 else 'UNKNOWN'
+        }
+    except (ValueError, IndexError):
+        return None
+
+
+def recognize_label_payload(code):
+    """
+    Recognize one of our own label payloads.
+
+    Returns a dict with 'format' ('json' or 'pipe'), 'product_id' and whatever
+    product fields the payload itself carries, or None for anything else.
+    Cheap character checks run before any parsing, so foreign codes are
+    rejected without touching json.loads.
+    """
+    text = code.strip()
+
+    # JSON QR structure written by generate_barcode
+    if text[:1] == '{':
+        if not all(f'"{key}"' in text for key in JSON_LABEL_KEYS):
+            return None
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or not data.get('product_id') or data.get('product_id') == 'N/A':
+            return None
+        return {
+            'format': 'json',
+            'product_id': str(data['product_id']),
+            'product_name': data.get('product_name'),
+            'category': data.get('category') if data.get('category') != 'N/A' else None,
+            'price': data.get('price') if data.get('price') != 'N/A' else None,
+            'location': data.get('location') if data.get('location') != 'N/A' else None,
+            'timestamp': data.get('timestamp'),
+            'source': data.get('source'),
+        }
+
+    # Pipe-separated product format
+    if '|' in text:
+        parsed = parse_pipe_payload(text)
+        if not parsed or not parsed['product_id']:
+            return None
+        parsed['format'] = 'pipe'
+        return parsed
+
+    return None
+
+
+class LabelResolver:
+    """Resolves recognized label payloads against the barcodes table (read-only)."""
+
+    def __init__(self, db_path='barcodes.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not os.path.exists(self.db_path):
+                return None
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            self._local.conn = conn
+        return conn
+
+    def resolve(self, code, payload):
+        """Return the newest barcodes row for this label as a dict, or None"""
+        conn = self._connection()
+        if conn is None:
+            return None
+
+        columns = ('barcode_id', 'barcode_data', 'barcode_type', 'product_name', 'product_id',
+                   'price', 'location_x', 'location_y', 'location_z', 'category', 'created_at')
+        select = f"SELECT {', '.join(columns)} FROM barcodes"
+
+        row = None
+        if payload['format'] == 'pipe':
+            row = conn.execute(f'{select} WHERE barcode_data = ? ORDER BY created_at DESC LIMIT 1',
+                               (code.strip(),)).fetchone()
+        if row is None:
+            row = conn.execute(f'{select} WHERE product_id = ? ORDER BY created_at DESC LIMIT 1',
+                               (payload['product_id'],)).fetchone()
+        return dict(zip(columns, row)) if row else None
+
+
+def describe_label(payload, record=None):
+    """
+    Merge a label payload with its database record into display fields:
+    title, category, price, location, barcode_id, product_id, created_at.
+    """
+    record = record or {}
+    location = payload.get('location')
+    if record.get('location_x') is not None:
+        location = f"X:{record['location_x']}, Y:{record['location_y']}, Z:{record['location_z']}"
+    elif payload['format'] == 'pipe' and (payload['location_x'] or payload['location_y'] or payload['location_z']):
+        location = f"X:{payload['location_x']}, Y:{payload['location_y']}, Z:{payload['location_z']}"
+    if isinstance(location, dict):
+        location = ', '.join(f'{axis.upper()}:{value}' for axis, value in location.items())
+
+    price = record.get('price') if record.get('price') is not None else payload.get('price')
+    return {
+        'title': record.get('product_name') or payload.get('product_name') or f"Product {payload['product_id']}",
+        'category': record.get('category') or payload.get('category') or 'Robridge Label',
+        'price': price,
+        'location': location or 'Unknown',
+        'barcode_id': record.get('barcode_id'),
+        'product_id': record.get('product_id') or payload['product_id'],
+        'created_at': record.get('created_at') or payload.get('timestamp'),
+        'in_database': bool(record),
+    }
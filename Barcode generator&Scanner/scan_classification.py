@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Robridge Scan Classification
+One classifier for scanned strings, shared by the AI server and the barcode
+analyzer so both agree on what a code is.
+
+classify() makes a single pass: the first character picks the candidate
+kinds, then one precompiled pattern, a plain str check or the GS1 parser
+confirms it, so no input is matched against every regex in turn. Kinds:
+
+    gtin     8, 12, 13 or 14 digits with a valid GS1 check digit (EAN/UPC/ITF-14)
+    numeric  any other all-digit code
+    url      http(s):// or www. link (scheme matched case-insensitively)
+    label    our own JSON QR structure or pipe-separated product payload
+    gs1      GS1 element string: symbology identifier (]C1, ]d2, ]Q3, ]e0, ]J1),
+             FNC1/GS separators, the bracketed "(01)..." human-readable form or
+             digits starting with AI 00/01/02 past GTIN length; parsed by gs1_parser
+    sku      letters, digits, - and _ (product code / SKU)
+    text     anything else
+    empty    blank input
+"""
+
+import re
+
+from gs1_parser import GS, GS1_SYMBOLOGY_IDS, check_digit_valid, parse_gs1
+from label_payloads import recognize_label_payload
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_URL = re.compile(r'(?:https?://|www\.)\S', re.IGNORECASE)
+_SKU = re.compile(r'[A-Za-z0-9\-_]+')
+
+
+class Classification:
+    __slots__ = ('kind', 'code', 'url', 'gtin', 'label', 'gs1')
+
+    def __init__(self, kind, code, url=None, gtin=None, label=None, gs1=None):
+        self.kind = kind
+        self.code = code
+        self.url = url
+        self.gtin = gtin
+        self.label = label
+        self.gs1 = gs1
+
+    @property
+    def is_barcode_number(self):
+        """All digits, 8-14 long: what the AI server looks up in product databases"""
+        return self.kind in ('gtin', 'numeric') and 8 <= len(self.code) <= 14
+
+    def __repr__(self):
+        return f'Classification({self.kind!r}, {self.code!r})'
+
+
+def classify(code):
+    """Classify a scanned string; surrounding whitespace is ignored"""
+    text = code.strip()
+    if not text:
+        return Classification('empty', text)
+
+    first = text[0]
+    if first.isdigit():
+        if len(text) > 14 and text[:2] in ('00', '01', '02'):
+            # GS1-128 whose FNC1 the scanner dropped
+            gs1 = parse_gs1(text)
+            if gs1 is not None:
+                return Classification('gs1', text, gtin=gs1.get('gtin'), gs1=gs1)
+        if text.isascii() and text.isdigit():
+            if len(text) in GTIN_LENGTHS and check_digit_valid(text):
+                return Classification('gtin', text, gtin=text.zfill(14))
+            return Classification('numeric', text)
+    elif first in 'hHwW':
+        if _URL.match(text):
+            url = text if '://' in text[:8] else f'https://{text}'
+            return Classification('url', text, url=url)
+    elif first == '(' or first == ']' and text[:3] in GS1_SYMBOLOGY_IDS:
+        gs1 = parse_gs1(text)
+        if gs1 is not None:
+            return Classification('gs1', text, gtin=gs1.get('gtin'), gs1=gs1)
+
+    if first == '{' or '|' in text:
+        label = recognize_label_payload(text)
+        if label is not None:
+            return Classification('label', text, label=label)
+    if GS in text:
+        gs1 = parse_gs1(text)
+        if gs1 is not None:
+            return Classification('gs1', text, gtin=gs1.get('gtin'), gs1=gs1)
+    if _SKU.fullmatch(text):
+        return Classification('sku', text)
+    return Classification('text', text)
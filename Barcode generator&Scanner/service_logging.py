@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Robridge Service Logging
+Structured, queue-backed logging shared by the AI server, the barcode
+analyzer and the Flask barcode service.
+
+Request handlers only pay for a level check and, when the record is kept,
+putting the LogRecord on a queue: message interpolation, JSON encoding and
+the write to stderr happen on a background listener thread. Loggers are
+named robridge.<category> (scan, upstream, llm, qr, label, http, db, ...),
+so verbose output can be turned on for one category without flooding the
+rest, and high-volume categories can be sampled.
+
+Log with %-style arguments and structured fields, never f-strings:
+
+    log = get_logger('scan')
+    log.info('scan received from %s', device_id, extra={'branch': 'url'})
+
+Environment:
+    LOG_LEVEL   default level (INFO)
+    LOG_LEVELS  per-category levels, e.g. "scan=DEBUG,upstream=WARNING"
+    LOG_SAMPLE  keep only a fraction of a category's records below WARNING,
+                e.g. "scan=0.05,http=0.01"
+    LOG_FORMAT  json (default) or text
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+ROOT = 'robridge'
+
+# Attributes every LogRecord has; anything else was passed through extra= and is a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def get_logger(category):
+    return logging.getLogger(f'{ROOT}.{category}')
+
+
+def _parse_mapping(value):
+    """"scan=DEBUG, http=0.1" -> {'scan': 'DEBUG', 'http': '0.1'}"""
+    mapping = {}
+    for item in (value or '').split(','):
+        name, _, setting = item.partition('=')
+        if name.strip() and setting.strip():
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, category, message and extra fields"""
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name[len(ROOT) + 1:] if record.name.startswith(f'{ROOT}.') else record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Keeps a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record untouched; getMessage() and formatting run on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging(service, level=None, levels=None, sample=None, fmt=None, stream=None):
+    """
+    Route the root logger through a queue to a single stderr handler.
+
+    Arguments default to the LOG_* environment variables. Calling it again
+    replaces the previous configuration.
+    """
+    global _listener
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    levels = levels if levels is not None else _parse_mapping(os.getenv('LOG_LEVELS'))
+    sample = sample if sample is not None else _parse_mapping(os.getenv('LOG_SAMPLE'))
+    fmt = fmt or os.getenv('LOG_FORMAT', 'json')
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == 'text':
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        output.setFormatter(JsonFormatter(service))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_RecordQueueHandler(log_queue))
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    for category, category_level in levels.items():
+        get_logger(category).setLevel(category_level.upper())
+    for category, rate in sample.items():
+        category_logger = get_logger(category)
+        for existing in [f for f in category_logger.filters if isinstance(f, SampleFilter)]:
+            category_logger.removeFilter(existing)
+        category_logger.addFilter(SampleFilter(float(rate)))
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records (call on shutdown so the last lines are not lost)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Robridge Service Metrics
+Prometheus text-format metrics for the FastAPI services (AI server and
+barcode analyzer), without a client library dependency.
+
+All recording happens on the event loop thread (middleware, async handlers,
+async upstream calls), so metrics are plain dict/list increments with no
+locks. Values that already exist elsewhere, such as cache hit counters, are
+read by collector callbacks at scrape time instead of being counted twice.
+
+instrument_fastapi() adds the request middleware (count and latency
+histogram per endpoint and branch, in-flight gauge), an event-loop lag
+monitor and the GET /metrics endpoint. Handlers tag the branch they took with
+set_branch().
+"""
+
+import asyncio
+import bisect
+import contextvars
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers cache hits (sub-millisecond) up to the bridge's 15s timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Per-request holder the handler writes its branch into; the middleware reads it back
+_request_info = contextvars.ContextVar('robridge_request_info', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # per-bucket counts (the last slot is +Inf), sum, count
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, ("le", _number(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders the exposition text"""
+
+    def __init__(self, prefix='robridge'):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(f'{self.prefix}_{name}', documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(f'{self.prefix}_{name}', documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(f'{self.prefix}_{name}', documentation, labelnames, buckets))
+
+    def get(self, name):
+        """Registered metric by its unprefixed name, e.g. get('requests_in_flight')"""
+        full_name = f'{self.prefix}_{name}'
+        for metric in self._metrics:
+            if metric.name == full_name:
+                return metric
+        raise KeyError(name)
+
+    def collector(self, callback):
+        """Register callback() -> iterable of (name, type, documentation, [(labels_dict, value), ...])"""
+        self._collectors.append(callback)
+        return callback
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for callback in self._collectors:
+            for name, kind, documentation, samples in callback():
+                name = f'{self.prefix}_{name}'
+                lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def set_branch(branch):
+    """Tag the current request with the code path that handled it (numeric/url/label/unknown/...)"""
+    info = _request_info.get()
+    if info is not None:
+        info['branch'] = branch
+
+
+class EventLoopLagMonitor:
+    """Sleeps for a fixed interval and records how late the loop woke it up"""
+
+    def __init__(self, registry, interval=0.5):
+        self.interval = interval
+        self.histogram = registry.histogram('event_loop_lag_seconds', 'Event loop scheduling delay',
+                                            buckets=LAG_BUCKETS)
+        self.last = registry.gauge('event_loop_lag_last_seconds', 'Most recent event loop scheduling delay')
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.histogram.observe(lag)
+            self.last.set(lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def instrument_fastapi(app, registry):
+    """Add request metrics, the loop lag monitor and GET /metrics to a FastAPI app"""
+    from fastapi.responses import Response
+
+    requests_total = registry.counter('requests_total', 'HTTP requests by endpoint, branch and status',
+                                      ('endpoint', 'method', 'branch', 'status'))
+    duration = registry.histogram('request_duration_seconds', 'HTTP request latency by endpoint and branch',
+                                  ('endpoint', 'method', 'branch'))
+    in_flight = registry.gauge('requests_in_flight', 'HTTP requests currently being handled')
+    lag_monitor = EventLoopLagMonitor(registry)
+
+    @app.middleware('http')
+    async def record_request_metrics(request, call_next):
+        if request.url.path == '/metrics':
+            return await call_next(request)
+        info = {'branch': 'none'}
+        _request_info.set(info)
+        in_flight.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            # The route template keeps label cardinality bounded (/api/esp32/ping/{device_id})
+            route = request.scope.get('route')
+            endpoint = route.path if route is not None else 'unmatched'
+            requests_total.inc(endpoint, request.method, info['branch'], str(status))
+            duration.observe(elapsed, endpoint, request.method, info['branch'])
+
+    @app.on_event('startup')
+    async def start_lag_monitor():
+        lag_monitor.start()
+
+    @app.on_event('shutdown')
+    async def stop_lag_monitor():
+        lag_monitor.stop()
+
+    @app.get('/metrics', include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return lag_monitor
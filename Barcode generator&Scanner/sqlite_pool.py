@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Robridge SQLite Connection Pool
+Reusable, pre-tuned connections to barcodes.db for the Flask barcode service.
+
+Opening a connection per request meant paying connection setup and a cold
+page cache on every call, and the default rollback journal made readers
+wait for writers. Connections here are configured once when created:
+
+    journal_mode=WAL     readers never block the writer (persistent, set on the file)
+    synchronous=NORMAL   safe with WAL, one fsync per checkpoint instead of per commit
+    busy_timeout         writers queue for the lock instead of failing "database is locked"
+    mmap_size            reads served from the OS page cache without copying
+    cache_size           per-connection page cache that survives between requests
+
+Flask's development server starts a thread per request, so connections are
+not pinned to threads: a request takes an idle connection (or opens one),
+uses it from its own thread only and gives it back at teardown, rolled back
+if the handler left a transaction open. At most pool size idle connections
+are kept.
+
+Environment:
+    BARCODE_DB_PATH          database file (barcodes.db next to the service code)
+    SQLITE_POOL_SIZE         idle connections kept (8)
+    SQLITE_BUSY_TIMEOUT_MS   lock wait before "database is locked" (5000)
+    SQLITE_MMAP_SIZE         bytes memory-mapped per connection (256 MiB)
+    SQLITE_CACHE_SIZE_KIB    page cache per connection (16384 KiB)
+"""
+
+import os
+import queue
+import sqlite3
+
+from barcode_schema import barcode_db_path
+
+
+class SQLitePool:
+    def __init__(self, db_path='barcodes.db', size=8, busy_timeout_ms=5000, mmap_size=256 * 1024 * 1024,
+                 cache_size_kib=16 * 1024):
+        self.db_path = db_path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.opened = 0
+        self.reused = 0
+        self.in_use = 0
+        self._idle = queue.LifoQueue()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            db_path=barcode_db_path(),
+            size=int(os.getenv('SQLITE_POOL_SIZE', 8)),
+            busy_timeout_ms=int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            mmap_size=int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            cache_size_kib=int(os.getenv('SQLITE_CACHE_SIZE_KIB', 16 * 1024)),
+        )
+
+    def _connect(self):
+        # Handed between request threads, but only ever used by one thread at a time
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kib)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        self.opened += 1
+        return conn
+
+    def acquire(self):
+        """An idle connection, or a new one if every pooled connection is in use"""
+        try:
+            conn = self._idle.get_nowait()
+            self.reused += 1
+        except queue.Empty:
+            conn = self._connect()
+        self.in_use += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection; uncommitted work is rolled back so the next request starts clean"""
+        self.in_use -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        if self._idle.qsize() < self.size:
+            self._idle.put_nowait(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        return {
+            'db_path': self.db_path,
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'in_use': self.in_use,
+            'opened': self.opened,
+            'reused': self.reused,
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test barcodes.db schema migrations and the query plans of the hot queries.
+
+Plans are checked with EXPLAIN QUERY PLAN against a populated, migrated
+database: a lookup must be an index SEARCH, never a SCAN of barcodes.
+"""
+
+import sqlite3
+
+import pytest
+
+from barcode_schema import LOOKUP_BARCODE_SQL, SCHEMA_VERSION, build_list_query, migrate, schema_version
+from id_generator import id_time_ms, is_sortable_id, new_id
+
+LEGACY_RACKS = '''
+    CREATE TABLE racks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rack_name TEXT UNIQUE NOT NULL,
+        product_name TEXT NOT NULL,
+        product_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def populated_db(rows=2000):
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    with conn:
+        conn.executemany(
+            'INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, product_id, category, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((f'EAN13_{n}', f'890{n:010d}', 'EAN13', ('web', 'esp32_scan')[n % 2], f'PRD{n % 500}',
+              f'Category {n % 20}', f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T10:00:00') for n in range(rows)))
+        conn.executemany('INSERT INTO racks (rack_name, product_name, product_id) VALUES (?, ?, ?)',
+                         ((f'RACK-{n}', f'Product {n}', f'PRD{n}') for n in range(200)))
+        conn.execute('ANALYZE')
+    return conn
+
+
+def plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def migrate_to(conn, version):
+    import barcode_schema
+    for step in range(schema_version(conn), version):
+        barcode_schema.MIGRATIONS[step](conn)
+        conn.execute(f'PRAGMA user_version = {step + 1}')
+        conn.commit()
+
+
+def test_migrate_fresh_database_reaches_current_version():
+    conn = sqlite3.connect(':memory:')
+    assert migrate(conn) == SCHEMA_VERSION
+    assert schema_version(conn) == SCHEMA_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'barcodes', 'racks'} <= tables
+
+
+def test_migrate_is_idempotent():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall() == indexes
+
+
+def test_migrate_upgrades_legacy_racks_table():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(LEGACY_RACKS)
+    conn.execute("INSERT INTO racks (rack_name, product_name, product_id) VALUES ('A1', 'Tea', 'PRD1')")
+    conn.commit()
+    migrate(conn)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(racks)')}
+    assert 'quantity' in columns
+    assert conn.execute('SELECT rack_name, quantity FROM racks').fetchall() == [('A1', 0)]
+
+
+def test_failed_migration_leaves_previous_version():
+    import barcode_schema
+
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('boom')
+
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    barcode_schema.MIGRATIONS.append(broken)
+    barcode_schema.SCHEMA_VERSION += 1
+    try:
+        try:
+            migrate(conn)
+        except RuntimeError:
+            pass
+        assert schema_version(conn) == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
+    finally:
+        barcode_schema.MIGRATIONS.pop()
+        barcode_schema.SCHEMA_VERSION -= 1
+
+
+def test_lookup_searches_indexes_on_both_branches():
+    conn = populated_db()
+    steps = plan(conn, LOOKUP_BARCODE_SQL, ('8900000000042', '08900000000042', '8900000000042', 'EAN13_42'))
+    assert any('SEARCH barcodes USING INDEX idx_barcodes_barcode_data' in step for step in steps)
+    assert any('SEARCH barcodes USING INDEX sqlite_autoindex_barcodes_1 (barcode_id=?)' in step for step in steps)
+    assert not any(step.startswith('SCAN barcodes') for step in steps)
+
+
+def test_lookup_returns_newest_match():
+    conn = populated_db()
+    conn.execute("INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, created_at) "
+                 "VALUES ('NEWER', '8900000000042', 'EAN13', 'esp32_scan', '2030-01-01T00:00:00')")
+    row = conn.execute(LOOKUP_BARCODE_SQL, ('8900000000042', '8900000000042', '8900000000042', 'EAN13_42')).fetchone()
+    assert row[0] == 'NEWER'
+    row = conn.execute(LOOKUP_BARCODE_SQL, ('nothing', 'nothing', 'nothing', 'EAN13_7')).fetchone()
+    assert row[0] == 'EAN13_7'
+
+
+def test_listing_by_created_at_needs_no_sort():
+    conn = populated_db()
+    steps = plan(conn, 'SELECT * FROM barcodes ORDER BY created_at DESC')
+    assert steps == ['SCAN barcodes USING INDEX idx_barcodes_created_at']
+
+
+def test_filters_and_label_resolution_use_indexes():
+    conn = populated_db()
+    queries = [
+        ('SELECT * FROM barcodes WHERE source = ?', ('web',), 'idx_barcodes_source'),
+        ('SELECT * FROM barcodes WHERE category = ?', ('Category 3',), 'idx_barcodes_category'),
+        ('SELECT * FROM barcodes WHERE product_id = ? ORDER BY created_at DESC LIMIT 1', ('PRD7',),
+         'idx_barcodes_product_id'),
+        ('SELECT * FROM barcodes WHERE barcode_data = ? ORDER BY created_at DESC LIMIT 1', ('8900000000042',),
+         'idx_barcodes_barcode_data'),
+        ('SELECT * FROM racks WHERE product_id = ?', ('PRD7',), 'idx_racks_product_id'),
+    ]
+    for sql, params, index in queries:
+        steps = plan(conn, sql, params)
+        assert any(f'USING INDEX {index}' in step for step in steps), (sql, steps)
+        assert not any('TEMP B-TREE' in step for step in steps), (sql, steps)
+
+
+def test_list_pages_are_index_range_searches():
+    conn = populated_db()
+    cursor = conn.execute('SELECT uid FROM barcodes WHERE id = 900').fetchone()[0]
+    for filters in ({}, {'source': 'web'}, {'category': 'Category 3'}):
+        sql, params = build_list_query(['barcode_id', 'data'], filters, cursor=cursor, limit=50)
+        steps = plan(conn, sql, params)
+        assert steps == ['SEARCH barcodes USING INDEX idx_barcodes_uid (uid<?)'], (filters, steps)
+    sql, params = build_list_query(['barcode_id'], since='2025-03-01', until='2025-04-01T00:00:00+00:00', limit=50)
+    assert plan(conn, sql, params) == ['SEARCH barcodes USING INDEX idx_barcodes_uid (uid>? AND uid<?)']
+
+
+def test_keyset_pages_cover_every_row_once_in_order():
+    conn = populated_db()
+    sql, params = build_list_query(['barcode_id'])
+    everything = [row[0] for row in conn.execute(sql, params)]
+    seen, cursor = [], None
+    while True:
+        sql, params = build_list_query(['barcode_id'], cursor=cursor, limit=300)
+        page = conn.execute(sql, params).fetchall()
+        seen += [row[0] for row in page]
+        if len(page) < 300:
+            break
+        cursor = page[-1][-1]
+    assert seen == everything
+    assert len(seen) == len(set(seen)) == 2000
+
+
+def test_list_query_rejects_garbage():
+    for bad in ({'cursor': 'garbage'}, {'cursor': 'Z' * 26}, {'since': 'yesterday'}):
+        with pytest.raises(ValueError):
+            build_list_query(['barcode_id'], **bad)
+
+
+def test_migration_derives_uids_that_sort_with_issued_ones():
+    conn = sqlite3.connect(':memory:')
+    migrate_to(conn, 3)
+    conn.execute("INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, created_at) "
+                 "VALUES ('OLD', '1', 'EAN13', 'web', '2025-01-02 03:04:05')")
+    conn.commit()
+    migrate(conn)
+    old = conn.execute("SELECT uid FROM barcodes WHERE barcode_id = 'OLD'").fetchone()[0]
+    assert is_sortable_id(old)
+    assert id_time_ms(old) == 1735787045000
+    # Writers that pass no uid get one from the trigger; new ones sort after the backfilled row
+    conn.execute("INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source) VALUES ('BARE', '2', 'QR', 'web')")
+    conn.execute("INSERT INTO barcodes (barcode_id, barcode_data, barcode_type, source, uid) "
+                 "VALUES ('ISSUED', '3', 'QR', 'web', ?)", (new_id(),))
+    uids = dict(conn.execute('SELECT barcode_id, uid FROM barcodes'))
+    assert is_sortable_id(uids['BARE'])
+    assert uids['OLD'] < uids['BARE'] and uids['OLD'] < uids['ISSUED']
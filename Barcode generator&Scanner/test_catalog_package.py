@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test offline catalog package versioning: when a new version is cut and
+that deltas reproduce it.
+"""
+
+import sqlite3
+
+import pytest
+
+from catalog_package import CatalogPackager, apply_delta, lookup
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'barcodes.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE barcodes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            barcode_data TEXT NOT NULL,
+            product_name TEXT,
+            category TEXT
+        )
+    ''')
+    conn.executemany('INSERT INTO barcodes (barcode_data, product_name, category) VALUES (?, ?, ?)',
+                     [('4006381333931', 'Milk', 'Dairy'), ('96385074', 'Bread', 'Bakery'), ('not-a-gtin', 'X', 'Y')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def packager(db_path, tmp_path):
+    packager = CatalogPackager(db_path, str(tmp_path / 'packages'))
+    yield packager
+    packager.close()
+
+
+def execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_unchanged_database_keeps_the_version(packager):
+    first = packager.refresh()
+    assert first['version'] == 1 and first['records'] == 2
+    assert packager.refresh() == first
+
+
+def test_in_place_update_cuts_a_new_version(packager, db_path):
+    first = packager.refresh()
+    execute(db_path, "UPDATE barcodes SET product_name = 'Oat Milk', category = 'Plant Based' WHERE id = 1")
+    second = packager.refresh()
+    assert second['version'] == 2
+    assert lookup(packager.package(2), 4006381333931) == ('Oat Milk', 'Plant Based')
+    delta = packager.delta(first['version'], second['version'])
+    assert apply_delta(packager.package(1), delta) == packager.package(2)
+
+
+def test_changes_outside_packaged_fields_keep_the_version(packager, db_path):
+    first = packager.refresh()
+    execute(db_path, "UPDATE barcodes SET product_name = 'Z' WHERE barcode_data = 'not-a-gtin'")
+    assert packager.refresh() == first
+
+
+def test_restart_reuses_the_stored_signature(packager, db_path, tmp_path):
+    first = packager.refresh()
+    restarted = CatalogPackager(db_path, str(tmp_path / 'packages'))
+    try:
+        assert restarted.refresh() == first
+        execute(db_path, "UPDATE barcodes SET category = 'Breads' WHERE id = 2")
+        assert restarted.refresh()['version'] == 2
+    finally:
+        restarted.close()
+
+
+def test_package_dir_defaults_next_to_the_database(db_path, tmp_path, monkeypatch):
+    monkeypatch.delenv('CATALOG_PACKAGE_DIR', raising=False)
+    assert CatalogPackager.from_env(db_path).package_dir == str(tmp_path / 'catalog_packages')
+    monkeypatch.setenv('CATALOG_PACKAGE_DIR', str(tmp_path / 'elsewhere'))
+    assert CatalogPackager.from_env(db_path).package_dir == str(tmp_path / 'elsewhere')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Known-answer tests for the GS1 element string parser.
+"""
+
+import datetime
+
+import pytest
+
+from gs1_parser import GS, check_digit_valid, describe_gs1, gs1_date, lookup_gtin, parse_gs1
+
+GTIN = '04006381333931'
+SSCC = '106141411234567897'
+
+
+def test_fixed_length_ais_without_separators():
+    gs1 = parse_gs1(f'01{GTIN}17250101')
+    assert gs1['elements'] == {'01': GTIN, '17': '250101'}
+    assert gs1['gtin'] == GTIN
+    assert gs1['expiry'] == '2025-01-01'
+
+
+def test_variable_length_ai_at_end_of_string():
+    gs1 = parse_gs1(f'01{GTIN}17250101' + '10LOT7')
+    assert gs1['batch'] == 'LOT7'
+
+
+def test_variable_length_ai_ended_by_gs():
+    gs1 = parse_gs1(f']C101{GTIN}10LOT7{GS}21SN42{GS}3710')
+    assert gs1['elements'] == {'01': GTIN, '10': 'LOT7', '21': 'SN42', '37': '10'}
+    assert gs1['serial'] == 'SN42'
+    assert gs1['count'] == 10
+
+
+@pytest.mark.parametrize('code', [
+    f'01{GTIN}10' + 'A' * 21,
+    f'01{GTIN}10' + 'A' * 21 + f'{GS}17250101',
+    f'(01){GTIN}(10)' + 'A' * 21,
+])
+def test_over_long_variable_value_is_rejected(code):
+    assert parse_gs1(code) is None
+
+
+@pytest.mark.parametrize('code', [
+    f'01{GTIN[:-1]}2',
+    f'(01){GTIN[:-1]}2(17)250131',
+    f'00{SSCC[:-1]}0',
+])
+def test_bad_check_digit_is_rejected(code):
+    assert parse_gs1(code) is None
+
+
+def test_bracketed_human_readable_form():
+    gs1 = parse_gs1(f'(01){GTIN}(17)250131(10)LOT7')
+    assert gs1['elements'] == {'01': GTIN, '17': '250131', '10': 'LOT7'}
+    assert (gs1['gtin'], gs1['expiry'], gs1['batch']) == (GTIN, '2025-01-31', 'LOT7')
+    assert describe_gs1(gs1) == f'GTIN {GTIN}, batch LOT7, expiry 2025-01-31'
+
+
+def test_sscc_only_label():
+    gs1 = parse_gs1(f']C100{SSCC}')
+    assert gs1 == {'elements': {'00': SSCC}, 'sscc': SSCC}
+    assert describe_gs1(gs1) == f'SSCC {SSCC}'
+
+
+def test_logistic_unit_reports_contained_gtin():
+    gs1 = parse_gs1(f'00{SSCC}02{GTIN}3712')
+    assert gs1['gtin'] == GTIN and gs1['count'] == 12
+
+
+def test_net_weight_uses_implied_decimals():
+    assert parse_gs1(f'01{GTIN}3103001250')['net_weight_kg'] == 1.25
+
+
+@pytest.mark.parametrize('code', ['', ']C1', '99', '01123', f'01{GTIN}17ABCDEF', 'hello', f'(01){GTIN}(17)2501'])
+def test_malformed_input_is_rejected(code):
+    assert parse_gs1(code) is None
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('250131', '2025-01-31'),
+    ('240200', '2024-02-29'),   # DD 00 is the last day of the month
+    ('250200', '2025-02-28'),
+    ('250230', None),
+    ('251301', None),
+    ('250001', None),
+    ('760101', '2076-01-01'),   # within +50 years of 2026
+    ('770101', '1977-01-01'),
+    ('990101', '1999-01-01'),
+])
+def test_gs1_date(value, expected):
+    assert gs1_date(value, today=datetime.date(2026, 6, 1)) == expected
+
+
+def test_check_digit_and_lookup_gtin():
+    assert check_digit_valid(GTIN) and check_digit_valid(SSCC)
+    assert not check_digit_valid('4006381333932')
+    assert lookup_gtin(GTIN) == '4006381333931'
+    assert lookup_gtin('14006381333938') == '14006381333938'
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the incremental page-head parser used for QR link analysis.
+"""
+
+import pytest
+
+from html_metadata import MAX_TEXT, HeadMetadataParser, extract_metadata, is_html
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<html><head><title>Acme Tea</title><meta name="description" content=" Loose leaf teas "></head></html>',
+     ('Acme Tea', 'Loose leaf teas')),
+    ('<title>A &amp; B</title><META NAME="Description" CONTENT="x &lt; y">', ('A & B', 'x < y')),
+    ('<head><title>Only title</title></head><body><p>First <b>para</b>graph</p><p>Second</p></body>',
+     ('Only title', 'First paragraph')),
+    ('<head><title>Unclosed</title></head><body><p>One<p>Two', ('Unclosed', 'One')),
+    ('<head><meta name="description" content=""><title></title></head><body></body>', (None, None)),
+    ('<meta name="description" content="Desc"/><body>', (None, 'Desc')),
+    ('', (None, None)),
+])
+def test_extract_metadata(html, expected):
+    assert extract_metadata(html) == expected
+
+
+def test_done_at_head_end_when_title_and_description_known():
+    parser = HeadMetadataParser()
+    parser.feed('<html><head><meta name="description" content="Early">')
+    assert not parser.done
+    parser.feed('<title>Split ')
+    parser.feed('title</title>')
+    assert parser.done
+    # Nothing after done is parsed
+    parser.feed('<body><p>ignored</p><title>Other</title>')
+    assert parser.result == ('Split title', 'Early')
+
+
+def test_tags_split_across_chunks():
+    html = '<head><title>Chunked page</title><meta name="description" content="Arrives in pieces"></head>'
+    parser = HeadMetadataParser()
+    for start in range(0, len(html), 7):
+        parser.feed(html[start:start + 7])
+    parser.close()
+    assert parser.result == ('Chunked page', 'Arrives in pieces')
+
+
+def test_paragraph_fallback_ends_the_parse():
+    parser = HeadMetadataParser()
+    parser.feed('<head><title>T</title></head><body><p>Intro</p>')
+    assert parser.done
+    assert parser.result == ('T', 'Intro')
+
+
+def test_text_is_capped():
+    title, _description = extract_metadata(f'<title>{"x" * (MAX_TEXT + 500)}</title>')
+    assert len(title) == MAX_TEXT
+
+
+@pytest.mark.parametrize('content_type, expected', [
+    (None, True),
+    ('text/html; charset=utf-8', True),
+    ('application/xhtml+xml', True),
+    ('TEXT/HTML', True),
+    ('application/pdf', False),
+    ('image/png', False),
+])
+def test_is_html(content_type, expected):
+    assert is_html(content_type) is expected
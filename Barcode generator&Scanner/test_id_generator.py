@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the sortable ID generator: format, ordering, and uniqueness across threads.
+"""
+
+import threading
+
+from id_generator import SortableIdGenerator, floor_id, id_time_ms, is_sortable_id, new_id
+
+
+def test_ids_are_ulid_shaped_and_carry_their_time():
+    uid = new_id()
+    assert is_sortable_id(uid)
+    assert floor_id(id_time_ms(uid)) <= uid < floor_id(id_time_ms(uid) + 1)
+
+
+def test_ids_from_one_thread_strictly_increase():
+    generator = SortableIdGenerator()
+    ids = [generator.new_id() for _ in range(20000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_stay_ordered_when_the_clock_steps_back(monkeypatch):
+    generator = SortableIdGenerator()
+    clock = iter([2_000_000_000_000_000_000, 1_999_999_999_000_000_000])
+    monkeypatch.setattr('id_generator.time.time_ns', lambda: next(clock))
+    first, second = generator.new_id(), generator.new_id()
+    assert first < second
+    assert id_time_ms(second) == id_time_ms(first)
+
+
+def test_ids_are_unique_across_threads_and_generators():
+    generators = [SortableIdGenerator(), SortableIdGenerator()]
+    results = []
+
+    def worker(generator):
+        results.append([generator.new_id() for _ in range(5000)])
+
+    threads = [threading.Thread(target=worker, args=(generators[n % 2],)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    everything = [uid for batch in results for uid in batch]
+    assert len(set(everything)) == len(everything) == 40000
+    for batch in results:
+        assert batch == sorted(batch)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the shared scanned-string classifier.
+"""
+
+import json
+
+import pytest
+
+from gs1_parser import GS
+from scan_classification import classify
+
+GTIN = '04006381333931'
+
+
+@pytest.mark.parametrize('code, kind', [
+    ('4006381333931', 'gtin'),
+    ('96385074', 'gtin'),
+    ('036000291452', 'gtin'),
+    (GTIN, 'gtin'),
+    ('4006381333932', 'numeric'),
+    ('12345', 'numeric'),
+    ('https://example.com/menu', 'url'),
+    ('HTTP://EXAMPLE.COM', 'url'),
+    ('www.example.com', 'url'),
+    ('http:/broken', 'text'),
+    (f'01{GTIN}17250131', 'gs1'),
+    (f'(01){GTIN}(10)LOT7', 'gs1'),
+    (f']C101{GTIN}10LOT7', 'gs1'),
+    (f'10LOT7{GS}01{GTIN}', 'gs1'),
+    ('P-1001|Widget|Tools|9.99', 'label'),
+    (json.dumps({'product_id': 'P-1001', 'product_name': 'Widget'}), 'label'),
+    ('ABC-123_x', 'sku'),
+    ('hello world', 'text'),
+    ('', 'empty'),
+    (' \r\n', 'empty'),
+])
+def test_kind(code, kind):
+    assert classify(code).kind == kind
+
+
+def test_surrounding_whitespace_is_stripped():
+    scan = classify('4006381333931\r\n')
+    assert scan.kind == 'gtin'
+    assert scan.code == '4006381333931'
+    assert scan.gtin == '04006381333931'
+    assert scan.is_barcode_number
+
+
+def test_url_gets_a_scheme():
+    assert classify('  www.example.com/a \n').url == 'https://www.example.com/a'
+    assert classify('http://example.com').url == 'http://example.com'
+
+
+def test_gs1_carries_gtin_and_parse():
+    scan = classify(f'(01){GTIN}(17)250131')
+    assert scan.gtin == GTIN
+    assert scan.gs1['expiry'] == '2025-01-31'
+
+
+def test_label_carries_payload():
+    scan = classify('P-1001|Widget|Tools|9.99')
+    assert scan.label['product_id'] == 'P-1001'
+    assert scan.label['format'] == 'pipe'
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('1234567', False),
+    ('12345678', True),
+    ('123456789012345', False),
+    ('ABC12345', False),
+])
+def test_is_barcode_number(code, expected):
+    assert classify(code).is_barcode_number is expected
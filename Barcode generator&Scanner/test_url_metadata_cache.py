@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test URL normalization and the URL metadata cache's freshness, negative
+caching and pruning rules.
+"""
+
+import time
+
+import pytest
+
+from url_metadata_cache import URLMetadataCache, normalize_url
+
+PAGE = {'etag': '"v1"', 'last_modified': None, 'bytes': 1200}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return URLMetadataCache(str(tmp_path / 'urls.db'), ttl=60, negative_ttl=300, max_stale=3600)
+
+
+def expire(cache, url, seconds_ago=1):
+    conn = cache._connection()
+    with conn:
+        conn.execute('UPDATE url_metadata SET expires_at = ? WHERE url = ?',
+                     (time.time() - seconds_ago, normalize_url(url)))
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Example.COM:443/a?b=2&a=1#top', 'https://example.com/a?a=1&b=2'),
+    ('http://example.com:80', 'http://example.com/'),
+    ('http://example.com:8080/x', 'http://example.com:8080/x'),
+    ('  https://example.com/?q=&z=1  ', 'https://example.com/?q=&z=1'),
+    ('https://example.com/Path/Case', 'https://example.com/Path/Case'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_fresh_then_stale(cache):
+    url = 'https://example.com/menu'
+    assert cache.lookup(url) == ('miss', None)
+    cache.store(url, 'Menu', 'Website (QR Code)', 'Lunch menu', PAGE)
+    state, entry = cache.lookup('HTTPS://EXAMPLE.com/menu#specials')
+    assert state == 'fresh' and entry['title'] == 'Menu'
+    expire(cache, url)
+    state, entry = cache.lookup(url)
+    assert state == 'stale' and entry['etag'] == '"v1"'
+
+
+def test_failed_revalidation_keeps_serving_the_stale_entry(cache):
+    url = 'https://example.com/menu'
+    cache.store(url, 'Menu', 'Website (QR Code)', 'Lunch menu', PAGE)
+    expire(cache, url)
+    cache.record_failure(url, 'timeout')
+    state, entry = cache.lookup(url)
+    assert state == 'stale_failed' and entry['title'] == 'Menu'
+    # Other pages on the host have no entry, so they get the cached failure
+    assert cache.lookup('https://example.com/other') == ('failed', 'timeout')
+
+
+def test_page_failures_are_cached_per_url(cache):
+    for outcome in ('http_error', 'bad_content'):
+        url = f'https://example.com/{outcome}'
+        cache.record_failure(url, outcome)
+        assert cache.lookup(url) == ('failed', outcome)
+    assert cache.lookup('https://example.com/fine') == ('miss', None)
+
+
+def test_store_clears_a_cached_page_failure(cache):
+    url = 'https://example.com/menu'
+    cache.record_failure(url, 'http_error')
+    cache.store(url, 'Menu', 'Website (QR Code)', 'Lunch menu', PAGE)
+    assert cache.lookup(url)[0] == 'fresh'
+
+
+def test_negative_ttl_zero_disables_failure_caching(tmp_path):
+    cache = URLMetadataCache(str(tmp_path / 'urls.db'), negative_ttl=0)
+    cache.record_failure('https://example.com/', 'timeout')
+    assert cache.lookup('https://example.com/') == ('miss', None)
+
+
+def test_prune_drops_expired_failures_and_long_stale_entries(cache):
+    cache.store('https://example.com/recent', 'Recent', 'Website (QR Code)', 'x', PAGE)
+    cache.store('https://example.com/ancient', 'Ancient', 'Website (QR Code)', 'x', PAGE)
+    expire(cache, 'https://example.com/recent', seconds_ago=60)
+    expire(cache, 'https://example.com/ancient', seconds_ago=7200)
+    cache.record_failure('https://gone.example/', 'error')
+    conn = cache._connection()
+    with conn:
+        conn.execute('UPDATE failed_fetches SET until = ?', (time.time() - 1,))
+
+    assert cache.prune() == 2
+    assert cache.lookup('https://example.com/recent')[0] == 'stale'
+    assert cache.lookup('https://example.com/ancient') == ('miss', None)
+    assert conn.execute('SELECT COUNT(*) FROM failed_fetches').fetchone()[0] == 0
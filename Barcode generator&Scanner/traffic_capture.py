@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Robridge Traffic Capture
+Opt-in recording of production requests for replay_traffic.py.
+
+Each request becomes one compact JSON line (arrival time, service, method,
+path, query, anonymized JSON payload, status, duration). Capture is off
+unless TRAFFIC_CAPTURE_DIR is set. The request path only builds a small dict
+and puts it on a queue; anonymization, serialization and file writes
+happen on a background listener thread, and files rotate by size with rotated segments
+gzip-compressed.
+
+Anonymization keeps what matters for load shape and drops what identifies
+people: device IDs and names are replaced by salted hashes (keeping whether
+the name contains "AI", which decides the analysis path), URL query strings
+and fragments are hashed, and image data is replaced by its length.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+DEVICE_FIELDS = ('deviceId', 'device_id')
+DEVICE_NAME_FIELDS = ('deviceName', 'device_name')
+CODE_FIELDS = ('barcodeData', 'barcode_data', 'scanned_value', 'barcode', 'data')
+DROPPED_FIELDS = ('imageData', 'image_data', 'image')
+
+
+def _digest(value, salt):
+    return hashlib.blake2b(f'{salt}:{value}'.encode('utf-8'), digest_size=6).hexdigest()
+
+
+def anonymize_code(code, salt):
+    """Keep product codes as-is; hash the query string and fragment of URLs"""
+    if not isinstance(code, str) or not code.startswith(('http://', 'https://')):
+        return code
+    parts = urlsplit(code)
+    query = f'q-{_digest(parts.query, salt)}' if parts.query else ''
+    fragment = f'f-{_digest(parts.fragment, salt)}' if parts.fragment else ''
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, fragment))
+
+
+def anonymize_payload(payload, salt=''):
+    """Anonymized copy of a request JSON payload"""
+    if not isinstance(payload, dict):
+        return payload
+    clean = {}
+    for key, value in payload.items():
+        if value is None:
+            clean[key] = None
+        elif key in DEVICE_FIELDS:
+            clean[key] = f'dev-{_digest(value, salt)}'
+        elif key in DEVICE_NAME_FIELDS:
+            clean[key] = f"device-{_digest(value, salt)}{' AI' if 'AI' in str(value).upper() else ''}"
+        elif key in CODE_FIELDS:
+            clean[key] = anonymize_code(value, salt)
+        elif key in DROPPED_FIELDS:
+            clean[key] = f'<{len(str(value))} bytes>'
+        elif isinstance(value, dict):
+            clean[key] = anonymize_payload(value, salt)
+        else:
+            clean[key] = value
+    return clean
+
+
+def anonymize_path(path, salt=''):
+    """Hash device IDs embedded in paths like /api/esp32/ping/<deviceId>"""
+    parts = path.split('/')
+    if len(parts) >= 5 and parts[1:3] == ['api', 'esp32'] and parts[3] in ('ping', 'scan'):
+        parts[4] = f'dev-{_digest(parts[4], salt)}'
+    return '/'.join(parts)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _LineFormatter(logging.Formatter):
+    """Anonymize and serialize one capture record (runs on the listener thread)"""
+
+    def __init__(self, salt):
+        super().__init__()
+        self.salt = salt
+
+    def format(self, record):
+        entry = dict(record.msg)
+        entry['p'] = anonymize_path(entry['p'], self.salt)
+        entry['b'] = anonymize_payload(entry['b'], self.salt)
+        return json.dumps(entry, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record untouched; formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+class TrafficCapture:
+    """
+    Appends anonymized request records to <directory>/capture-<service>.jsonl.
+
+    record() is safe to call from request handlers: it only samples, builds
+    a dict and enqueues it, so payloads must not be mutated afterwards. start() must be called before records are kept.
+    """
+
+    def __init__(self, service, directory=None, max_bytes=32 * 1024 * 1024, backups=20,
+                 sample_rate=1.0, salt=''):
+        self.service = service
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.salt = salt
+        self.enabled = False
+        self.recorded = 0
+        self._queue = queue.SimpleQueue()
+        self._logger = None
+        self._listener = None
+
+    @classmethod
+    def from_env(cls, service):
+        """Build from TRAFFIC_CAPTURE_* environment variables; disabled unless TRAFFIC_CAPTURE_DIR is set"""
+        return cls(
+            service,
+            directory=os.getenv('TRAFFIC_CAPTURE_DIR') or None,
+            max_bytes=int(float(os.getenv('TRAFFIC_CAPTURE_MAX_MB', 32)) * 1024 * 1024),
+            backups=int(os.getenv('TRAFFIC_CAPTURE_BACKUPS', 20)),
+            sample_rate=float(os.getenv('TRAFFIC_CAPTURE_SAMPLE', 1.0)),
+            salt=os.getenv('TRAFFIC_CAPTURE_SALT', ''),
+        )
+
+    @property
+    def configured(self):
+        """True when a capture directory is set, so start() will enable capture"""
+        return bool(self.directory)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'capture-{self.service}.jsonl')
+
+    def start(self):
+        if not self.directory or self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=self.max_bytes,
+                                                       backupCount=self.backups, encoding='utf-8')
+        handler.namer = lambda name: f'{name}.gz'
+        handler.rotator = _gzip_rotator
+        handler.setFormatter(_LineFormatter(self.salt))
+
+        self._logger = logging.getLogger(f'traffic_capture.{self.service}')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(_RecordQueueHandler(self._queue))
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        self.enabled = True
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._listener.stop()
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+        for handler in self._listener.handlers:
+            handler.close()
+
+    def record(self, method, path, query, payload, status, duration_ms, started=None):
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        self.recorded += 1
+        self._logger.info({
+            't': round(started if started is not None else time.time(), 6),
+            'svc': self.service,
+            'm': method,
+            'p': path,
+            'q': query or None,
+            'b': payload,
+            's': status,
+            'd': round(duration_ms, 2),
+        })
+
+
+def read_capture(path):
+    """Yield records from a capture file (plain or gzip-rotated)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
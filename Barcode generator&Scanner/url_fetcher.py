@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Robridge URL Fetcher
+Shared, non-blocking HTTP client for fetching the pages behind scanned QR
+links.
+
+One aiohttp session per process keeps connections pooled (with a total and a
+per-host limit, so one popular site cannot take every socket), and a
+semaphore bounds how many fetches run at once; scans beyond that wait their
+turn instead of opening more sockets. Every fetch has a total time budget
+covering the wait for a slot, connecting and reading the body.
+
+Pages are not downloaded whole: the body is decoded and fed to
+html_metadata.HeadMetadataParser chunk by chunk, and the connection is
+dropped as soon as the title and description are known (usually at
+</head>) or the byte cap is reached. Non-HTML responses are not read at all.
+
+Callers holding a cached copy pass its ETag/Last-Modified; the request is
+then conditional and an unchanged page comes back as a bodiless 304.
+
+Environment:
+    URL_FETCH_CONCURRENCY     fetches in flight per process (64)
+    URL_FETCH_MAX_CONNECTIONS pooled connections in total (100)
+    URL_FETCH_PER_HOST        pooled connections per host (8)
+    URL_FETCH_BUDGET_S        total seconds per fetch, including queueing (8)
+    URL_FETCH_MAX_BYTES       body bytes read per page at most (256 KiB)
+"""
+
+import asyncio
+import codecs
+import os
+
+import aiohttp
+
+from html_metadata import HeadMetadataParser, is_html
+
+USER_AGENT = 'Mozilla/5.0 (compatible; RobridgeScanner/1.0)'
+CHUNK_SIZE = 16 * 1024
+
+
+class FetchError(Exception):
+    """
+    A fetch that did not produce a usable page. outcome is 'timeout' or
+    'error' for network failures, 'http_error' or 'bad_content' (e.g. an
+    unknown charset) for problems with the page itself.
+    """
+
+    def __init__(self, outcome, message):
+        super().__init__(message)
+        self.outcome = outcome
+
+
+class URLFetcher:
+    def __init__(self, concurrency=64, max_connections=100, per_host=8, budget=8.0, max_bytes=256 * 1024):
+        self.concurrency = concurrency
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.waiting = 0
+        self.bytes_read = 0
+        self.not_html = 0
+        self._session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            concurrency=int(os.getenv('URL_FETCH_CONCURRENCY', 64)),
+            max_connections=int(os.getenv('URL_FETCH_MAX_CONNECTIONS', 100)),
+            per_host=int(os.getenv('URL_FETCH_PER_HOST', 8)),
+            budget=float(os.getenv('URL_FETCH_BUDGET_S', 8)),
+            max_bytes=int(os.getenv('URL_FETCH_MAX_BYTES', 256 * 1024)),
+        )
+
+    def _ensure_session(self):
+        # Created on first use so it binds to the running loop (also works without startup hooks)
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT})
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch_metadata(self, url, etag=None, last_modified=None):
+        """
+        Metadata of the page at url, or FetchError:
+        {'not_modified', 'title', 'description', 'etag', 'last_modified', 'bytes'}
+
+        title and description are None for non-HTML responses and for 304s.
+        """
+        session = self._ensure_session()
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            return await asyncio.wait_for(self._fetch(session, url, headers), self.budget)
+        except asyncio.TimeoutError:
+            raise FetchError('timeout', f'{url} did not load within {self.budget:g}s') from None
+        except aiohttp.ClientError as e:
+            raise FetchError('error', f'{url}: {e}') from e
+        except (LookupError, ValueError) as e:
+            raise FetchError('bad_content', f'{url}: {e}') from e
+
+    async def _fetch(self, session, url, headers):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            async with session.get(url, allow_redirects=True, headers=headers) as response:
+                if response.status >= 400:
+                    raise FetchError('http_error', f'HTTP {response.status} from {url}')
+                page = {
+                    'not_modified': response.status == 304,
+                    'title': None,
+                    'description': None,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'bytes': 0,
+                }
+                if page['not_modified']:
+                    return page
+                if not is_html(response.headers.get('Content-Type')):
+                    self.not_html += 1
+                    return page
+                parser = HeadMetadataParser()
+                decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+                size = 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    chunk = chunk[:self.max_bytes - size]
+                    size += len(chunk)
+                    parser.feed(decoder.decode(chunk))
+                    if parser.done or size >= self.max_bytes:
+                        break
+                else:
+                    parser.feed(decoder.decode(b'', final=True))
+                self.bytes_read += size
+                parser.close()
+                page['title'], page['description'] = parser.result
+                page['bytes'] = size
+                return page
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def metrics(self):
+        """Scrape-time collector for service_metrics.MetricsRegistry"""
+        yield ('url_fetch_in_flight', 'gauge', 'URL fetches holding a concurrency slot', [({}, self.in_flight)])
+        yield ('url_fetch_waiting', 'gauge', 'URL fetches waiting for a concurrency slot', [({}, self.waiting)])
+        yield ('url_fetch_body_bytes_total', 'counter', 'Response body bytes read by URL fetches', [({}, self.bytes_read)])
+        yield ('url_fetch_not_html_total', 'counter', 'URL fetches skipped for a non-HTML content type',
+               [({}, self.not_html)])
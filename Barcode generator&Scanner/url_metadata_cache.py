@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Robridge URL Metadata Cache
+Persistent cache of analyzed QR links for the barcode analyzer.
+
+Entries are keyed by normalized URL and hold the analysis result (title,
+category, description) plus the page's ETag/Last-Modified validators.
+Within URL_CACHE_TTL_S a scan is answered from the cache without touching
+the network; after that the page is revalidated with If-None-Match /
+If-Modified-Since, so an unchanged page costs a bodiless 304 and no parsing
+and only changed pages are downloaded again.
+
+If revalidation fails the stale entry is served rather than nothing.
+Failures are cached too (URL_NEGATIVE_TTL_S, 0 disables): a host that timed
+out or refused the connection is not contacted again for that long, and a
+URL that answered with an HTTP error or an undecodable page is not
+re-fetched. While a failure is cached, a URL with a stale entry keeps being
+answered from it without a fetch; only URLs never analyzed get the offline
+URL analysis, immediately instead of after the fetch budget.
+
+Both tables are pruned at most once per PRUNE_INTERVAL_S on write: expired
+failures are deleted, and so are entries stale for longer than
+URL_CACHE_MAX_STALE_S (7 days), past which they are no longer worth serving.
+
+Stats (hit ratio, revalidations, bytes saved) are exported as metrics and
+served from GET /api/cache/stats.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Outcomes that say something about the host rather than the page; cached per host
+HOST_OUTCOMES = ('timeout', 'error')
+PRUNE_INTERVAL_S = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_metadata (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    category TEXT,
+    description TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    body_bytes INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failed_fetches (
+    key TEXT PRIMARY KEY,
+    outcome TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+def normalize_url(url):
+    """Cache key: lowercase scheme and host, no default port or fragment, sorted query"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def url_host(url):
+    return (urlsplit(url.strip()).hostname or '').lower()
+
+
+class URLMetadataCache:
+    """
+    SQLite-backed; methods are blocking and meant to be called through
+    asyncio.to_thread from the analyzer's handlers.
+    """
+
+    def __init__(self, db_path='url_metadata_cache.db', ttl=86400.0, negative_ttl=300.0, max_stale=7 * 86400.0):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_stale = max_stale
+        self.pruned = 0
+        self._last_prune = 0.0
+        self.hits = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.bytes_saved = 0
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            db_path=os.getenv('URL_CACHE_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              'url_metadata_cache.db'),
+            ttl=float(os.getenv('URL_CACHE_TTL_S', 86400)),
+            negative_ttl=float(os.getenv('URL_NEGATIVE_TTL_S', 300)),
+            max_stale=float(os.getenv('URL_CACHE_MAX_STALE_S', 7 * 86400)),
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(SCHEMA)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, url):
+        """
+        ('fresh', entry) to answer from the cache, ('stale', entry) to revalidate,
+        ('stale_failed', entry) to answer from a stale entry without fetching
+        while a failure is cached, ('failed', outcome) for a cached failure with
+        no entry, or ('miss', None)
+        """
+        conn = self._connection()
+        now = time.time()
+        key = normalize_url(url)
+        row = conn.execute('SELECT * FROM url_metadata WHERE url = ?', (key,)).fetchone()
+        entry = dict(row) if row is not None else None
+        if entry is not None and entry['expires_at'] > now:
+            self.hits += 1
+            self.bytes_saved += entry['body_bytes']
+            return 'fresh', entry
+
+        if self.negative_ttl > 0:
+            failure = conn.execute(
+                'SELECT outcome FROM failed_fetches WHERE key IN (?, ?) AND until > ?',
+                (key, f'host:{url_host(url)}', now),
+            ).fetchone()
+            if failure is not None:
+                self.negative_hits += 1
+                return ('stale_failed', entry) if entry is not None else ('failed', failure['outcome'])
+
+        if entry is None:
+            self.misses += 1
+            return 'miss', None
+        self.stale += 1
+        return 'stale', entry
+
+    def store(self, url, title, category, description, page):
+        """Save a freshly analyzed page along with its validators"""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO url_metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (normalize_url(url), title, category, description, page['etag'], page['last_modified'],
+                 page['bytes'], now, now + self.ttl),
+            )
+            conn.execute('DELETE FROM failed_fetches WHERE key = ?', (normalize_url(url),))
+            self._maybe_prune(conn, now)
+
+    def mark_revalidated(self, entry, page):
+        """The server answered 304: extend the entry and keep any updated validators"""
+        self.revalidated += 1
+        self.bytes_saved += entry['body_bytes']
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'UPDATE url_metadata SET etag = ?, last_modified = ?, fetched_at = ?, expires_at = ? WHERE url = ?',
+                (page['etag'] or entry['etag'], page['last_modified'] or entry['last_modified'],
+                 now, now + self.ttl, entry['url']),
+            )
+
+    def record_failure(self, url, outcome):
+        """Cache a failed fetch: per host for network errors/timeouts, per URL for anything about the page"""
+        if self.negative_ttl <= 0:
+            return
+        key = f'host:{url_host(url)}' if outcome in HOST_OUTCOMES else normalize_url(url)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO failed_fetches VALUES (?, ?, ?)',
+                         (key, outcome, now + self.negative_ttl))
+            self._maybe_prune(conn, now)
+
+    def _maybe_prune(self, conn, now):
+        if now - self._last_prune >= PRUNE_INTERVAL_S:
+            self._last_prune = now
+            self.prune(conn, now)
+
+    def prune(self, conn=None, now=None):
+        """Delete expired failures and entries stale beyond max_stale; returns rows removed"""
+        conn = conn or self._connection()
+        now = time.time() if now is None else now
+        with conn:
+            removed = conn.execute('DELETE FROM failed_fetches WHERE until <= ?', (now,)).rowcount
+            removed += conn.execute('DELETE FROM url_metadata WHERE expires_at < ?', (now - self.max_stale,)).rowcount
+        self.pruned += removed
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.stale + self.misses + self.negative_hits
+        return {
+            'hits': self.hits,
+            'stale': self.stale,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'pruned': self.pruned,
+            'hit_ratio': round((self.hits + self.revalidated) / lookups, 4) if lookups else None,
+            'bytes_saved': self.bytes_saved,
+            'ttl_s': self.ttl,
+            'negative_ttl_s': self.negative_ttl,
+        }
+
+    def metrics(self):
+        """Scrape-time collector for service_metrics.MetricsRegistry"""
+        yield ('url_cache_lookups_total', 'counter', 'URL metadata cache lookups by result',
+               [({'result': 'hit'}, self.hits), ({'result': 'stale'}, self.stale),
+                ({'result': 'miss'}, self.misses), ({'result': 'negative_hit'}, self.negative_hits)])
+        yield ('url_cache_not_modified_total', 'counter', 'Stale entries revalidated by a 304 response',
+               [({}, self.revalidated)])
+        yield ('url_cache_bytes_saved_total', 'counter', 'Page body bytes not downloaded thanks to the URL cache',
+               [({}, self.bytes_saved)])
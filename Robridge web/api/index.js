@@ -1,6 +1,7 @@
 const express = require('express');
 const cors = require('cors');
 const path = require('path');
+const { Readable, pipeline } = require('stream');
 
 const app = express();
 
@@ -74,9 +75,20 @@ app.get('/api/list_barcodes', async (req, res) => {
   try {
     const PYTHON_BACKEND_URL = process.env.PYTHON_BACKEND_URL || 'https://your-python-backend.herokuapp.com';
     
-    const response = await fetch(`${PYTHON_BACKEND_URL}/list_barcodes`);
-    const result = await response.json();
-    res.json(result);
+    // Pass pagination/filter parameters through and stream the listing instead of buffering it
+    const query = req.originalUrl.includes('?') ? req.originalUrl.slice(req.originalUrl.indexOf('?')) : '';
+    // fetch would gunzip the body but leave Content-Encoding for us to forward, so ask for it uncompressed
+    const response = await fetch(`${PYTHON_BACKEND_URL}/list_barcodes${query}`, {
+      headers: { 'Accept-Encoding': 'identity' }
+    });
+    res.status(response.status).type(response.headers.get('content-type') || 'application/json');
+    pipeline(Readable.fromWeb(response.body), res, (error) => {
+      if (error) {
+        // Headers are already sent; cut the response so the client sees it as truncated
+        console.error('Error streaming barcode list from Python backend:', error);
+        res.destroy(error);
+      }
+    });
   } catch (error) {
     console.error('Error proxying to Python backend:', error);
     res.status(500).json({ 
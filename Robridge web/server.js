@@ -1,10 +1,12 @@
 const express = require('express');
 const { spawn } = require('child_process');
 const path = require('path');
+const { Readable, pipeline } = require('stream');
 const cors = require('cors');
 const http = require('http');
 const socketIo = require('socket.io');
 const { Pool } = require('pg');
+const crypto = require('crypto');
 
 const app = express();
 const server = http.createServer(app);
@@ -20,6 +22,16 @@ const io = socketIo(server, {
 const PORT = process.env.PORT || 3001;
 const AI_SERVER_URL = process.env.AI_SERVER_URL || 'http://localhost:8000';
 const NODE_ENV = process.env.NODE_ENV || 'development';
+const TRACE_SAMPLE_RATE = parseFloat(process.env.TRACE_SAMPLE_RATE || '0.1');
+
+// W3C trace context for the hop to the AI server: continue the caller's trace
+// (keeping its sampling decision) or start a new one
+const nextTraceparent = (incoming) => {
+  const match = /^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/.exec((incoming || '').trim().toLowerCase());
+  const traceId = match ? match[1] : crypto.randomBytes(16).toString('hex');
+  const flags = match ? match[3] : (Math.random() < TRACE_SAMPLE_RATE ? '01' : '00');
+  return `00-${traceId}-${crypto.randomBytes(8).toString('hex')}-${flags}`;
+};
 
 console.log('Server Configuration:');
 console.log(`   PORT: ${PORT}`);
@@ -375,12 +387,15 @@ app.post('/api/esp32/scan/:deviceId', async (req, res) => {
       } else {
         // Try AI server for analysis
         try {
-          console.log(`🤖 Forwarding to AI server at ${AI_SERVER_URL} for barcode: ${barcodeData}`);
+          const traceparent = nextTraceparent(req.get('traceparent'));
+          console.log(`🤖 Forwarding to AI server at ${AI_SERVER_URL} for barcode: ${barcodeData} (trace ${traceparent.split('-')[1]})`);
           
+          const aiStarted = Date.now();
           const aiResponse = await fetch(`${AI_SERVER_URL}/api/esp32/scan`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
+              'traceparent': traceparent,
             },
             body: JSON.stringify({
               barcodeData: barcodeData,
@@ -394,7 +409,7 @@ app.post('/api/esp32/scan/:deviceId', async (req, res) => {
           
           if (aiResponse.ok) {
             aiAnalysis = await aiResponse.json();
-            console.log('✅ AI Analysis completed successfully!');
+            console.log(`✅ AI Analysis completed successfully in ${Date.now() - aiStarted} ms (trace ${traceparent.split('-')[1]})`);
             console.log('AI Analysis:', JSON.stringify(aiAnalysis, null, 2));
           } else {
             const errorText = await aiResponse.text();
@@ -1368,9 +1383,20 @@ app.get('/api/list_barcodes', async (req, res) => {
     }
 
     // Forward request to Python backend
-    const response = await fetch(`http://localhost:5000/list_barcodes`);
-    const result = await response.json();
-    res.json(result);
+    // Pass pagination/filter parameters through and stream the listing instead of buffering it
+    const query = req.originalUrl.includes('?') ? req.originalUrl.slice(req.originalUrl.indexOf('?')) : '';
+    // fetch would gunzip the body but leave Content-Encoding for us to forward, so ask for it uncompressed
+    const response = await fetch(`http://localhost:5000/list_barcodes${query}`, {
+      headers: { 'Accept-Encoding': 'identity' }
+    });
+    res.status(response.status).type(response.headers.get('content-type') || 'application/json');
+    pipeline(Readable.fromWeb(response.body), res, (error) => {
+      if (error) {
+        // Headers are already sent; cut the response so the client sees it as truncated
+        console.error('Error streaming barcode list from Python backend:', error);
+        res.destroy(error);
+      }
+    });
   } catch (error) {
     console.error('Error proxying to Python backend:', error);
     res.status(500).json({ 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local category classifier: holdout accuracy, how many
+predictions clear the confidence threshold (LLM calls avoided) and
+per-prediction latency.
+
+Uses the trained model and the same example sources as
+train_category_classifier.py; --synthetic N trains and evaluates on a
+generated dataset instead, for environments without scan data.
+
+Usage: python bench_category_classifier.py [--config pipeline_config.json] [--synthetic 20000] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from category_classifier import CategoryClassifier, save_model, train
+from train_category_classifier import load_examples, load_settings, split_examples
+
+SYNTHETIC_VOCABULARY = {
+    "Beverages": ["cola", "juice", "water", "tea", "coffee", "soda", "lassi", "energy drink"],
+    "Snacks": ["chips", "namkeen", "crackers", "popcorn", "nuts", "bhujia", "wafers"],
+    "Dairy": ["milk", "paneer", "curd", "butter", "cheese", "ghee", "yogurt"],
+    "Personal Care": ["shampoo", "soap", "toothpaste", "lotion", "deodorant", "face wash"],
+    "Electronics": ["earbuds", "charger", "cable", "power bank", "speaker", "mouse"],
+    "Stationery": ["notebook", "pen", "pencil", "marker", "stapler", "eraser"],
+    "Household": ["detergent", "dishwash", "floor cleaner", "garbage bags", "air freshener"],
+}
+BRANDS = ["Amul", "Tata", "Parle", "Nestle", "Dabur", "Boat", "Classmate", "Surf", "Haldiram", "Britannia"]
+
+
+def synthetic_examples(count, seed=7):
+    rng = random.Random(seed)
+    categories = list(SYNTHETIC_VOCABULARY)
+    examples = []
+    for _ in range(count):
+        category = rng.choice(categories)
+        name = f"{rng.choice(BRANDS)} {rng.choice(SYNTHETIC_VOCABULARY[category])} {rng.choice(['', '500ml', '1kg', 'pack of 2', 'mini'])}".strip()
+        examples.append((name, category, name))
+    return examples
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def evaluate(classifier, test_set):
+    timings = []
+    correct = confident = confident_correct = 0
+    for text, category, _title in test_set:
+        started = time.perf_counter()
+        prediction = classifier.predict(text)
+        timings.append((time.perf_counter() - started) * 1e6)
+        hit = prediction["category"] == category
+        correct += hit
+        if prediction["confidence"] >= classifier.min_confidence:
+            confident += 1
+            confident_correct += hit
+    timings.sort()
+    return {
+        "test_examples": len(test_set),
+        "accuracy": round(correct / len(test_set), 4),
+        "min_confidence": classifier.min_confidence,
+        "local_coverage": round(confident / len(test_set), 4),
+        "local_accuracy": round(confident_correct / confident, 4) if confident else None,
+        "latency_p50_us": round(percentile(timings, 0.50), 1),
+        "latency_p99_us": round(percentile(timings, 0.99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local category classifier")
+    parser.add_argument("--config", default="pipeline_config.json")
+    parser.add_argument("--synthetic", type=int, default=0, help="Train and evaluate on N generated examples")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    if args.synthetic:
+        train_set, test_set = split_examples(synthetic_examples(args.synthetic), test_fraction=0.2)
+        model_path = os.path.join(tempfile.mkdtemp(), "category_model.json")
+        save_model(train(train_set, buckets=settings["buckets"], epochs=settings["epochs"]), model_path)
+    else:
+        _train_set, test_set = split_examples(load_examples(settings))
+        model_path = settings["model_path"]
+
+    if not test_set or not os.path.exists(model_path):
+        print("❌ Need a trained model and holdout examples (run train_category_classifier.py or use --synthetic)")
+        return
+
+    classifier = CategoryClassifier(model_path, settings["min_confidence"])
+    started = time.perf_counter()
+    classifier.model
+    load_ms = (time.perf_counter() - started) * 1000
+
+    results = evaluate(classifier, test_set)
+    results["model_load_ms"] = round(load_ms, 1)
+    for key, value in results.items():
+        print(f"{key:>16}: {value}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local product catalog: streaming import throughput and
+lookup latency on a synthetic Open Food Facts-style dump.
+
+Usage: python bench_product_catalog.py [--rows 2000000] [--format jsonl|csv] [--json results.json]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+from product_catalog import ProductCatalog
+
+CATEGORIES = ["en:beverages", "en:snacks", "en:dairies", "en:breakfasts", "en:frozen-foods",
+              "en:condiments", "en:biscuits", "en:teas", "en:spices", "en:sweets"]
+
+
+def synthetic_records(rows, seed, start=0):
+    rng = random.Random(seed)
+    for i in range(start, start + rows):
+        yield {
+            "code": str(8900000000000 + i * 7),
+            "product_name": f"Product {i}",
+            "brands": f"Brand {i % 5000}",
+            "categories": rng.choice(CATEGORIES),
+            "generic_name": f"Synthetic product number {i} for benchmarking",
+            "image_url": f"https://images.example.com/{i}.jpg",
+        }
+
+
+def write_dump(path, records, fmt):
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        if fmt == "jsonl":
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        else:
+            writer = None
+            for record in records:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(record), delimiter="\t")
+                    writer.writeheader()
+                writer.writerow(record)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def time_lookups(catalog, barcodes):
+    timings = []
+    for barcode in barcodes:
+        started = time.perf_counter()
+        catalog.lookup(barcode)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {
+        "p50_us": round(percentile(timings, 0.50), 1),
+        "p95_us": round(percentile(timings, 0.95), 1),
+        "p99_us": round(percentile(timings, 0.99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local product catalog")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dump_path = os.path.join(temp_dir, f"products.{args.format}.gz")
+        delta_path = os.path.join(temp_dir, f"products-delta.{args.format}.gz")
+        catalog = ProductCatalog(os.path.join(temp_dir, "product_catalog.db"))
+
+        print(f"📝 Writing {args.rows} synthetic rows to {os.path.basename(dump_path)}...")
+        write_dump(dump_path, synthetic_records(args.rows, seed=1), args.format)
+
+        print("📥 Importing full dump...")
+        full = catalog.import_file(dump_path, batch_size=args.batch_size)
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        delta_rows = max(1, args.rows // 100)
+        write_dump(delta_path, synthetic_records(delta_rows, seed=2, start=args.rows - delta_rows // 2), args.format)
+        print("📥 Importing 1% delta...")
+        delta = catalog.import_file(delta_path, batch_size=args.batch_size)
+
+        rng = random.Random(3)
+        hits = [str(8900000000000 + rng.randrange(args.rows) * 7) for _ in range(args.lookups)]
+        misses = [str(8800000000000 + rng.randrange(args.rows)) for _ in range(args.lookups)]
+        results = {
+            "rows": args.rows,
+            "format": args.format,
+            "import_seconds": full["seconds"],
+            "import_rows_per_second": full["rows_per_second"],
+            "delta_rows": delta["rows"],
+            "delta_rows_per_second": delta["rows_per_second"],
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "db_size_mb": round(os.path.getsize(catalog.db_path) / 1024 / 1024, 1),
+            "lookup_hit": time_lookups(catalog, hits),
+            "lookup_miss": time_lookups(catalog, misses),
+        }
+
+    print("=" * 50)
+    print(f"Import:      {results['import_rows_per_second']} rows/s ({results['import_seconds']}s)")
+    print(f"Delta:       {results['delta_rows_per_second']} rows/s ({results['delta_rows']} rows)")
+    print(f"Peak RSS:    {results['peak_rss_mb']} MB")
+    print(f"DB size:     {results['db_size_mb']} MB")
+    print(f"Lookup hit:  {results['lookup_hit']}")
+    print(f"Lookup miss: {results['lookup_miss']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Benchmark the AI server scan path against local provider stand-ins.
+
+Local aiohttp servers impersonate Open Food Facts, UPCitemdb, Barcode Lookup
+and the OpenAI chat completions API, each with a configurable latency,
+error and miss profile. server.py is imported with its provider URLs
+pointed at them and esp32_scan, scan_code and fetch_product_info are
+driven in-process at a fixed concurrency; every scenario reports
+throughput and p50/p95/p99 latency plus the provider calls it caused.
+
+Profiles are set per provider as comma-separated key:value pairs, e.g.
+    --provider off=latency_ms:80,miss_rate:0.6 --provider llm=latency_ms:400,error_rate:0.02
+
+Results are written as JSON (--json); --compare an earlier results file to
+print the change per scenario.
+
+Usage: python bench_scan_path.py [--requests 500] [--concurrency 32] [--scenario NAME ...]
+                                 [--provider NAME=key:value,...] [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import time
+
+from aiohttp import web
+
+PROVIDERS = {
+    "off": {"latency_ms": 60, "jitter_ms": 20, "error_rate": 0.0, "miss_rate": 0.5},
+    "upcitemdb": {"latency_ms": 90, "jitter_ms": 30, "error_rate": 0.0, "miss_rate": 0.5},
+    "barcodelookup": {"latency_ms": 120, "jitter_ms": 40, "error_rate": 0.0, "miss_rate": 0.7},
+    "llm": {"latency_ms": 400, "jitter_ms": 100, "error_rate": 0.0, "miss_rate": 0.0},
+}
+
+SCENARIOS = (
+    "fetch_product_info_cold",
+    "fetch_product_info_warm",
+    "esp32_scan_barcode",
+    "esp32_scan_url",
+    "esp32_scan_label",
+    "scan_code_barcode",
+    "scan_code_url",
+)
+
+
+def parse_profile(spec):
+    """'off=latency_ms:80,miss_rate:0.6' -> ('off', {'latency_ms': 80.0, 'miss_rate': 0.6})"""
+    name, _, settings = spec.partition("=")
+    if name not in PROVIDERS:
+        raise argparse.ArgumentTypeError(f"Unknown provider '{name}' (choose from {', '.join(PROVIDERS)})")
+    profile = {}
+    for item in filter(None, settings.split(",")):
+        key, _, value = item.partition(":")
+        if key not in PROVIDERS[name]:
+            raise argparse.ArgumentTypeError(f"Unknown profile key '{key}' for {name}")
+        profile[key] = float(value)
+    return name, profile
+
+
+class StandIn:
+    """One fake provider: sleeps for its latency, then fails, misses or answers."""
+
+    def __init__(self, name, profile, seed):
+        self.name = name
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def respond(self, found, missing):
+        self.calls += 1
+        profile = self.profile
+        delay = profile["latency_ms"] + self.rng.uniform(-profile["jitter_ms"], profile["jitter_ms"])
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        if self.rng.random() < profile["error_rate"]:
+            self.errors += 1
+            return web.json_response({"error": "stand-in failure"}, status=500)
+        if self.rng.random() < profile["miss_rate"]:
+            return web.json_response(missing)
+        return web.json_response(found())
+
+    async def open_food_facts(self, request):
+        barcode = request.match_info["barcode"]
+        return await self.respond(
+            lambda: {"status": 1, "product": {"product_name": f"OFF Product {barcode}", "brands": "Stand-in Foods",
+                                              "categories": "en:snacks", "generic_name": "Benchmark product",
+                                              "image_url": None}},
+            {"status": 0, "status_verbose": "product not found"})
+
+    async def upcitemdb(self, request):
+        barcode = request.query.get("upc", "")
+        return await self.respond(
+            lambda: {"code": "OK", "items": [{"title": f"UPC Product {barcode}", "brand": "Stand-in Goods",
+                                              "category": "Household", "description": "Benchmark item",
+                                              "images": []}]},
+            {"code": "OK", "total": 0, "items": []})
+
+    async def barcode_lookup(self, request):
+        barcode = request.query.get("barcode", "")
+        return await self.respond(
+            lambda: {"products": [{"product_name": f"BL Product {barcode}", "brand": "Stand-in Co",
+                                   "category": "General", "description": "Benchmark item", "images": []}]},
+            {"products": []})
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        if "Return a JSON array" in prompt:
+            items = re.findall(r"^(\d+)\. (\S+)$", prompt, re.MULTILINE)
+            content = json.dumps([{"id": int(index), "url": url, "title": "Stand-in Site", "category": "Website",
+                                   "description": f"Stand-in description of {url}."} for index, url in items])
+        else:
+            url = (re.search(r"contains this link: (\S+)\.", prompt) or re.search(r"(\S+)$", prompt)).group(1)
+            content = f"Scanned Code: {url}\nTitle: Stand-in Site\nCategory: Website\nDescription: Stand-in description."
+        return await self.respond(lambda: self.completion(body["model"], content),
+                                  self.completion(body["model"], "Sorry, I can't identify this link."))
+
+    @staticmethod
+    def completion(model, content):
+        return {"id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}
+
+
+async def start_stand_ins(profiles, seed):
+    """Start one aiohttp server per provider; returns (stand_ins, runners, base_urls)"""
+    stand_ins, runners, urls = {}, [], {}
+    for index, (name, profile) in enumerate(profiles.items()):
+        stand_in = StandIn(name, profile, seed + index)
+        app = web.Application()
+        if name == "off":
+            app.router.add_get("/api/v0/product/{barcode}.json", stand_in.open_food_facts)
+        elif name == "upcitemdb":
+            app.router.add_get("/prod/trial/lookup", stand_in.upcitemdb)
+        elif name == "barcodelookup":
+            app.router.add_get("/v3/products", stand_in.barcode_lookup)
+        else:
+            app.router.add_post("/v1/chat/completions", stand_in.chat_completions)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        stand_ins[name], urls[name] = stand_in, f"http://127.0.0.1:{port}"
+        runners.append(runner)
+    return stand_ins, runners, urls
+
+
+def import_server(urls, work_dir):
+    """Import server.py wired to the stand-ins, with no local catalog, model or label database"""
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-bench-local-stand-in",
+        "OPENAI_BASE_URL": f"{urls['llm']}/v1",
+        "OPEN_FOOD_FACTS_URL": urls["off"],
+        "UPCITEMDB_URL": urls["upcitemdb"],
+        "BARCODE_LOOKUP_URL": urls["barcodelookup"],
+        "PRODUCT_CATALOG_DB": os.path.join(work_dir, "product_catalog.db"),
+        "GTIN_INDEX_PATH": os.path.join(work_dir, "gtin_index.bin"),
+        "CATEGORY_MODEL_PATH": os.path.join(work_dir, "category_model.json"),
+        "BARCODE_DB_PATH": os.path.join(work_dir, "barcodes.db"),
+        "CACHE_WARMER_ENABLED": "false",
+    })
+    return importlib.import_module("server")
+
+
+def scenario_calls(server, name, count, rng):
+    """Zero-argument coroutine factories for one scenario"""
+    def barcode(i):
+        return f"890{rng.randrange(10 ** 9, 10 ** 10)}"
+
+    def url(i):
+        return f"https://shop{i}.example.com/item/{rng.randrange(10 ** 6)}"
+
+    def esp32(code):
+        return lambda: server.esp32_scan(server.ESP32ScanInput(deviceId="bench-esp32", barcodeData=code,
+                                                               deviceName="Robridge AI Scanner"))
+
+    if name == "fetch_product_info_cold":
+        return [lambda code=barcode(i): server.fetch_product_info(code) for i in range(count)]
+    if name == "fetch_product_info_warm":
+        hot = [barcode(i) for i in range(20)]
+        return [lambda code=hot[i % len(hot)]: server.fetch_product_info(code) for i in range(count)]
+    if name == "esp32_scan_barcode":
+        return [esp32(barcode(i)) for i in range(count)]
+    if name == "esp32_scan_url":
+        return [esp32(f"https://www.youtube.com/watch?v={i}") for i in range(count)]
+    if name == "esp32_scan_label":
+        return [esp32(f"P{i}|Bench Product {i}|Snacks|{i % 90 + 10}.00|1|2|3|CODE128") for i in range(count)]
+    if name == "scan_code_barcode":
+        return [lambda code=barcode(i): server.scan_code(server.ScanInput(scanned_value=code)) for i in range(count)]
+    if name == "scan_code_url":
+        return [lambda code=url(i): server.scan_code(server.ScanInput(scanned_value=code)) for i in range(count)]
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_scenario(server, stand_ins, name, count, concurrency, seed):
+    server.scan_cache.clear()
+    calls = scenario_calls(server, name, count, random.Random(seed))
+    before = {provider: (stand_in.calls, stand_in.errors) for provider, stand_in in stand_ins.items()}
+    timings = []
+    failures = 0
+    queue = iter(calls)
+
+    async def worker():
+        nonlocal failures
+        for call in queue:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                failures += 1
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1),
+        "latency_p50_ms": round(percentile(timings, 0.50), 2),
+        "latency_p95_ms": round(percentile(timings, 0.95), 2),
+        "latency_p99_ms": round(percentile(timings, 0.99), 2),
+        "latency_max_ms": round(timings[-1], 2),
+        "provider_calls": {provider: stand_in.calls - before[provider][0] for provider, stand_in in stand_ins.items()},
+        "provider_errors": {provider: stand_in.errors - before[provider][1] for provider, stand_in in stand_ins.items()},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'})")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in ("throughput_rps", "latency_p50_ms", "latency_p99_ms"):
+            if previous[key]:
+                changes.append(f"{key} {(current[key] - previous[key]) / previous[key] * 100:+.1f}%")
+        print(f"{name:>24}: {', '.join(changes)}")
+
+
+async def run(args, profiles):
+    stand_ins, runners, urls = await start_stand_ins(profiles, args.seed)
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            server = import_server(urls, work_dir)
+            results = {}
+            for index, name in enumerate(args.scenario or SCENARIOS):
+                results[name] = await run_scenario(server, stand_ins, name, args.requests, args.concurrency,
+                                                   args.seed + index)
+                result = results[name]
+                print(f"{name:>24}: {result['throughput_rps']:>8} req/s  p50 {result['latency_p50_ms']:>8} ms  "
+                      f"p95 {result['latency_p95_ms']:>8} ms  p99 {result['latency_p99_ms']:>8} ms  "
+                      f"failures {result['failures']}")
+            return results
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI server scan path against local provider stand-ins")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Run only these scenarios")
+    parser.add_argument("--provider", action="append", type=parse_profile, default=[],
+                        help="Provider profile override, e.g. off=latency_ms:80,error_rate:0.1,miss_rate:0.5")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Keep server logging enabled")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    profiles = {name: dict(profile) for name, profile in PROVIDERS.items()}
+    for name, overrides in args.provider:
+        profiles[name].update(overrides)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    print(f"🏁 {args.requests} requests per scenario at concurrency {args.concurrency}")
+    for name, profile in profiles.items():
+        print(f"   {name:>14}: {', '.join(f'{key}={value:g}' for key, value in profile.items())}")
+
+    results = {
+        "meta": {
+            "commit": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "providers": profiles,
+        "scenarios": asyncio.run(run(args, profiles)),
+    }
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Benchmark AI server cold starts.
+
+Each run starts from a fresh interpreter, the way a Render instance wakes up
+on the first ESP32 scan:
+
+    import     python -c "import server" wall time, plus the slowest
+               of server's direct imports from -X importtime
+    serve      uvicorn is spawned on a free port and polled; reports the time
+               to the first /health response, to /ready turning 200 and the
+               latency of the first /api/esp32/scan
+
+Runs are repeated per STARTUP_WARMUP mode (background, eager, off) and the
+median is reported, so the cost of warming up front can be weighed against
+a slower first scan.
+
+Usage: python bench_startup.py [--runs 5] [--mode background --mode eager ...] [--json startup.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MODES = ("background", "eager", "off")
+
+
+def server_env(mode):
+    env = dict(os.environ, STARTUP_WARMUP=mode, CACHE_WARMER_ENABLED="false", LOG_LEVEL="WARNING")
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    return env
+
+
+def measure_import(mode):
+    """Wall time of importing server, and its direct imports that cost the most"""
+    code = "import time; started = time.perf_counter(); import server; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=server_env(mode),
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+    # "import time: self [us] | cumulative | imported package", indented two spaces per level and
+    # printed after its children, so server's direct imports are the level-1 lines just before it
+    modules, pending = [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 0:
+            if name.strip() == "server":
+                modules = pending
+            pending = []
+        elif level == 1:
+            pending.append((name.strip(), int(cumulative) / 1000))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, modules[:8]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url, body=None, timeout=2.0):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def measure_serve(mode, timeout):
+    """Spawn uvicorn and time first /health, /ready and the first scan from process start"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+                                "--port", str(port), "--log-level", "warning"],
+                               cwd=ROOT, env=server_env(mode), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    result = {"health_ms": None, "ready_ms": None, "first_scan_ms": None}
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline and process.poll() is None:
+            if request(f"{base}/health", timeout=0.5) == 200:
+                result["health_ms"] = (time.perf_counter() - started) * 1000
+                break
+            time.sleep(0.01)
+        if result["health_ms"] is None:
+            stderr = process.stderr.read().decode("utf-8", "replace") if process.poll() is not None else ""
+            raise RuntimeError(f"server did not answer /health within {timeout}s\n{stderr[-2000:]}")
+
+        # The first scan right after the port opens is what a waking ESP32 sees
+        scan_started = time.perf_counter()
+        request(f"{base}/api/esp32/scan", {"deviceId": "bench", "barcodeData": "8901234567890",
+                                            "deviceName": "Robridge Scanner"}, timeout=timeout)
+        result["first_scan_ms"] = (time.perf_counter() - scan_started) * 1000
+
+        while time.perf_counter() < deadline:
+            if request(f"{base}/ready", timeout=0.5) == 200:
+                result["ready_ms"] = (time.perf_counter() - started) * 1000
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return result
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI server import time and time to first response")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode")
+    parser.add_argument("--mode", action="append", choices=MODES, help="STARTUP_WARMUP modes to run (default: all)")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the server to come up")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "commit": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "modes": {},
+    }
+
+    for mode in args.mode or MODES:
+        print(f"🥶 {mode}: {args.runs} cold starts")
+        imports, serves, modules = [], [], None
+        for _ in range(args.runs):
+            import_ms, modules = measure_import(mode)
+            imports.append(import_ms)
+            serves.append(measure_serve(mode, args.timeout))
+        summary = {
+            "import_ms": median(imports),
+            "health_ms": median([serve["health_ms"] for serve in serves]),
+            "ready_ms": median([serve["ready_ms"] for serve in serves]),
+            "first_scan_ms": median([serve["first_scan_ms"] for serve in serves]),
+            "slowest_imports_ms": {name: round(ms, 1) for name, ms in modules},
+        }
+        results["modes"][mode] = summary
+        print(f"   import {summary['import_ms']} ms | /health {summary['health_ms']} ms | "
+              f"/ready {summary['ready_ms']} ms | first scan {summary['first_scan_ms']} ms")
+        print(f"   slowest imports: {', '.join(f'{name} {ms:.0f} ms' for name, ms in modules[:5])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Build the fine-tuning dataset from the scans database.
+
+Rows are streamed from the barcodes table in id order (fetchmany batches on
+SQLite, a server-side named cursor on the bridge's PostgreSQL database), so
+memory stays flat however large the table is. Each row is deduplicated
+against a persistent set of content hashes, assigned to train or test by a
+hash of its barcode (the same barcode never lands on both sides) and written
+to size-capped CSV or JSONL shards.
+
+The highest exported id is kept as a high-water mark in the state database
+next to the shards; the next run only reads rows above it, so nightly
+rebuilds cost time proportional to the new rows. --full starts over.
+
+Settings are read from the "dataset" section of pipeline_config.json, the
+split from evaluation.test_size. The top-level data_path that training reads
+points at the same directory; manifest.json there lists the shards per split.
+
+Usage:
+    python build_dataset.py [--config pipeline_config.json] [--full]
+    python build_dataset.py --database-url postgres://...   # Node bridge database
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+FIELDS = ("id", "barcode", "barcode_type", "source", "product_name", "product_id",
+          "category", "price", "created_at", "prompt", "response")
+SOURCE_COLUMNS = ("id", "barcode_data", "barcode_type", "source", "product_name", "product_id",
+                  "category", "price", "created_at")
+# Placeholders the scanners store when nothing was identified
+UNKNOWN_NAMES = ("", "unknown", "unknown product", "n/a")
+
+
+def load_settings(config_path):
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    settings = dict(config["dataset"])
+    settings["test_size"] = config.get("evaluation", {}).get("test_size", 0.2)
+    return settings
+
+
+def stream_sqlite_rows(db_path, after_id, batch_size):
+    """Yield barcodes rows with id > after_id, batch_size rows at a time"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(f'''
+            SELECT {", ".join(SOURCE_COLUMNS)}
+            FROM barcodes
+            WHERE id > ?
+            ORDER BY id
+        ''', (after_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def stream_postgres_rows(database_url, after_id, batch_size):
+    """Same as stream_sqlite_rows, through a server-side cursor on the bridge database"""
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit("❌ psycopg2 is required for --database-url (pip install psycopg2-binary)")
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor(name="dataset_export") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(f'''
+                SELECT {", ".join(SOURCE_COLUMNS)}
+                FROM barcodes
+                WHERE id > %s
+                ORDER BY id
+            ''', (after_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    finally:
+        conn.close()
+
+
+def to_example(row):
+    """Dataset record for a barcodes row, or None if the scan was never identified"""
+    record = dict(zip(SOURCE_COLUMNS, row))
+    barcode = (record["barcode_data"] or "").strip()
+    product_name = (record["product_name"] or "").strip()
+    if not barcode or product_name.lower() in UNKNOWN_NAMES:
+        return None
+
+    category = (record["category"] or "").strip()
+    if category.lower() in UNKNOWN_NAMES:
+        category = ""
+    price = record["price"] or None
+    response = f"Product: {product_name}\nCategory: {category or 'Unknown'}"
+    if price:
+        response += f"\nPrice: {price}"
+
+    return {
+        "id": record["id"],
+        "barcode": barcode,
+        "barcode_type": record["barcode_type"] or "",
+        "source": record["source"] or "",
+        "product_name": product_name,
+        "product_id": record["product_id"] or "",
+        "category": category,
+        "price": price,
+        "created_at": str(record["created_at"] or ""),
+        "prompt": f"Identify the product for barcode {barcode}",
+        "response": response,
+    }
+
+
+def content_hash(example):
+    """Identity used for deduplication: the same barcode with the same answer"""
+    key = "\x1f".join((example["barcode"], example["product_name"].lower(), example["category"].lower()))
+    return hashlib.sha1(key.encode("utf-8")).digest()[:12]
+
+
+def split_for(barcode, test_size):
+    """Deterministic split by barcode hash"""
+    return "test" if zlib.crc32(barcode.encode("utf-8")) % 1000 < int(test_size * 1000) else "train"
+
+
+class ShardWriter:
+    """
+    Writes one split into numbered shards of at most shard_size records.
+
+    Shards are written under a .tmp name and only renamed into place by
+    commit(), so an interrupted run never leaves half-written shards behind.
+    """
+
+    def __init__(self, output_dir, split, fmt, shard_size, next_shard):
+        self.output_dir = output_dir
+        self.split = split
+        self.fmt = fmt
+        self.shard_size = shard_size
+        self.next_shard = next_shard
+        self.written = []
+        self._file = None
+        self._writer = None
+        self._count = 0
+
+    def _open(self):
+        path = os.path.join(self.output_dir, f"{self.split}-{self.next_shard:05d}.{self.fmt}")
+        self.next_shard += 1
+        self._file = open(f"{path}.tmp", "w", encoding="utf-8", newline="")
+        if self.fmt == "csv":
+            self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+            self._writer.writeheader()
+        self.written.append([path, 0])
+        self._count = 0
+
+    def _close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def write(self, example):
+        if self._file is None or self._count >= self.shard_size:
+            self._close()
+            self._open()
+        if self.fmt == "csv":
+            self._writer.writerow(example)
+        else:
+            self._file.write(json.dumps(example, ensure_ascii=False) + "\n")
+        self._count += 1
+        self.written[-1][1] += 1
+
+    def commit(self):
+        self._close()
+        for path, _count in self.written:
+            os.replace(f"{path}.tmp", path)
+
+
+class DatasetState:
+    """Seen content hashes, high-water mark and shard counters in a small SQLite file"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS seen (hash BLOB PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS shards (path TEXT PRIMARY KEY, split TEXT, records INTEGER, created_at REAL);
+        ''')
+
+    def get(self, key, default):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def add_seen(self, digest):
+        """Record digest; False if it was already exported"""
+        return self.conn.execute("INSERT OR IGNORE INTO seen (hash) VALUES (?)", (digest,)).rowcount == 1
+
+    def shards(self):
+        return self.conn.execute("SELECT path, split, records FROM shards ORDER BY path").fetchall()
+
+
+def reset_output(output_dir):
+    for path in glob.glob(os.path.join(output_dir, "*-[0-9][0-9][0-9][0-9][0-9].*")):
+        os.remove(path)
+    state_path = os.path.join(output_dir, "dataset_state.db")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+
+def build(settings, database_url=None, full=False):
+    """Export rows above the high-water mark; returns a summary dict"""
+    started = time.perf_counter()
+    output_dir = settings["output_dir"]
+    fmt = settings.get("format", "csv")
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported dataset format: {fmt}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    if full:
+        reset_output(output_dir)
+    for leftover in glob.glob(os.path.join(output_dir, "*.tmp")):
+        os.remove(leftover)
+
+    state = DatasetState(os.path.join(output_dir, "dataset_state.db"))
+    high_water = state.get("high_water", 0)
+    writers = {
+        split: ShardWriter(output_dir, split, fmt, settings.get("shard_size", 50000), state.get(f"next_{split}_shard", 0))
+        for split in ("train", "test")
+    }
+
+    batch_size = settings.get("batch_size", 5000)
+    if database_url:
+        rows = stream_postgres_rows(database_url, high_water, batch_size)
+    else:
+        rows = stream_sqlite_rows(settings["source_db_path"], high_water, batch_size)
+
+    scanned = skipped = duplicates = 0
+    for row in rows:
+        scanned += 1
+        high_water = max(high_water, row[0])
+        example = to_example(row)
+        if example is None:
+            skipped += 1
+            continue
+        if not state.add_seen(content_hash(example)):
+            duplicates += 1
+            continue
+        writers[split_for(example["barcode"], settings["test_size"])].write(example)
+
+    # Shards first, then the state that points past them, in one transaction
+    for split, writer in writers.items():
+        writer.commit()
+        state.set(f"next_{split}_shard", writer.next_shard)
+        state.conn.executemany(
+            "INSERT OR REPLACE INTO shards (path, split, records, created_at) VALUES (?, ?, ?, ?)",
+            [(os.path.basename(path), split, count, time.time()) for path, count in writer.written])
+    state.set("high_water", high_water)
+    state.conn.commit()
+
+    manifest = {
+        "format": fmt,
+        "fields": list(FIELDS),
+        "test_size": settings["test_size"],
+        "high_water": high_water,
+        "shards": [{"path": path, "split": split, "records": records} for path, split, records in state.shards()],
+    }
+    with open(os.path.join(output_dir, "manifest.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(output_dir, "manifest.json.tmp"), os.path.join(output_dir, "manifest.json"))
+    state.conn.close()
+
+    return {
+        "scanned": scanned,
+        "written": {split: sum(count for _path, count in writer.written) for split, writer in writers.items()},
+        "duplicates": duplicates,
+        "skipped": skipped,
+        "high_water": high_water,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fine-tuning dataset from the scans database")
+    parser.add_argument("--config", default="pipeline_config.json")
+    parser.add_argument("--database-url", default=None,
+                        help="Read from the bridge PostgreSQL database instead of barcodes.db")
+    parser.add_argument("--full", action="store_true", help="Discard previous shards and rebuild from scratch")
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    result = build(settings, args.database_url, args.full)
+    print(f"📦 Scanned {result['scanned']} new rows up to id {result['high_water']} in {result['seconds']}s")
+    print(f"✅ Wrote {result['written']['train']} train / {result['written']['test']} test records "
+          f"({result['duplicates']} duplicates, {result['skipped']} unidentified skipped)")
+    print(f"📁 Shards and manifest in {settings['output_dir']}")
+
+
+if __name__ == "__main__":
+    main()
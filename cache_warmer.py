@@ -0,0 +1,215 @@
+"""
+Scan-frequency-driven cache warming for the AI server.
+
+Every scan bumps an exponentially decayed counter for its key. A background
+task periodically refreshes the hottest keys whose cached entries are missing
+or about to expire, paced by a rate cap and paused while live traffic is busy,
+so the first scan after a deploy or TTL expiry is served from cache. Keys whose
+decayed score has fallen below a floor are no longer refreshed, so a code
+scanned once long ago does not cost an upstream (or LLM) call every cycle.
+"""
+
+import asyncio
+import heapq
+import math
+import time
+
+from service_logging import get_logger
+
+logger = get_logger("cache")
+
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry and hit accounting.
+
+    `ttl_for(value)`, when given, picks each value's TTL instead of `ttl`; a
+    falsy result means the value is not cached and any entry already there is
+    kept.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000, ttl_for=None):
+        self.ttl = ttl
+        self.ttl_for = ttl_for
+        self.max_entries = max_entries
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.warmed_hits = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry[2]:
+            self.warmed_hits += 1
+        return entry[0]
+
+    def set(self, key, value, warmed: bool = False):
+        ttl = self.ttl_for(value) if self.ttl_for is not None else self.ttl
+        if not ttl:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic() + ttl, warmed)
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        self._entries.clear()
+
+    def expires_in(self, key):
+        """Seconds until key expires, or None when it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1] - time.monotonic()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DecayedCounter:
+    """Per-key scan frequency that halves every half_life seconds without new scans."""
+
+    def __init__(self, half_life: float = 3600, max_keys: int = 5000):
+        self.decay = math.log(2) / half_life
+        self.max_keys = max_keys
+        self._scores = {}
+
+    def _current(self, score, updated_at, now):
+        return score * math.exp(-self.decay * (now - updated_at))
+
+    def record(self, key, weight: float = 1.0):
+        now = time.monotonic()
+        score, updated_at = self._scores.get(key, (0.0, now))
+        self._scores[key] = (self._current(score, updated_at, now) + weight, now)
+        if len(self._scores) > self.max_keys * 2:
+            self._prune(now)
+
+    def _prune(self, now):
+        keep = self.top(self.max_keys, now)
+        self._scores = {key: (score, now) for key, score in keep}
+
+    def top(self, n: int, now: float = None) -> list:
+        """Return the n hottest (key, decayed score) pairs."""
+        now = time.monotonic() if now is None else now
+        return heapq.nlargest(
+            n,
+            ((key, self._current(score, updated_at, now)) for key, (score, updated_at) in self._scores.items()),
+            key=lambda item: item[1],
+        )
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class CacheWarmer:
+    """
+    Keeps the top-N scanned keys fresh in a TTLCache.
+
+    `refreshers` maps a key kind (e.g. "barcode", "url") to an async function
+    that fetches the value for that key from upstream; keys are (kind, value)
+    tuples. `is_busy()` is polled before every refresh so warming yields to
+    live traffic. Only keys with a decayed score of at least `min_score` count
+    as hot (1.0 is a single scan right now).
+    """
+
+    def __init__(self, cache: TTLCache, refreshers: dict, top_n: int = 50, interval: float = 60,
+                 refresh_ahead: float = 300, max_per_second: float = 1.0, is_busy=None,
+                 counter: DecayedCounter = None, min_score: float = 1.5):
+        self.cache = cache
+        self.refreshers = refreshers
+        self.top_n = top_n
+        self.min_score = min_score
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.min_spacing = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self.is_busy = is_busy or (lambda: False)
+        self.counter = counter or DecayedCounter()
+        self._task = None
+        self.cycles = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.skipped_busy = 0
+        self.refresh_seconds = 0.0
+
+    def record(self, kind: str, key: str):
+        """Count one live scan of key."""
+        self.counter.record((kind, key))
+
+    def hot_keys(self) -> list:
+        """Top-N keys whose decayed score is still above the floor."""
+        return [key for key, score in self.counter.top(self.top_n) if score >= self.min_score]
+
+    def _due(self, key) -> bool:
+        expires_in = self.cache.expires_in(key)
+        return expires_in is None or expires_in < self.refresh_ahead
+
+    async def warm_once(self):
+        """Refresh every top-N key that is missing or close to expiry."""
+        self.cycles += 1
+        for key in self.hot_keys():
+            if not self._due(key):
+                continue
+            if self.is_busy():
+                self.skipped_busy += 1
+                return
+            kind, value = key
+            refresh = self.refreshers.get(kind)
+            if refresh is None:
+                continue
+
+            started = time.perf_counter()
+            try:
+                self.cache.set(key, await refresh(value), warmed=True)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning("Cache warmer failed to refresh %s %s: %s", kind, value, e, extra={"kind": kind})
+            self.refresh_seconds += time.perf_counter() - started
+
+            if self.min_spacing:
+                await asyncio.sleep(self.min_spacing)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.warm_once()
+            except Exception as e:
+                logger.error("Cache warmer cycle failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        """Coverage of the hot set and estimated upstream time saved by warmed hits."""
+        hot_keys = self.hot_keys()
+        fresh = sum(1 for key in hot_keys if (self.cache.expires_in(key) or 0) > 0)
+        avg_refresh = self.refresh_seconds / self.refreshes if self.refreshes else 0.0
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "tracked_keys": len(self.counter),
+            "cached_entries": len(self.cache),
+            "hot_keys": len(hot_keys),
+            "hot_keys_cached": fresh,
+            "coverage": round(fresh / len(hot_keys), 4) if hot_keys else 0.0,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "hit_rate": round(self.cache.hits / lookups, 4) if lookups else 0.0,
+            "warmed_hits": self.cache.warmed_hits,
+            "cycles": self.cycles,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "skipped_busy": self.skipped_busy,
+            "avg_refresh_ms": round(avg_refresh * 1000, 2),
+            "estimated_seconds_saved": round(self.cache.warmed_hits * avg_refresh, 3),
+        }
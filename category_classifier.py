@@ -0,0 +1,336 @@
+"""
+Lightweight local category classifier.
+
+Hashed word and character n-gram features feed a multinomial logistic
+regression, so predicting a category (plus a title template) for a URL or
+product name is a handful of dict lookups and additions on the CPU, with no
+dependencies beyond the standard library. The model is trained offline by
+train_category_classifier.py and loaded lazily on first use; the LLM is only
+asked when the classifier is not confident enough.
+
+Next to the JSON model a compiled copy (same name, .bin) is kept so a cold
+server loads it with a few array reads instead of parsing JSON:
+
+    header   "RCCM" u16 format, u16 class_count, u32 buckets, u32 row_count, u32 meta_length
+    meta     utf-8 JSON {"classes", "bias", "templates", "examples"}
+    keys     row_count x u32, sorted buckets
+    weights  row_count x class_count x f32
+
+Training is pure-Python SGD, so its cost is linear in examples x epochs x
+classes: roughly 40 us + 5 us per class for each example and epoch on a
+laptop core, i.e. about 8 minutes for 200k catalog rows, 8 epochs and 50
+classes. The model keeps one weight per class for every bucket seen (up to
+`buckets`, 262144), so its size grows the same way: about class_count x 4
+bytes per row compiled and 2.5 times that as JSON, i.e. up to ~52 MB
+compiled and ~130 MB of JSON at 50 classes once every bucket is used.
+train() therefore keeps only the max_classes most frequent categories and
+folds the rest into OTHER_CATEGORY, which is never returned as a confident
+prediction.
+"""
+
+import array
+import bisect
+import json
+import math
+import os
+import random
+import re
+import struct
+import sys
+import zlib
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Barcode generator&Scanner"))
+
+from service_logging import get_logger
+
+logger = get_logger("classifier")
+
+DEFAULT_BUCKETS = 1 << 18
+DEFAULT_TITLE_TEMPLATE = "{site}"
+DEFAULT_MAX_CLASSES = 50
+OTHER_CATEGORY = "Other"
+
+COMPILED_MAGIC = b"RCCM"
+COMPILED_FORMAT = 1
+COMPILED_HEADER = struct.Struct("<4sHHIII")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def site_name(text: str) -> str:
+    """Readable site/brand name for a URL (e.g. 'Github'), or the text itself."""
+    if not text.startswith(("http://", "https://", "www.")):
+        return text.strip()
+    parsed = urlparse(text if "://" in text else f"http://{text}")
+    domain = parsed.netloc.lower().split(":")[0]
+    if domain.startswith("www."):
+        domain = domain[4:]
+    parts = domain.split(".")
+    stem = parts[-2] if len(parts) >= 2 else parts[0]
+    return stem.capitalize()
+
+
+def extract_features(text: str, buckets: int = DEFAULT_BUCKETS) -> dict:
+    """Map text to {bucket: weight} using hashed words, word bigrams and char trigrams."""
+    text = text.lower()
+    if text.startswith(("http://", "https://", "www.")):
+        parsed = urlparse(text if "://" in text else f"http://{text}")
+        domain = parsed.netloc.split(":")[0]
+        words = _WORD.findall(domain) + _WORD.findall(parsed.path)
+        tokens = [f"d={part}" for part in _WORD.findall(domain)] + ["is_url"]
+    else:
+        words = _WORD.findall(text)
+        tokens = ["is_text"]
+
+    tokens += [f"w={word}" for word in words]
+    tokens += [f"b={first}_{second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        tokens += [f"c={padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    features = defaultdict(float)
+    for token in tokens:
+        features[zlib.crc32(token.encode("utf-8")) % buckets] += 1.0
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {bucket: value / norm for bucket, value in features.items()}
+
+
+def title_template(text: str, title: str) -> str:
+    """Generalize an example title by replacing the site/product name with placeholders."""
+    if not title:
+        return DEFAULT_TITLE_TEMPLATE
+    site = site_name(text)
+    if site and site.lower() in title.lower():
+        return re.sub(re.escape(site), "{site}", title, count=1, flags=re.IGNORECASE)
+    return "{site}"
+
+
+def compiled_path(model_path: str) -> str:
+    return f"{os.path.splitext(model_path)[0]}.bin"
+
+
+class _CompiledWeights:
+    """bucket -> weight row over the sorted key array of a compiled model"""
+
+    def __init__(self, keys, weights, class_count):
+        self.keys = keys
+        self.weights = weights
+        self.class_count = class_count
+
+    def get(self, bucket):
+        index = bisect.bisect_left(self.keys, bucket)
+        if index < len(self.keys) and self.keys[index] == bucket:
+            return self.weights[index * self.class_count:(index + 1) * self.class_count]
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def compile_model(model: dict, path: str):
+    """Write the compact binary form of a trained model (see the module docstring)"""
+    buckets = sorted(int(bucket) for bucket in model["weights"])
+    class_count = len(model["classes"])
+    keys = array.array("I", buckets)
+    weights = array.array("f")
+    for bucket in buckets:
+        row = model["weights"].get(bucket)
+        weights.extend(row if row is not None else model["weights"][str(bucket)])
+    meta = json.dumps({key: model[key] for key in ("classes", "bias", "templates", "examples") if key in model},
+                      separators=(",", ":")).encode("utf-8")
+    if sys.byteorder != "little":
+        keys.byteswap()
+        weights.byteswap()
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_FORMAT, class_count, model["buckets"], len(keys), len(meta)))
+        f.write(meta)
+        f.write(keys.tobytes())
+        f.write(weights.tobytes())
+    os.replace(temp_path, path)
+
+
+def load_compiled_model(path: str) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, fmt, class_count, buckets, row_count, meta_length = COMPILED_HEADER.unpack_from(data)
+    if magic != COMPILED_MAGIC or fmt != COMPILED_FORMAT:
+        raise ValueError(f"{path} is not a compiled category model")
+    offset = COMPILED_HEADER.size
+    model = json.loads(data[offset:offset + meta_length])
+    offset += meta_length
+    keys = array.array("I")
+    keys.frombytes(data[offset:offset + row_count * 4])
+    offset += row_count * 4
+    weights = array.array("f")
+    weights.frombytes(data[offset:offset + row_count * class_count * 4])
+    if sys.byteorder != "little":
+        keys.byteswap()
+        weights.byteswap()
+    model["buckets"] = buckets
+    model["weights"] = _CompiledWeights(keys, weights, class_count)
+    return model
+
+
+class CategoryClassifier:
+    """
+    Hashed n-gram multinomial logistic regression.
+
+    `predict(text)` returns {"category", "confidence", "title"} or None when no
+    model file exists; the model is read from model_path on the first call.
+    """
+
+    def __init__(self, model_path: str = "category_model.json", min_confidence: float = 0.7):
+        self.model_path = model_path
+        self.min_confidence = min_confidence
+        self._model = None
+        self._loaded = False
+
+    def _load(self):
+        self._loaded = True
+        binary_path = compiled_path(self.model_path)
+        json_mtime = os.path.getmtime(self.model_path) if os.path.exists(self.model_path) else None
+        if os.path.exists(binary_path) and (json_mtime is None or os.path.getmtime(binary_path) >= json_mtime):
+            try:
+                self._model = load_compiled_model(binary_path)
+                logger.info("Loaded compiled category model with %d classes from %s", len(self._model["classes"]), binary_path)
+                return
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring compiled category model %s: %s", binary_path, e)
+        if json_mtime is None:
+            logger.info("No category model at %s; classifier disabled", self.model_path)
+            return
+        with open(self.model_path, encoding="utf-8") as f:
+            model = json.load(f)
+        model["weights"] = {int(bucket): weights for bucket, weights in model["weights"].items()}
+        self._model = model
+        logger.info("Loaded category model with %d classes from %s", len(model["classes"]), self.model_path)
+        try:
+            # Compile once so the next cold start skips JSON parsing
+            compile_model(model, binary_path)
+        except OSError as e:
+            logger.warning("Could not write compiled category model %s: %s", binary_path, e)
+
+    def load(self):
+        """Load the model now instead of on the first prediction (startup warm-up)"""
+        return self.model is not None
+
+    @property
+    def model(self):
+        if not self._loaded:
+            self._load()
+        return self._model
+
+    def predict(self, text: str):
+        model = self.model
+        if model is None or not text:
+            return None
+
+        classes = model["classes"]
+        scores = list(model["bias"])
+        weights = model["weights"]
+        for bucket, value in extract_features(text, model["buckets"]).items():
+            row = weights.get(bucket)
+            if row is not None:
+                for index, weight in enumerate(row):
+                    scores[index] += weight * value
+
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        confidence = 1.0 / sum(math.exp(score - top) for score in scores)
+        category = classes[best]
+        template = model["templates"].get(category, DEFAULT_TITLE_TEMPLATE)
+        return {
+            "category": category,
+            "confidence": confidence,
+            "title": template.replace("{site}", site_name(text)),
+        }
+
+    def predict_confident(self, text: str):
+        """Prediction if it clears min_confidence, otherwise None."""
+        prediction = self.predict(text)
+        if (prediction is not None and prediction["confidence"] >= self.min_confidence
+                and prediction["category"] != OTHER_CATEGORY):
+            return prediction
+        return None
+
+
+def train(examples, buckets: int = DEFAULT_BUCKETS, epochs: int = 8, learning_rate: float = 0.5,
+          l2: float = 1e-6, min_class_examples: int = 2, max_classes: int = DEFAULT_MAX_CLASSES,
+          seed: int = 13) -> dict:
+    """
+    Train a model from (text, category, title) examples with plain SGD.
+
+    Classes with fewer than min_class_examples examples are dropped. Beyond
+    max_classes (None for no cap), only the max_classes - 1 most frequent
+    categories are kept and the rest are trained as OTHER_CATEGORY. Returns
+    the model dict that CategoryClassifier loads.
+    """
+    examples = [example for example in examples if example[0] and example[1]]
+    class_counts = Counter(category for _text, category, _title in examples)
+    kept = [(category, count) for category, count in class_counts.most_common() if count >= min_class_examples]
+    if max_classes and len(kept) > max_classes:
+        head = {category for category, _count in kept[:max_classes - 1]}
+        examples = [(text, category if category in head else OTHER_CATEGORY, title)
+                    for text, category, title in examples]
+        kept = [(category, 0) for category in head | {OTHER_CATEGORY}]
+    classes = sorted(category for category, _count in kept)
+    class_index = {category: index for index, category in enumerate(classes)}
+    dataset = [(extract_features(text, buckets), class_index[category])
+               for text, category, _title in examples if category in class_index]
+    if len(classes) < 2 or not dataset:
+        raise ValueError("Need labelled examples for at least two categories to train a category model")
+
+    templates = defaultdict(Counter)
+    for text, category, title in examples:
+        if category in class_index:
+            templates[category][title_template(text, title)] += 1
+
+    n_classes = len(classes)
+    weights = {}
+    bias = [0.0] * n_classes
+    rng = random.Random(seed)
+
+    for epoch in range(epochs):
+        rng.shuffle(dataset)
+        rate = learning_rate / (1 + epoch)
+        for features, target in dataset:
+            scores = list(bias)
+            for bucket, value in features.items():
+                row = weights.get(bucket)
+                if row is not None:
+                    for index in range(n_classes):
+                        scores[index] += row[index] * value
+            top = max(scores)
+            exps = [math.exp(score - top) for score in scores]
+            total = sum(exps)
+            gradient = [exp / total for exp in exps]
+            gradient[target] -= 1.0
+
+            for index in range(n_classes):
+                bias[index] -= rate * gradient[index]
+            for bucket, value in features.items():
+                row = weights.setdefault(bucket, [0.0] * n_classes)
+                for index in range(n_classes):
+                    row[index] -= rate * (gradient[index] * value + l2 * row[index])
+
+    return {
+        "version": 1,
+        "buckets": buckets,
+        "classes": classes,
+        "bias": [round(value, 6) for value in bias],
+        "weights": {str(bucket): [round(value, 6) for value in row] for bucket, row in weights.items()},
+        "templates": {category: counter.most_common(1)[0][0] for category, counter in templates.items()},
+        "examples": len(dataset),
+    }
+
+
+def save_model(model: dict, path: str):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(model, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+    compile_model(model, compiled_path(path))
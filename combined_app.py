@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Robridge Combined ASGI App
+Serves the AI server and the barcode analyzer from one process, for small
+deployments where running two uvicorn processes (and two copies of the
+shared scan classifier, label resolver and HTTP clients) is wasteful.
+
+    /            AI server (server.py) routes, unchanged
+    /analyzer/   barcode analyzer (barcode_analyzer.py) routes, e.g. /analyzer/analyze
+
+Both apps keep their own startup/shutdown hooks; they are run by the
+combined lifespan. The Node bridge only calls the AI server, so its
+AI_SERVER_URL stays http://<host>:<port>; clients of the standalone
+analyzer (port 5001) use http://<host>:<port>/analyzer instead. Both apps
+find barcodes.db next to the service code (or at BARCODE_DB_PATH), whatever
+directory this is started from.
+
+Usage: uvicorn combined_app:app --host 0.0.0.0 --port 8000
+"""
+
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+import server  # puts the barcode service directory on sys.path
+import barcode_analyzer
+from service_logging import configure_logging
+
+# Each service configured logging under its own name on import; records from both go out as one service here
+configure_logging("robridge_combined")
+
+SERVICES = (server.app, barcode_analyzer.app)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    async with AsyncExitStack() as stack:
+        for service in SERVICES:
+            await stack.enter_async_context(service.router.lifespan_context(service))
+        yield
+
+
+app = Starlette(
+    routes=[
+        Mount("/analyzer", app=barcode_analyzer.app),
+        Mount("/", app=server.app),
+    ],
+    lifespan=lifespan,
+)
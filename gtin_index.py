@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, read-only GTIN index shared by all AI server workers.
+
+The index is one file built from the local product catalog:
+
+    header   "RGIX" u16 format, u16 field_count, u64 count,
+             u64 keys_offset, u64 offsets_offset, u64 blob_offset
+    keys     count x u64, sorted GTINs (fixed width, 8-byte aligned)
+    offsets  (count + 1) x u64, record boundaries inside blob
+    blob     utf-8 records, fields separated by \\x1f
+
+Workers mmap the file instead of loading products into dicts, so every
+process shares the same page cache with zero copies and startup only costs an
+mmap call. Lookups binary-search the key array in place.
+
+New index files are written next to the live one and swapped in with an
+atomic rename; readers notice the new inode and remap on their next lookup.
+
+Usage:
+    python gtin_index.py build [--db product_catalog.db] [--out gtin_index.bin]
+    python gtin_index.py lookup 8901234567890 [--index gtin_index.bin]
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+
+from product_catalog import DEFAULT_DB_PATH, normalize_gtin
+
+DEFAULT_INDEX_PATH = os.getenv("GTIN_INDEX_PATH", "gtin_index.bin")
+
+MAGIC = b"RGIX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHQQQQ")
+FIELDS = ("product_name", "brand", "category", "description", "image_url")
+SEPARATOR = "\x1f"
+
+
+def build_index(db_path: str = DEFAULT_DB_PATH, out_path: str = DEFAULT_INDEX_PATH) -> dict:
+    """
+    Stream the catalog store (already in GTIN order) into a new index file
+    and atomically replace out_path with it.
+    """
+    started = time.perf_counter()
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    with tempfile.TemporaryFile() as keys, tempfile.TemporaryFile() as offsets, tempfile.TemporaryFile() as blob:
+        pack_u64 = struct.Struct("<Q").pack
+        count = blob_size = 0
+        cursor = conn.execute(f"SELECT gtin, {', '.join(FIELDS)} FROM products ORDER BY gtin")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                record = SEPARATOR.join(value or "" for value in row[1:]).encode("utf-8")
+                keys.write(pack_u64(int(row[0])))
+                offsets.write(pack_u64(blob_size))
+                blob.write(record)
+                blob_size += len(record)
+                count += 1
+        offsets.write(pack_u64(blob_size))
+        conn.close()
+
+        keys_offset = HEADER.size
+        offsets_offset = keys_offset + count * 8
+        blob_offset = offsets_offset + (count + 1) * 8
+
+        fd, temp_path = tempfile.mkstemp(prefix=".gtin_index-", suffix=".tmp", dir=out_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(FIELDS), count, keys_offset, offsets_offset, blob_offset))
+                for part in (keys, offsets, blob):
+                    part.seek(0)
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, out_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return {
+        "records": count,
+        "size": os.path.getsize(out_path),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class GTINIndex:
+    """
+    Zero-copy reader for an index file.
+
+    The file is re-checked at most every check_interval seconds; when a new
+    index has been swapped in, the next lookup maps it and old mappings are
+    released once nothing references them.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._identity = None
+        self._checked_at = None
+        self._mapped = None
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, field_count, count, keys_offset, offsets_offset, blob_offset = HEADER.unpack_from(mm)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            mm.close()
+            raise ValueError(f"{self.path} is not a GTIN index")
+
+        view = memoryview(mm)
+        if sys.byteorder == "little":
+            keys = view[keys_offset:offsets_offset].cast("Q")
+            offsets = view[offsets_offset:blob_offset].cast("Q")
+        else:
+            keys = _UnpackedArray(mm, keys_offset, count)
+            offsets = _UnpackedArray(mm, offsets_offset, count + 1)
+        return {"mm": mm, "keys": keys, "offsets": offsets, "blob_offset": blob_offset, "count": count}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._mapped, self._identity = None, None
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity != self._identity:
+            self._mapped = self._open()
+            self._identity = identity
+
+    def available(self) -> bool:
+        self._refresh()
+        return self._mapped is not None
+
+    def __len__(self):
+        return self._mapped["count"] if self.available() else 0
+
+    def lookup(self, barcode: str):
+        """Return product info in fetch_product_info's shape, or None on a miss."""
+        gtin = normalize_gtin(barcode)
+        if gtin is None or not self.available():
+            return None
+
+        mapped = self._mapped
+        keys = mapped["keys"]
+        key = int(gtin)
+        position = bisect.bisect_left(keys, key)
+        if position == len(keys) or keys[position] != key:
+            return None
+
+        start = mapped["blob_offset"] + mapped["offsets"][position]
+        end = mapped["blob_offset"] + mapped["offsets"][position + 1]
+        values = mapped["mm"][start:end].decode("utf-8").split(SEPARATOR)
+        product_info = {"found": True}
+        product_info.update((field, value or None) for field, value in zip(FIELDS, values))
+        return product_info
+
+
+class _UnpackedArray:
+    """Sequence of little-endian u64 values for big-endian hosts."""
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return struct.unpack_from("<Q", self._buffer, self._offset + index * 8)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Robridge memory-mapped GTIN index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Build the index from the product catalog")
+    build_parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    build_parser.add_argument("--out", default=DEFAULT_INDEX_PATH)
+
+    lookup_parser = commands.add_parser("lookup", help="Look up one barcode")
+    lookup_parser.add_argument("barcode")
+    lookup_parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        result = build_index(args.db, args.out)
+        print(f"✅ Built {args.out}: {result['records']} records, {result['size'] / 1024 / 1024:.1f} MB in {result['seconds']}s")
+    else:
+        print(json.dumps(GTINIndex(args.index).lookup(args.barcode), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Micro-batching layer for QR link descriptions.
+
+Pending URL description requests are collected for a few milliseconds (or
+until max_batch items are waiting) and sent to the LLM as one structured
+multi-item prompt. The JSON answer is split and validated per URL; any item
+that is missing or malformed falls back to a single-URL call.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from service_logging import get_logger
+
+logger = get_logger("llm")
+
+BATCH_SYSTEM_PROMPT = (
+    "You describe QR links accurately and consistently without extra commentary. "
+    "Always answer with valid JSON only."
+)
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def format_qr_info(url: str, title: str, category: str, description: str) -> str:
+    """Render one item in the same text format generate_qr_info returns."""
+    return f"Scanned Code: {url}\nTitle: {title}\nCategory: {category}\nDescription: {description}"
+
+
+def build_batch_prompt(urls: list) -> str:
+    """Build one prompt asking for a description of every URL in the batch."""
+    lines = [f'{index}. {url}' for index, url in enumerate(urls)]
+    return (
+        "Each of the following QR codes contains a link. For every link, identify what it "
+        "represents, e.g. an organization, person, or brand.\n\n"
+        + "\n".join(lines)
+        + "\n\nReturn a JSON array with exactly one object per link, in any order:\n"
+        '[{"id": <number from the list>, "url": "<link>", "title": "<Name or Brand>", '
+        '"category": "<Type - Website, Person, Organization, Social Media>", '
+        '"description": "<5-6 factual and descriptive sentences about the entity, its purpose, '
+        'reputation, and what a visitor would find or do on that link>"}]'
+    )
+
+
+def parse_batch_response(text: str, urls: list) -> dict:
+    """
+    Split a batch answer into {url: formatted description}.
+
+    Only items that reference a requested URL (by id or by url) and carry a
+    non-empty title, category and description are returned; callers treat
+    every URL missing from the result as a parse failure.
+    """
+    try:
+        payload = json.loads(_CODE_FENCE.sub("", text.strip()))
+    except (ValueError, AttributeError):
+        return {}
+
+    if isinstance(payload, dict):
+        payload = payload.get("items") or payload.get("results") or []
+    if not isinstance(payload, list):
+        return {}
+
+    results = {}
+    for item in payload:
+        if not isinstance(item, dict):
+            continue
+
+        url = None
+        item_id = item.get("id")
+        if isinstance(item_id, int) and 0 <= item_id < len(urls):
+            url = urls[item_id]
+        elif item.get("url") in urls:
+            url = item["url"]
+        if url is None or url in results:
+            continue
+
+        fields = [item.get("title"), item.get("category"), item.get("description")]
+        if not all(isinstance(field, str) and field.strip() for field in fields):
+            continue
+
+        title, category, description = (field.strip() for field in fields)
+        results[url] = format_qr_info(url, title, category, description)
+
+    return results
+
+
+class QRDescriptionBatcher:
+    """
+    Coalesces concurrent QR description requests into batched LLM calls.
+
+    `complete(messages) -> str` performs one chat completion and `single(url) -> str`
+    describes one URL on its own. Both are blocking and run in worker threads so
+    the event loop keeps serving scans while the LLM answers. The optional
+    `observe(kind, seconds, outcome)` is called on the event loop after every call.
+    """
+
+    def __init__(self, complete, single, max_batch: int = 8, max_wait_ms: float = 20, observe=None):
+        self._complete = complete
+        self._single = single
+        self._observe = observe
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending = {}
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold running batches until they finish
+        self._tasks = set()
+        self.stats = {"requests": 0, "batches": 0, "batched_items": 0, "fallbacks": 0}
+
+    async def describe(self, url: str) -> str:
+        """Return the QR description for url, sharing an LLM call with concurrent requests."""
+        self.stats["requests"] += 1
+        future = self._pending.get(url)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[url] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+        return await asyncio.shield(future)
+
+    async def _call(self, kind: str, function, argument):
+        """Run a blocking LLM call in a worker thread, reporting its duration to observe() on the loop."""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await asyncio.to_thread(function, argument)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if self._observe is not None:
+                self._observe(kind, time.perf_counter() - started, outcome)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: dict):
+        urls = list(batch)
+        results = {}
+
+        if len(urls) > 1:
+            self.stats["batches"] += 1
+            self.stats["batched_items"] += len(urls)
+            messages = [
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": build_batch_prompt(urls)},
+            ]
+            try:
+                text = await self._call("batch", self._complete, messages)
+                results = parse_batch_response(text, urls)
+            except Exception as e:
+                logger.error("Batched QR description failed for %d URLs: %s", len(urls), e, extra={"batch_size": len(urls)})
+            if len(results) < len(urls):
+                logger.warning("Batched QR description parsed %d/%d items, falling back for the rest", len(results), len(urls),
+                               extra={"batch_size": len(urls), "parsed": len(results)})
+
+        missing = [url for url in urls if url not in results]
+        if len(urls) > 1:
+            self.stats["fallbacks"] += len(missing)
+        fallbacks = await asyncio.gather(
+            *(self._call("single", self._single, url) for url in missing),
+            return_exceptions=True,
+        )
+        results.update(zip(missing, fallbacks))
+
+        for url, future in batch.items():
+            if future.done():
+                continue
+            result = results[url]
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Local product catalog for the AI server.
+
+Bulk-imports Open Food Facts and UPC dump files (JSONL or CSV, optionally
+gzipped) into a SQLite store with a streaming importer: rows are read one at a
+time and written in batched transactions, so memory stays constant no matter
+how big the dump is. Re-importing a delta file upserts changed products and
+removes products marked as deleted.
+
+fetch_product_info looks products up here first and only calls the public
+APIs on a miss.
+
+Usage:
+    python product_catalog.py import openfoodfacts-products.jsonl.gz [--db product_catalog.db]
+    python product_catalog.py lookup 8901234567890
+    python product_catalog.py stats
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Barcode generator&Scanner"))
+
+from service_logging import get_logger
+
+logger = get_logger("catalog")
+
+DEFAULT_DB_PATH = os.getenv("PRODUCT_CATALOG_DB", "product_catalog.db")
+
+# Candidate source columns for each catalog field, in order of preference
+FIELD_SOURCES = {
+    "gtin": ("code", "gtin", "ean", "upc", "barcode"),
+    "product_name": ("product_name", "product_name_en", "title", "name"),
+    "brand": ("brands", "brand"),
+    "category": ("categories", "category", "main_category"),
+    "description": ("generic_name", "generic_name_en", "description", "ingredients_text"),
+    "image_url": ("image_url", "image_front_url", "image", "images"),
+}
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS products (
+        gtin TEXT PRIMARY KEY,
+        product_name TEXT,
+        brand TEXT,
+        category TEXT,
+        description TEXT,
+        image_url TEXT,
+        source TEXT,
+        updated_at INTEGER
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS imports (
+        file_name TEXT PRIMARY KEY,
+        file_size INTEGER,
+        file_mtime REAL,
+        rows_upserted INTEGER,
+        rows_deleted INTEGER,
+        imported_at TEXT
+    );
+'''
+
+UPSERT_SQL = '''
+    INSERT INTO products (gtin, product_name, brand, category, description, image_url, source, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(gtin) DO UPDATE SET
+        product_name = COALESCE(excluded.product_name, products.product_name),
+        brand = COALESCE(excluded.brand, products.brand),
+        category = COALESCE(excluded.category, products.category),
+        description = COALESCE(excluded.description, products.description),
+        image_url = COALESCE(excluded.image_url, products.image_url),
+        source = excluded.source,
+        updated_at = excluded.updated_at
+'''
+
+
+def normalize_gtin(code) -> str:
+    """Return code as a zero-padded GTIN-14, or None if it is not an 8-14 digit code."""
+    code = str(code or "").strip()
+    if not code.isdigit() or not 8 <= len(code) <= 14:
+        return None
+    return code.zfill(14)
+
+
+def _first_value(record: dict, keys):
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if value not in (None, ""):
+            return str(value).strip() or None
+    return None
+
+
+def _is_deleted(record: dict) -> bool:
+    marker = record.get("deleted", record.get("_deleted"))
+    return marker in (True, 1, "1", "true", "True")
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def iter_records(path: str):
+    """Stream dict records from a JSONL or CSV/TSV dump, one line at a time."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open_text(path) as f:
+        if name.endswith((".jsonl", ".json", ".ndjson")):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+        else:
+            csv.field_size_limit(sys.maxsize)
+            header = f.readline()
+            delimiter = "\t" if header.count("\t") > header.count(",") else ","
+            fields = next(csv.reader([header], delimiter=delimiter))
+            yield from csv.DictReader(f, fieldnames=fields, delimiter=delimiter)
+
+
+class ProductCatalog:
+    """SQLite-backed product store with a streaming bulk importer and point lookups."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.executescript(SCHEMA)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def import_file(self, path: str, batch_size: int = 10000, force: bool = False, source: str = None) -> dict:
+        """
+        Stream a dump file into the catalog in batched transactions.
+
+        Files already imported with the same size and mtime are skipped unless
+        force is set, so a nightly job can re-run over a directory of deltas.
+        """
+        conn = self._connection()
+        stat = os.stat(path)
+        file_name = os.path.basename(path)
+        previous = conn.execute(
+            "SELECT file_size, file_mtime FROM imports WHERE file_name = ?", (file_name,)
+        ).fetchone()
+        if previous == (stat.st_size, stat.st_mtime) and not force:
+            logger.info("Skipping already imported file %s", file_name, extra={"file": file_name})
+            return {"file": file_name, "skipped": True, "rows": 0}
+
+        source = source or file_name
+        now = int(time.time())
+        upserts, deletes = [], []
+        rows_upserted = rows_deleted = rows_skipped = 0
+        started = time.perf_counter()
+
+        def flush():
+            with conn:
+                if upserts:
+                    conn.executemany(UPSERT_SQL, upserts)
+                if deletes:
+                    conn.executemany("DELETE FROM products WHERE gtin = ?", deletes)
+            upserts.clear()
+            deletes.clear()
+
+        for record in iter_records(path):
+            gtin = normalize_gtin(_first_value(record, FIELD_SOURCES["gtin"]))
+            if gtin is None:
+                rows_skipped += 1
+                continue
+            if _is_deleted(record):
+                deletes.append((gtin,))
+                rows_deleted += 1
+            else:
+                upserts.append((
+                    gtin,
+                    _first_value(record, FIELD_SOURCES["product_name"]),
+                    _first_value(record, FIELD_SOURCES["brand"]),
+                    _first_value(record, FIELD_SOURCES["category"]),
+                    _first_value(record, FIELD_SOURCES["description"]),
+                    _first_value(record, FIELD_SOURCES["image_url"]),
+                    source,
+                    now,
+                ))
+                rows_upserted += 1
+            if len(upserts) + len(deletes) >= batch_size:
+                flush()
+        flush()
+
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?)",
+                (file_name, stat.st_size, stat.st_mtime, rows_upserted, rows_deleted, time.strftime("%Y-%m-%dT%H:%M:%S")),
+            )
+
+        elapsed = time.perf_counter() - started
+        rows = rows_upserted + rows_deleted
+        return {
+            "file": file_name,
+            "skipped": False,
+            "rows": rows,
+            "upserted": rows_upserted,
+            "deleted": rows_deleted,
+            "invalid": rows_skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed) if elapsed else rows,
+        }
+
+    def lookup(self, barcode: str):
+        """Return product info in fetch_product_info's shape, or None on a miss."""
+        gtin = normalize_gtin(barcode)
+        if gtin is None:
+            return None
+        row = self._connection().execute(
+            "SELECT product_name, brand, category, description, image_url FROM products WHERE gtin = ?", (gtin,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "found": True,
+            "product_name": row[0],
+            "brand": row[1],
+            "category": row[2],
+            "description": row[3],
+            "image_url": row[4],
+        }
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        return {
+            "products": conn.execute("SELECT COUNT(*) FROM products").fetchone()[0],
+            "imports": [
+                dict(zip(("file", "rows_upserted", "rows_deleted", "imported_at"), row))
+                for row in conn.execute("SELECT file_name, rows_upserted, rows_deleted, imported_at FROM imports ORDER BY imported_at")
+            ],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Robridge local product catalog")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Catalog database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import JSONL/CSV dump files (optionally .gz)")
+    import_parser.add_argument("files", nargs="+")
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+    import_parser.add_argument("--force", action="store_true", help="Re-import files seen before")
+
+    lookup_parser = commands.add_parser("lookup", help="Look up one barcode")
+    lookup_parser.add_argument("barcode")
+
+    commands.add_parser("stats", help="Show catalog size and import history")
+
+    args = parser.parse_args()
+    catalog = ProductCatalog(args.db)
+
+    if args.command == "import":
+        for path in args.files:
+            result = catalog.import_file(path, batch_size=args.batch_size, force=args.force)
+            if result["skipped"]:
+                print(f"⏭️  {result['file']}: already imported")
+            else:
+                print(f"✅ {result['file']}: {result['upserted']} upserted, {result['deleted']} deleted, "
+                      f"{result['invalid']} invalid in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+    elif args.command == "lookup":
+        print(json.dumps(catalog.lookup(args.barcode), indent=2))
+    else:
+        print(json.dumps(catalog.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Replay captured production traffic against a target deployment.
+
+Reads the capture files written when TRAFFIC_CAPTURE_DIR is set on the AI
+server and/or the Flask barcode service (including gzip-rotated segments),
+orders them by arrival time and re-issues each request against the matching
+target URL. --speed 1 keeps the original inter-arrival timing, --speed N
+compresses it N times and --speed max fires requests as fast as
+--concurrency allows.
+
+Reports per endpoint: throughput, p50/p95/p99 latency, error rate, how often
+the status differs from the recorded one and how far behind schedule the
+replayer fell (so an overloaded client is not mistaken for a slow server).
+
+Usage:
+    python replay_traffic.py captures/ --ai-url http://localhost:8000 --barcode-url http://localhost:5000
+                             [--speed 1|N|max] [--concurrency 256] [--limit N] [--json replay.json]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import aiohttp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Barcode generator&Scanner'))
+
+from traffic_capture import read_capture
+
+DEVICE_SEGMENT = re.compile(r"/dev-[0-9a-f]+")
+
+
+def capture_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, "capture-*.jsonl*"))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def load_records(paths, services, limit=None):
+    records = [record for path in capture_files(paths) for record in read_capture(path) if record["svc"] in services]
+    records.sort(key=lambda record: record["t"])
+    return records[:limit] if limit else records
+
+
+def endpoint_name(record):
+    return f"{record['svc']} {record['m']} {DEVICE_SEGMENT.sub('/{device}', record['p'])}"
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def replay(records, targets, speed, concurrency, timeout):
+    results = {}
+    lags = []
+    semaphore = asyncio.Semaphore(concurrency)
+    first = records[0]["t"]
+
+    async def send(session, record):
+        url = f"{targets[record['svc']]}{record['p']}"
+        if record.get("q"):
+            url += f"?{record['q']}"
+        started = time.perf_counter()
+        try:
+            async with session.request(record["m"], url, json=record.get("b")) as response:
+                await response.read()
+                status = response.status
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except aiohttp.ClientError as e:
+            status = type(e).__name__
+        finally:
+            semaphore.release()
+        result = results.setdefault(endpoint_name(record), {"latencies": [], "errors": 0, "mismatches": 0})
+        result["latencies"].append((time.perf_counter() - started) * 1000)
+        result["errors"] += not isinstance(status, int) or status >= 500
+        result["mismatches"] += status != record.get("s")
+
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=client_timeout, connector=connector) as session:
+        tasks = []
+        start = time.perf_counter()
+        for record in records:
+            if speed is not None:
+                due = start + (record["t"] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            if speed is not None:
+                lags.append(max(0.0, (time.perf_counter() - due) * 1000))
+            tasks.append(asyncio.create_task(send(session, record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    report = {}
+    for name, result in sorted(results.items()):
+        latencies = sorted(result["latencies"])
+        report[name] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "error_rate": round(result["errors"] / len(latencies), 4),
+            "status_mismatch_rate": round(result["mismatches"] / len(latencies), 4),
+            "latency_p50_ms": round(percentile(latencies, 0.50), 1),
+            "latency_p95_ms": round(percentile(latencies, 0.95), 1),
+            "latency_p99_ms": round(percentile(latencies, 0.99), 1),
+        }
+    lags.sort()
+    return {
+        "seconds": round(elapsed, 2),
+        "captured_seconds": round(records[-1]["t"] - first, 2),
+        "schedule_lag_p99_ms": round(percentile(lags, 0.99), 1) if lags else None,
+        "endpoints": report,
+    }
+
+
+def parse_speed(value):
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured Robridge traffic against a target")
+    parser.add_argument("captures", nargs="+", help="Capture files or directories")
+    parser.add_argument("--ai-url", help="Target for captured AI server requests")
+    parser.add_argument("--barcode-url", help="Target for captured barcode service requests")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1 (real time), N (N times faster) or max")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=15)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    targets = {service: url.rstrip("/") for service, url in (("ai", args.ai_url), ("barcode", args.barcode_url)) if url}
+    if not targets:
+        parser.error("give at least one of --ai-url / --barcode-url")
+
+    records = load_records(args.captures, targets, args.limit)
+    if not records:
+        print("❌ No captured requests for the selected services")
+        return
+    speed_label = "max speed" if args.speed is None else f"{args.speed:g}x"
+    print(f"🔁 Replaying {len(records)} requests ({records[-1]['t'] - records[0]['t']:.0f}s captured) at {speed_label}")
+
+    result = asyncio.run(replay(records, targets, args.speed, args.concurrency, args.timeout))
+    print(f"⏱️ Finished in {result['seconds']}s, schedule lag p99 {result['schedule_lag_p99_ms']} ms")
+    print(f"{'endpoint':>40} {'req/s':>8} {'errors':>8} {'status≠':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, endpoint in result["endpoints"].items():
+        print(f"{name[:40]:>40} {endpoint['throughput_rps']:>8} {endpoint['error_rate'] * 100:>7.2f}% "
+              f"{endpoint['status_mismatch_rate'] * 100:>7.2f}% {endpoint['latency_p50_ms']:>8} "
+              f"{endpoint['latency_p95_ms']:>8} {endpoint['latency_p99_ms']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
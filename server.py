@@ -1,29 +1,64 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from openai import OpenAI
-import uvicorn
-import re
 import os
-import logging
-import aiohttp
+import sys
+import json
+import time
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 
+# Shared modules from the barcode generator service, including the logging layer the local modules use
+BARCODE_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Barcode generator&Scanner')
+sys.path.append(BARCODE_SERVICE_DIR)
+
+from llm_batcher import QRDescriptionBatcher, format_qr_info
+from cache_warmer import TTLCache, CacheWarmer
+from product_catalog import ProductCatalog
+from gtin_index import GTINIndex
+from category_classifier import CategoryClassifier
+from barcode_schema import barcode_db_path
+from gs1_parser import describe_gs1, lookup_gtin
+from label_payloads import LabelResolver, describe_label
+from scan_classification import classify
+from traffic_capture import TrafficCapture
+from service_metrics import MetricsRegistry, instrument_fastapi, set_branch
+from blocking_detector import BlockingCallDetector, install_blocking_detector
+from tracing import Tracer
+from service_logging import configure_logging, get_logger, shutdown_logging
+
 # ======================
 # CONFIGURATION
 # ======================
-# Configure logging first
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Configure logging first (structured, queue-backed; see service_logging for LOG_* settings)
+configure_logging("ai_server")
+logger = get_logger("server")
+scan_log = get_logger("scan")
+upstream_log = get_logger("upstream")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Product database endpoints (overridable so benchmarks and tests can use local stand-ins;
+# the OpenAI client likewise honours OPENAI_BASE_URL)
+OPEN_FOOD_FACTS_URL = os.getenv("OPEN_FOOD_FACTS_URL", "https://world.openfoodfacts.org")
+UPCITEMDB_URL = os.getenv("UPCITEMDB_URL", "https://api.upcitemdb.com")
+BARCODE_LOOKUP_URL = os.getenv("BARCODE_LOOKUP_URL", "https://api.barcodelookup.com")
+
 # Validate API key
 if not OPENAI_API_KEY:
     logger.warning("OPENAI_API_KEY environment variable is not set!")
     logger.warning("AI analysis will use fallback responses.")
-    client = None
-else:
-    client = OpenAI(api_key=OPENAI_API_KEY)
+
+# The openai package alone is most of the import time, so the client is built on
+# first use (or by the startup warm-up) rather than at import
+client = None
+
+def openai_client():
+    global client
+    if client is None and OPENAI_API_KEY:
+        from openai import OpenAI
+        client = OpenAI(api_key=OPENAI_API_KEY)
+    return client
 
 app = FastAPI(title="Robridge AI Scanner", version="2.0.0")
 
@@ -36,8 +71,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ======================
+# Metrics
+# ======================
+metrics = MetricsRegistry()
+instrument_fastapi(app, metrics)
+upstream_duration = metrics.histogram("upstream_duration_seconds", "Upstream provider call latency by outcome",
+                                      ("provider", "outcome"))
+local_lookups = metrics.counter("local_lookups_total", "Local catalog lookups by store and result", ("store", "result"))
+
+# Event-loop stall sampling; slowest blocking sites at GET /debug/blocking
+blocking_detector = install_blocking_detector(app, BlockingCallDetector.from_env(), metrics)
+
+# ======================
+# Tracing
+# ======================
+# Continues the Node bridge's traceparent; exported as OTLP/JSON when TRACE_EXPORT_FILE
+# or OTEL_EXPORTER_OTLP_ENDPOINT is set
+tracer = Tracer.from_env("robridge-ai-server")
+
+async def trace_requests(request, call_next):
+    span, token = tracer.start_trace(request.headers.get("traceparent"), f"{request.method} {request.url.path}")
+    span.set("http.method", request.method)
+    span.set("http.target", request.url.path)
+    try:
+        response = await call_next(request)
+        span.set("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.fail(f"HTTP {response.status_code}")
+        if span.handler_done_ns:
+            tracer.record("serialize_response", span.handler_done_ns, time.time_ns())
+        response.headers["traceparent"] = span.traceparent
+        return response
+    except Exception as e:
+        span.fail(e)
+        raise
+    finally:
+        tracer.finish_trace(span, token)
+
+# Like traffic capture, the middleware layer is only added when spans are exported
+if tracer.enabled:
+    app.middleware("http")(trace_requests)
+
+def observe_llm_call(kind: str, seconds: float, outcome: str):
+    upstream_duration.observe(seconds, f"openai_{kind}", outcome)
+
 # Log the API key being used
-logger.info(f"Using OpenAI API Key: {OPENAI_API_KEY[:20]}...")
+logger.info("Using OpenAI API Key: %s...", OPENAI_API_KEY[:20])
 
 # ======================
 # Pydantic Models
@@ -108,9 +188,78 @@ def get_country_from_barcode(barcode: str) -> str:
     return COUNTRY_CODES.get(prefix, "Unknown Country")
 
 async def fetch_product_info(barcode: str) -> dict:
+    """
+    Fetch product information from the local catalog, falling back to the
+    scan cache and then the public barcode databases
+    """
+    with tracer.span("local_lookup") as span:
+        product_info = await lookup_local_product(barcode)
+        if span is not None:
+            span.set("lookup.hit", product_info is not None)
+    if product_info is not None:
+        return product_info
+
+    cache_warmer.record("barcode", barcode)
+    product_info = scan_cache.get(("barcode", barcode))
+    if product_info is None:
+        with tracer.span("upstream_lookup"):
+            product_info = await fetch_product_info_upstream(barcode)
+        scan_cache.set(("barcode", barcode), product_info)
+    return product_info
+
+async def lookup_local_product(barcode: str):
+    """
+    Look a barcode up in the shared GTIN index, or in the catalog store when no index is built.
+    The mmap index answers in microseconds on the loop; the SQLite catalog (and its first-use
+    schema setup) runs in a worker thread.
+    """
+    try:
+        if gtin_index.available():
+            product_info = gtin_index.lookup(barcode)
+            local_lookups.inc("gtin_index", "hit" if product_info else "miss")
+            return product_info
+        if product_catalog.exists():
+            product_info = await asyncio.to_thread(product_catalog.lookup, barcode)
+            local_lookups.inc("catalog", "hit" if product_info else "miss")
+            return product_info
+    except Exception as e:
+        local_lookups.inc("local", "error")
+        upstream_log.error("Local product catalog error: %s", e, extra={"provider": "local"})
+    return None
+
+async def describe_qr_link(url: str) -> str:
+    """
+    Describe a QR link via the LLM batcher, served from the scan cache when fresh
+    """
+    # Common destinations are classified locally; the LLM only sees low-confidence links
+    prediction = category_classifier.predict_confident(url)
+    if prediction is not None:
+        domain = url.split('/')[2] if url.count('/') >= 2 else url
+        return format_qr_info(
+            url,
+            prediction["title"],
+            prediction["category"],
+            f"This QR code links to {domain}, identified as a {prediction['category'].lower()} ({prediction['title']}). "
+            f"Scanning it opens the {prediction['title']} page the code was created for."
+        )
+
+    cache_warmer.record("url", url)
+    result = scan_cache.get(("url", url))
+    if result is None:
+        with tracer.span("llm.describe_qr_link"):
+            result = await qr_batcher.describe(url)
+        scan_cache.set(("url", url), result)
+    return result
+
+async def fetch_product_info_upstream(barcode: str) -> dict:
     """
     Fetch product information from multiple barcode databases
+
+    "upstream_failed" is set when any provider timed out or errored, so a
+    "not found" that may only be a network blip is not cached.
     """
+    import aiohttp  # deferred off the cold-start path; a dict lookup once loaded
+
     product_info = {
         "found": False,
         "product_name": None,
@@ -121,10 +270,13 @@ async def fetch_product_info(barcode: str) -> dict:
     }
     
     # Try Open Food Facts API (great for food products)
+    started = time.perf_counter()
+    outcome = "miss"
+    span = tracer.start_span("upstream.open_food_facts", "CLIENT")
     try:
         async with aiohttp.ClientSession() as session:
-            url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            url = f"{OPEN_FOOD_FACTS_URL}/api/v0/product/{barcode}.json"
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5), headers=tracer.headers(span)) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get("status") == 1:
@@ -135,15 +287,27 @@ async def fetch_product_info(barcode: str) -> dict:
                         product_info["category"] = product.get("categories")
                         product_info["description"] = product.get("generic_name") or product.get("ingredients_text")
                         product_info["image_url"] = product.get("image_url")
+                        outcome = "found"
                         return product_info
+                else:
+                    outcome = "http_error"
+                    product_info["upstream_failed"] = True
     except Exception as e:
-        logger.error(f"Open Food Facts API error: {e}")
+        outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+        product_info["upstream_failed"] = True
+        upstream_log.error("Open Food Facts API error: %s", e, extra={"provider": "open_food_facts"})
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, "open_food_facts", outcome)
+        tracer.end_span(span, **{"upstream.outcome": outcome})
     
     # Try UPCitemdb API (general products)
+    started = time.perf_counter()
+    outcome = "miss"
+    span = tracer.start_span("upstream.upcitemdb", "CLIENT")
     try:
         async with aiohttp.ClientSession() as session:
-            url = f"https://api.upcitemdb.com/prod/trial/lookup?upc={barcode}"
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            url = f"{UPCITEMDB_URL}/prod/trial/lookup?upc={barcode}"
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5), headers=tracer.headers(span)) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get("code") == "OK" and data.get("items"):
@@ -154,15 +318,27 @@ async def fetch_product_info(barcode: str) -> dict:
                         product_info["category"] = item.get("category")
                         product_info["description"] = item.get("description")
                         product_info["image_url"] = item.get("images", [None])[0] if item.get("images") else None
+                        outcome = "found"
                         return product_info
+                else:
+                    outcome = "http_error"
+                    product_info["upstream_failed"] = True
     except Exception as e:
-        logger.error(f"UPCitemdb API error: {e}")
+        outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+        product_info["upstream_failed"] = True
+        upstream_log.error("UPCitemdb API error: %s", e, extra={"provider": "upcitemdb"})
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, "upcitemdb", outcome)
+        tracer.end_span(span, **{"upstream.outcome": outcome})
     
     # Try Barcode Lookup API (alternative)
+    started = time.perf_counter()
+    outcome = "miss"
+    span = tracer.start_span("upstream.barcode_lookup", "CLIENT")
     try:
         async with aiohttp.ClientSession() as session:
-            url = f"https://api.barcodelookup.com/v3/products?barcode={barcode}&formatted=y&key=demo"
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            url = f"{BARCODE_LOOKUP_URL}/v3/products?barcode={barcode}&formatted=y&key=demo"
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5), headers=tracer.headers(span)) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get("products"):
@@ -173,9 +349,18 @@ async def fetch_product_info(barcode: str) -> dict:
                         product_info["category"] = item.get("category")
                         product_info["description"] = item.get("description")
                         product_info["image_url"] = item.get("images", [None])[0] if item.get("images") else None
+                        outcome = "found"
                         return product_info
+                else:
+                    outcome = "http_error"
+                    product_info["upstream_failed"] = True
     except Exception as e:
-        logger.error(f"Barcode Lookup API error: {e}")
+        outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+        product_info["upstream_failed"] = True
+        upstream_log.error("Barcode Lookup API error: %s", e, extra={"provider": "barcode_lookup"})
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, "barcode_lookup", outcome)
+        tracer.end_span(span, **{"upstream.outcome": outcome})
     
     return product_info
 
@@ -211,56 +396,218 @@ def generate_qr_info(url: str):
     its purpose, reputation, and what a visitor would find or do on that link.>
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You describe QR links accurately and consistently without extra commentary."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3
-    )
+    return chat_complete([
+        {"role": "system", "content": "You describe QR links accurately and consistently without extra commentary."},
+        {"role": "user", "content": prompt}
+    ])
+
+def chat_complete(messages: list) -> str:
+    """
+    Run one chat completion and return the stripped answer text.
+    """
+    with tracer.span("openai.chat_completions", "CLIENT", **{"llm.model": "gpt-4o-mini"}):
+        response = openai_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.3
+        )
 
     return response.choices[0].message.content.strip()
 
+# Concurrent /scan requests for QR links share one LLM round trip
+qr_batcher = QRDescriptionBatcher(
+    chat_complete,
+    generate_qr_info,
+    max_batch=int(os.getenv("QR_BATCH_MAX_ITEMS", 8)),
+    max_wait_ms=float(os.getenv("QR_BATCH_MAX_WAIT_MS", 20)),
+    observe=observe_llm_call,
+)
+
+# ======================
+# Local Catalog, Scan Cache & Warmer
+# ======================
+product_catalog = ProductCatalog(os.getenv("PRODUCT_CATALOG_DB", "product_catalog.db"))
+gtin_index = GTINIndex(os.getenv("GTIN_INDEX_PATH", "gtin_index.bin"))
+category_classifier = CategoryClassifier(
+    os.getenv("CATEGORY_MODEL_PATH", "category_model.json"),
+    min_confidence=float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", 0.7)),
+)
+label_resolver = LabelResolver(barcode_db_path())
+
+# Maintained by the metrics middleware; the warmer backs off while it is high
+requests_in_flight = metrics.get("requests_in_flight")
+
+@metrics.collector
+def cache_metrics():
+    yield ("scan_cache_lookups_total", "counter", "Scan cache lookups by result",
+           [({"result": "hit"}, scan_cache.hits - scan_cache.warmed_hits),
+            ({"result": "warmed_hit"}, scan_cache.warmed_hits),
+            ({"result": "miss"}, scan_cache.misses)])
+    yield ("scan_cache_entries", "gauge", "Entries in the scan cache", [({}, len(scan_cache))])
+    yield ("qr_batcher_total", "counter", "QR description batcher activity",
+           [({"kind": kind}, value) for kind, value in qr_batcher.stats.items()])
+
+# Opt-in request capture for replay_traffic.py (enabled by TRAFFIC_CAPTURE_DIR)
+traffic_capture = TrafficCapture.from_env("ai")
+
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", 3600))
+SCAN_CACHE_NEGATIVE_TTL = float(os.getenv("SCAN_CACHE_NEGATIVE_TTL", 300))
+
+def scan_cache_ttl(value):
+    """Full TTL for answers, a short one for confirmed misses, none for failed lookups"""
+    if not isinstance(value, dict) or value.get("found"):
+        return SCAN_CACHE_TTL
+    return None if value.get("upstream_failed") else SCAN_CACHE_NEGATIVE_TTL
+
+scan_cache = TTLCache(ttl=SCAN_CACHE_TTL, ttl_for=scan_cache_ttl)
+
+cache_warmer = CacheWarmer(
+    scan_cache,
+    {"barcode": fetch_product_info_upstream, "url": qr_batcher.describe},
+    top_n=int(os.getenv("CACHE_WARMER_TOP_N", 50)),
+    interval=float(os.getenv("CACHE_WARMER_INTERVAL", 60)),
+    refresh_ahead=float(os.getenv("CACHE_WARMER_REFRESH_AHEAD", 300)),
+    max_per_second=float(os.getenv("CACHE_WARMER_MAX_PER_SEC", 1)),
+    min_score=float(os.getenv("CACHE_WARMER_MIN_SCORE", 1.5)),
+    is_busy=lambda: requests_in_flight.value() > int(os.getenv("CACHE_WARMER_BUSY_REQUESTS", 4)),
+)
+
+# ======================
+# Startup & Readiness
+# ======================
+# STARTUP_WARMUP=background (default) serves immediately and warms in a thread,
+# eager finishes the warm-up before the server accepts requests, off leaves
+# everything to the first request that needs it
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+startup_state = {"ready": False, "mode": STARTUP_WARMUP, "warmup_ms": None, "steps": {}}
+warmup_task = None
+
+def _import_aiohttp():
+    import aiohttp
+    return aiohttp
+
+def warm_up():
+    """Load what the first scan would otherwise pay for; runs off the event loop"""
+    started = time.perf_counter()
+    for name, step in (("openai", openai_client), ("aiohttp", _import_aiohttp),
+                       ("category_model", category_classifier.load), ("gtin_index", gtin_index.available)):
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+        startup_state["steps"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+    startup_state["warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_state["ready"] = True
+    logger.info("Warm-up finished in %s ms", startup_state["warmup_ms"], extra={"steps": startup_state["steps"]})
+
+@app.on_event("startup")
+async def start_warm_up():
+    global warmup_task
+    if STARTUP_WARMUP == "eager":
+        await asyncio.to_thread(warm_up)
+    elif STARTUP_WARMUP == "off":
+        startup_state["ready"] = True
+    else:
+        warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
 # ======================
 # Endpoints
 # ======================
+async def capture_traffic(request, call_next):
+    if not traffic_capture.enabled:
+        return await call_next(request)
+    started_at = time.time()
+    started = time.perf_counter()
+    payload = None
+    if request.method in ("POST", "PUT"):
+        try:
+            payload = json.loads(await request.body() or b"null")
+        except ValueError:
+            payload = None
+    response = await call_next(request)
+    traffic_capture.record(request.method, request.url.path, request.url.query, payload,
+                           response.status_code, (time.perf_counter() - started) * 1000, started_at)
+    return response
+
+# Each HTTP middleware layer costs every request, so capture only adds one when configured
+if traffic_capture.configured:
+    app.middleware("http")(capture_traffic)
+
+@app.on_event("startup")
+async def start_cache_warmer():
+    if os.getenv("CACHE_WARMER_ENABLED", "true").lower() != "false":
+        cache_warmer.start()
+    traffic_capture.start()
+
+@app.on_event("shutdown")
+async def stop_cache_warmer():
+    cache_warmer.stop()
+    traffic_capture.stop()
+    tracer.shutdown()
+    shutdown_logging()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "Robridge AI Scanner", "version": "2.0.0"}
 
+@app.get("/ready")
+async def readiness_check():
+    """200 once the warm-up has loaded the lazy dependencies, 503 while warming"""
+    return JSONResponse(startup_state, status_code=200 if startup_state["ready"] else 503)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Scan cache and warmer coverage/savings"""
+    return cache_warmer.stats()
+
 @app.post("/test-esp32")
 async def test_esp32(data: dict):
-    logger.info(f"Test ESP32 received: {data}")
+    logger.debug("Test ESP32 received: %s", data)
     return {"success": True, "received": data}
 
 @app.post("/api/esp32/ping/{device_id}")
 async def esp32_ping(device_id: str):
     """ESP32 heartbeat/ping endpoint"""
-    logger.info(f"ESP32 ping received from {device_id}")
+    scan_log.debug("ESP32 ping from %s", device_id, extra={"device": device_id})
     return {"status": "ok", "deviceId": device_id, "timestamp": "pong"}
 
 @app.get("/api/esp32/ping/{device_id}")
 async def esp32_ping_get(device_id: str):
     """ESP32 heartbeat/ping endpoint (GET)"""
-    logger.info(f"ESP32 ping GET received from {device_id}")
+    scan_log.debug("ESP32 ping (GET) from %s", device_id, extra={"device": device_id})
     return {"status": "ok", "deviceId": device_id, "timestamp": "pong"}
 
 @app.post("/api/esp32/scan")
+@tracer.traced_handler
 async def esp32_scan(data: ESP32ScanInput):
     try:
-        logger.info(f"ESP32 scan received from {data.deviceId}: {data.barcodeData}")
-        logger.info(f"Additional data - deviceName: {data.deviceName}, scanType: {data.scanType}, timestamp: {data.timestamp}")
-        
         # Check if device name contains "AI" for AI analysis
         device_name = data.deviceName or ""
         has_ai = "AI" in device_name.upper()
         
-        logger.info(f"Device name: '{device_name}', Contains AI: {has_ai}")
+        scan_log.info("ESP32 scan received from %s", data.deviceId,
+                      extra={"device": data.deviceId, "device_name": device_name, "ai": has_ai,
+                             "scan_type": data.scanType, "code_length": len(data.barcodeData)})
+        
+        with tracer.span("classify") as span:
+            scan = classify(data.barcodeData) if has_ai else None
+            gs1 = scan.gs1 if scan is not None else None
+            # GS1 labels are looked up by the GTIN they carry
+            gs1_gtin = gs1 is not None and scan.gtin is not None
+            number = lookup_gtin(scan.gtin) if gs1_gtin else scan.code if scan is not None else None
+            is_numeric = scan is not None and (scan.is_barcode_number or gs1_gtin)
+            is_url = scan is not None and scan.kind == "url"
+            label = scan.label if scan is not None else None
+            if span is not None:
+                span.set("scan.kind", scan.kind if scan is not None else None)
+                span.set("scan.branch", "basic" if not has_ai else "numeric" if is_numeric else "url" if is_url
+                         else "label" if label is not None else "gs1" if gs1 is not None else "unknown")
         
         if not has_ai:
             # Device doesn't have "AI" in name - return basic analysis
-            logger.info("Device does not have 'AI' in name - returning basic analysis")
+            scan_log.debug("Device does not have 'AI' in name - returning basic analysis")
+            set_branch("basic")
             return AIAnalysisResponse(
                 success=True,
                 title="Basic Scan",
@@ -272,19 +619,22 @@ async def esp32_scan(data: ESP32ScanInput):
                 deviceId=data.deviceId
             )
         
-        # Case 1: Numeric barcode
-        if re.fullmatch(r"\d{8,14}", data.barcodeData):
-            country = get_country_from_barcode(data.barcodeData)
-            logger.info(f"Processing numeric barcode from {country}")
+        # Case 1: Numeric barcode (or a GS1 label's GTIN)
+        if is_numeric:
+            set_branch("gs1" if gs1 is not None else "numeric")
+            country = get_country_from_barcode(number)
+            scan_log.debug("Processing numeric barcode from %s", country, extra={"branch": "numeric"})
             
             # Fetch product information from database
-            product_info = await fetch_product_info(data.barcodeData)
+            product_info = await fetch_product_info(number)
             
             # Enhanced barcode description based on country
-            prefix = data.barcodeData[:3]
-            barcode_length = len(data.barcodeData)
+            prefix = number[:3]
+            barcode_length = len(number)
             
-            if barcode_length == 13:
+            if gs1 is not None:
+                barcode_type = "GS1 element string (GTIN with application identifiers)"
+            elif barcode_length == 13:
                 barcode_type = "EAN-13 (European Article Number)"
             elif barcode_length == 12:
                 barcode_type = "UPC-A (Universal Product Code)"
@@ -298,7 +648,10 @@ async def esp32_scan(data: ESP32ScanInput):
                 # Product found in database
                 product_name = product_info["product_name"] or "Unknown Product"
                 brand = product_info["brand"] or "Unknown Brand"
-                category = product_info["category"] or "General Product"
+                category = product_info["category"]
+                if not category:
+                    prediction = category_classifier.predict_confident(f"{product_name} {product_info['brand'] or ''}")
+                    category = prediction["category"] if prediction else "General Product"
                 
                 title = f"{product_name}"
                 
@@ -327,7 +680,7 @@ async def esp32_scan(data: ESP32ScanInput):
                 if len(description_short) > 138:
                     description_short = description_short[:135] + "..."
                 
-                logger.info(f"Product found: {product_name} by {brand}")
+                scan_log.debug("Product found: %s by %s", product_name, brand)
                 
             else:
                 # Product not found in database
@@ -355,7 +708,14 @@ async def esp32_scan(data: ESP32ScanInput):
                 if len(description_short) > 138:
                     description_short = description_short[:135] + "..."
                 
-                logger.info(f"Product not found in databases for barcode: {data.barcodeData}")
+                scan_log.info("Product not found in databases for barcode %s", number, extra={"branch": "numeric"})
+            
+            if gs1 is not None:
+                # Batch and expiry matter more on the device display than the origin
+                description += f"\n\nGS1 label data: {describe_gs1(gs1)}."
+                description_short = f"{title}. {describe_gs1(gs1)}."
+                if len(description_short) > 138:
+                    description_short = description_short[:135] + "..."
             
             return AIAnalysisResponse(
                 success=True,
@@ -369,12 +729,14 @@ async def esp32_scan(data: ESP32ScanInput):
             )
         
         # Case 2: QR code / URL
-        elif data.barcodeData.startswith(("http://", "https://", "www.")):
+        elif is_url:
+            set_branch("url")
             try:
-                logger.info(f"Processing QR code/URL: {data.barcodeData}")
+                # Normalized by classify: trimmed, with a scheme for bare www. links
+                url = scan.url
+                scan_log.debug("Processing QR code/URL: %s", url, extra={"branch": "url"})
                 
                 # Simple URL analysis without OpenAI for now
-                url = data.barcodeData
                 domain = url.split('/')[2] if '/' in url else url
                 
                 # Enhanced domain-based categorization with detailed descriptions
@@ -432,7 +794,7 @@ async def esp32_scan(data: ESP32ScanInput):
                 if len(description_short) > 138:
                     description_short = description_short[:135] + "..."
                 
-                logger.info(f"QR analysis completed: {title} - {category}")
+                scan_log.debug("QR analysis completed: %s - %s", title, category)
                 return AIAnalysisResponse(
                     success=True,
                     title=title,
@@ -444,8 +806,8 @@ async def esp32_scan(data: ESP32ScanInput):
                     deviceId=data.deviceId
                 )
             except Exception as e:
-                logger.error(f"QR analysis error: {e}")
-                full_desc = f"This QR code links to: {data.barcodeData}"
+                scan_log.error("QR analysis error: %s", e, extra={"branch": "url"})
+                full_desc = f"This QR code links to: {url}"
                 short_desc = f"Unknown Link. QR code to website."
                 if len(short_desc) > 138:
                     short_desc = short_desc[:135] + "..."
@@ -460,9 +822,71 @@ async def esp32_scan(data: ESP32ScanInput):
                     deviceId=data.deviceId
                 )
         
-        # Case 3: Unknown format
+        # Case 3: Our own generated label (JSON QR structure or pipe-separated product data)
+        elif label is not None:
+            set_branch("label")
+            scan_log.debug("Processing Robridge label for product %s", label['product_id'], extra={"branch": "label"})
+            
+            # Resolve from the local barcode database - no network enrichment needed
+            try:
+                record = await asyncio.to_thread(label_resolver.resolve, scan.code, label)
+            except Exception as e:
+                scan_log.error("Label lookup error: %s", e, extra={"branch": "label"})
+                record = None
+            product = describe_label(label, record)
+            price = product["price"] if product["price"] not in (None, "") else "N/A"
+            
+            description = f"Robridge Label: {product['title']}\n\n"
+            description += f"Product ID: {product['product_id']}\n"
+            description += f"Category: {product['category']}\n"
+            description += f"Price: {price}\n"
+            description += f"Location: {product['location']}\n"
+            if product["barcode_id"]:
+                description += f"Barcode ID: {product['barcode_id']}\n"
+            if product["created_at"]:
+                description += f"Created: {product['created_at']}\n"
+            description += "\nThis label was generated by the Robridge barcode system"
+            description += " and resolved from the local barcode database." if product["in_database"] else "; product details were read from the label itself."
+            
+            description_short = f"{product['title']}. ID: {product['product_id']}. Category: {product['category']}. Price: {price}. Location: {product['location']}."
+            if len(description_short) > 138:
+                description_short = description_short[:135] + "..."
+            
+            return AIAnalysisResponse(
+                success=True,
+                title=product["title"],
+                category=product["category"],
+                description=description,
+                description_short=description_short,
+                country="Unknown",
+                barcode=data.barcodeData,
+                deviceId=data.deviceId
+            )
+        
+        # Case 4: GS1 label without a GTIN (e.g. SSCC pallet label)
+        elif gs1 is not None:
+            set_branch("gs1")
+            details = describe_gs1(gs1)
+            description = f"GS1 Logistics Label\n\n{details}.\n\n"
+            description += "This GS1 element string identifies a shipment or logistic unit rather than a retail product."
+            description_short = f"GS1 label. {details}."
+            if len(description_short) > 138:
+                description_short = description_short[:135] + "..."
+            return AIAnalysisResponse(
+                success=True,
+                title="GS1 Logistics Label",
+                category="GS1 Label",
+                description=description,
+                description_short=description_short,
+                country="Unknown",
+                barcode=data.barcodeData,
+                deviceId=data.deviceId
+            )
+        
+        # Case 5: Unknown format
         else:
-            logger.info(f"Processing unknown format: {data.barcodeData}")
+            set_branch("unknown")
+            scan_log.debug("Processing unknown format: %s", data.barcodeData, extra={"branch": "unknown"})
             full_desc = "The scanned input is neither a recognizable barcode nor a valid URL. It may be a custom code, text string, or proprietary format."
             short_desc = "Unknown format. Not a standard barcode or URL."
             if len(short_desc) > 138:
@@ -479,7 +903,8 @@ async def esp32_scan(data: ESP32ScanInput):
             )
     
     except Exception as e:
-        logger.error(f"AI analysis error: {e}", exc_info=True)
+        set_branch("error")
+        scan_log.error("AI analysis error: %s", e, exc_info=True)
         full_desc = "AI analysis temporarily unavailable. Please try again later or contact support if the issue persists."
         short_desc = "Analysis error. Please try again."
         if len(short_desc) > 138:
@@ -496,21 +921,33 @@ async def esp32_scan(data: ESP32ScanInput):
         )
 
 @app.post("/scan")
+@tracer.traced_handler
 async def scan_code(data: ScanInput):
-    code = data.scanned_value.strip()
+    scan = classify(data.scanned_value)
+    code = scan.code
 
     # Case 1: Numeric barcode
-    if re.fullmatch(r"\d{8,14}", code):
+    if scan.is_barcode_number:
+        set_branch("numeric")
         result = generate_barcode_info(code)
         return {"result": result}
 
+    # GS1 element string: explain the GTIN it carries plus its batch/expiry data
+    elif scan.kind == "gs1":
+        set_branch("gs1")
+        result = generate_barcode_info(lookup_gtin(scan.gtin)) if scan.gtin else f"Scanned Code: {code}\n"
+        return {"result": f"{result.rstrip()}\nGS1 Data: {describe_gs1(scan.gs1)}"}
+
     # Case 2: QR code / URL
-    elif code.startswith(("http://", "https://", "www.")):
-        result = generate_qr_info(code)
+    elif scan.kind == "url":
+        set_branch("url")
+        # Normalized by classify, like esp32_scan: bare www. links get a scheme
+        result = await describe_qr_link(scan.url)
         return {"result": result}
 
     # Case 3: Unknown format
     else:
+        set_branch("unknown")
         return {
             "result": f"Scanned Code: {code}\nTitle: Unknown\nCategory: Uncategorized\nDescription: The scanned input is neither a recognizable barcode nor a valid URL."
         }
@@ -528,4 +965,5 @@ if __name__ == "__main__":
     print(f"🔍 Health check: http://localhost:{port}/health")
     print(f"🧠 AI Analysis: http://localhost:{port}/api/esp32/scan")
     print("=" * 60)
+    import uvicorn
     uvicorn.run("server:app", host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+ESP32 fleet simulator for end-to-end capacity testing.
+
+Runs a fleet of virtual scanners as asyncio tasks against running services:
+every device registers (with the Node bridge, when --bridge-url is given),
+sends heartbeats to the AI server and produces a realistic scan stream -
+exponential think times, pallet bursts, repeats of its own recent scans and
+of a shared pool of popular products, a GTIN/URL/label/unknown mix and a
+split between AI and non-AI device names (only "AI" devices get analysis).
+Scans go to the AI server's /api/esp32/scan and are looked up in the Flask
+barcode service, like the web scanner does.
+
+The fleet grows in stages (--fleet 50,100,250,500); each stage runs for
+--stage-seconds with all devices active and reports sustained throughput,
+latency percentiles and error rates per endpoint.
+
+Usage:
+    python simulate_fleet.py [--ai-url http://localhost:8000] [--barcode-url http://localhost:5000]
+                             [--bridge-url http://localhost:3001] [--fleet 50,100,250,500]
+                             [--stage-seconds 60] [--scan-interval 5] [--json fleet_results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+# EAN-13 prefixes weighted towards what our warehouses actually scan
+GTIN_PREFIXES = ["890"] * 6 + ["000", "400", "500", "690", "750", "880"]
+URL_TEMPLATES = [
+    "https://www.youtube.com/watch?v={n}",
+    "https://github.com/robridge/repo{n}",
+    "https://www.amazon.in/dp/B0{n:08d}",
+    "https://www.instagram.com/p/post{n}/",
+    "https://shop{n}.example.com/product",
+    "https://me-qr.com/{n}",
+]
+CATEGORIES = ["Electronics", "Snacks", "Beverages", "Stationery", "Household", "Dairy"]
+
+
+def ean13(prefix, rng):
+    """Random EAN-13 with the given prefix and a valid check digit"""
+    body = prefix + "".join(rng.choice("0123456789") for _ in range(12 - len(prefix)))
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def make_code(kind, rng, n):
+    if kind == "gtin":
+        return ean13(rng.choice(GTIN_PREFIXES), rng)
+    if kind == "url":
+        return rng.choice(URL_TEMPLATES).format(n=n)
+    if kind == "label":
+        price = rng.randrange(10, 5000) / 100
+        return f"SIM{n:05d}|Sim Product {n}|{rng.choice(CATEGORIES)}|{price:.2f}|{n % 20}|{n % 7}|{n % 3}|CODE128"
+    return f"LOT-{n:06d}-{rng.choice('ABCDEF')}"
+
+
+class ScanMix:
+    """
+    Code generator shared by the fleet: a pool of popular products drawn with
+    a Zipf-like skew, plus fresh codes, in the configured GTIN/URL/label mix.
+    """
+
+    def __init__(self, args, rng):
+        self.rng = rng
+        self.kinds = ["gtin", "url", "label", "unknown"]
+        self.weights = [args.gtin_fraction, args.url_fraction, args.label_fraction,
+                        max(0.0, 1 - args.gtin_fraction - args.url_fraction - args.label_fraction)]
+        self.popular = [make_code(self.pick_kind(), rng, n) for n in range(args.popular_pool)]
+        self.popular_weights = [1 / (rank + 1) for rank in range(len(self.popular))]
+        self.popular_fraction = args.popular_fraction
+        self.counter = args.popular_pool
+
+    def pick_kind(self):
+        return self.rng.choices(self.kinds, self.weights)[0]
+
+    def next_code(self):
+        if self.popular and self.rng.random() < self.popular_fraction:
+            return self.rng.choices(self.popular, self.popular_weights)[0]
+        self.counter += 1
+        return make_code(self.pick_kind(), self.rng, self.counter)
+
+
+class Stats:
+    """Latencies and outcomes per endpoint for the current stage"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint, latency_ms, status):
+        self.latencies.setdefault(endpoint, []).append(latency_ms)
+        key = str(status)
+        self.statuses.setdefault(endpoint, {}).setdefault(key, 0)
+        self.statuses[endpoint][key] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        report = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            report[endpoint] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "error_rate": round(self.errors.get(endpoint, 0) / len(latencies), 4),
+                "latency_p50_ms": round(percentile(latencies, 0.50), 1),
+                "latency_p95_ms": round(percentile(latencies, 0.95), 1),
+                "latency_p99_ms": round(percentile(latencies, 0.99), 1),
+                "statuses": self.statuses[endpoint],
+            }
+        return {"seconds": round(elapsed, 1), "endpoints": report}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class VirtualDevice:
+    def __init__(self, index, args, session, stats, mix, rng):
+        self.device_id = f"sim-esp32-{index:04d}"
+        has_ai = rng.random() < args.ai_fraction
+        self.device_name = f"Robridge {'AI ' if has_ai else ''}Scanner {index:04d}"
+        self.args = args
+        self.session = session
+        self.stats = stats
+        self.mix = mix
+        self.rng = rng
+        self.recent = []
+
+    async def request(self, endpoint, method, url, payload=None):
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, url, json=payload) as response:
+                await response.read()
+                status = response.status
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except aiohttp.ClientError as e:
+            status = type(e).__name__
+        self.stats.record(endpoint, (time.perf_counter() - started) * 1000, status)
+
+    async def register(self):
+        if self.args.bridge_url:
+            await self.request("bridge register", "POST", f"{self.args.bridge_url}/api/esp32/register", {
+                "deviceId": self.device_id,
+                "deviceName": self.device_name,
+                "ipAddress": "10.0.0.1",
+                "firmwareVersion": "sim-1.0.0",
+            })
+        await self.heartbeat()
+
+    async def heartbeat(self):
+        await self.request("ai ping", "POST", f"{self.args.ai_url}/api/esp32/ping/{self.device_id}")
+
+    async def scan(self, code):
+        payload = {
+            "deviceId": self.device_id,
+            "barcodeData": code,
+            "deviceName": self.device_name,
+            "scanType": "qr" if code.startswith(("http", "{")) or "|" in code else "barcode",
+            "timestamp": int(time.time() * 1000),
+        }
+        requests = [self.request("ai scan", "POST", f"{self.args.ai_url}/api/esp32/scan", payload)]
+        if self.args.bridge_url:
+            requests.append(self.request("bridge scan", "POST",
+                                         f"{self.args.bridge_url}/api/esp32/scan/{self.device_id}", payload))
+        if self.args.barcode_url:
+            requests.append(self.request("barcode lookup", "POST", f"{self.args.barcode_url}/api/lookup_barcode",
+                                         {"barcode": code}))
+        await asyncio.gather(*requests)
+
+    def next_code(self):
+        # Operators often rescan the item they just scanned (failed beep, second carton)
+        if self.recent and self.rng.random() < self.args.repeat_fraction:
+            return self.rng.choice(self.recent)
+        code = self.mix.next_code()
+        self.recent = (self.recent + [code])[-5:]
+        return code
+
+    async def heartbeats(self):
+        while True:
+            await asyncio.sleep(self.args.heartbeat_interval * self.rng.uniform(0.9, 1.1))
+            await self.heartbeat()
+
+    async def run(self):
+        # Stagger start-up so a new stage doesn't arrive as one synchronized wave
+        await asyncio.sleep(self.rng.uniform(0, min(self.args.scan_interval, 5)))
+        await self.register()
+        heartbeat_task = asyncio.create_task(self.heartbeats())
+        try:
+            while True:
+                if self.rng.random() < self.args.burst_probability:
+                    # Pallet burst: several items scanned back to back
+                    for _ in range(self.rng.randint(3, self.args.burst_size)):
+                        await self.scan(self.next_code())
+                        await asyncio.sleep(self.rng.uniform(0.1, 0.4))
+                else:
+                    await self.scan(self.next_code())
+                await asyncio.sleep(self.rng.expovariate(1 / self.args.scan_interval))
+        finally:
+            heartbeat_task.cancel()
+
+
+def print_stage(size, summary):
+    print(f"\n🚚 Fleet of {size} devices ({summary['seconds']}s)")
+    print(f"{'endpoint':>16} {'req/s':>9} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, result in summary["endpoints"].items():
+        print(f"{endpoint:>16} {result['throughput_rps']:>9} {result['error_rate'] * 100:>7.2f}% "
+              f"{result['latency_p50_ms']:>9} {result['latency_p95_ms']:>9} {result['latency_p99_ms']:>9}")
+
+
+async def run_fleet(args):
+    rng = random.Random(args.seed)
+    mix = ScanMix(args, rng)
+    stats = Stats()
+    sizes = [int(size) for size in args.fleet.split(",")]
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=max(sizes) * 3)
+    results = []
+    tasks = []
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        try:
+            for size in sizes:
+                while len(tasks) < size:
+                    device = VirtualDevice(len(tasks) + 1, args, session, stats,
+                                           mix, random.Random(rng.random()))
+                    tasks.append(asyncio.create_task(device.run()))
+                # Let new devices ramp up before measuring the sustained rate
+                await asyncio.sleep(min(args.scan_interval, 5))
+                stats.reset()
+                await asyncio.sleep(args.stage_seconds)
+                summary = stats.summary()
+                summary["devices"] = size
+                results.append(summary)
+                print_stage(size, summary)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of ESP32 scanners against the Robridge services")
+    parser.add_argument("--ai-url", default="http://localhost:8000")
+    parser.add_argument("--barcode-url", default="http://localhost:5000", help="Flask barcode service ('' to skip)")
+    parser.add_argument("--bridge-url", default="", help="Node bridge; devices register and scan through it too")
+    parser.add_argument("--fleet", default="50,100,250,500", help="Comma-separated fleet sizes, one stage each")
+    parser.add_argument("--stage-seconds", type=float, default=60)
+    parser.add_argument("--scan-interval", type=float, default=5, help="Mean seconds between scans per device")
+    parser.add_argument("--heartbeat-interval", type=float, default=30)
+    parser.add_argument("--ai-fraction", type=float, default=0.5, help="Share of devices with 'AI' in their name")
+    parser.add_argument("--gtin-fraction", type=float, default=0.6)
+    parser.add_argument("--url-fraction", type=float, default=0.2)
+    parser.add_argument("--label-fraction", type=float, default=0.15)
+    parser.add_argument("--popular-pool", type=int, default=200, help="Products shared across the fleet")
+    parser.add_argument("--popular-fraction", type=float, default=0.5, help="Share of scans from the popular pool")
+    parser.add_argument("--repeat-fraction", type=float, default=0.1, help="Share of immediate rescans")
+    parser.add_argument("--burst-probability", type=float, default=0.1)
+    parser.add_argument("--burst-size", type=int, default=12)
+    parser.add_argument("--timeout", type=float, default=15, help="Per-request timeout (the bridge uses 15s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write per-stage results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"📡 AI server: {args.ai_url}  barcode service: {args.barcode_url or '-'}  bridge: {args.bridge_url or '-'}")
+    print(f"⏱️ Stages {args.fleet} x {args.stage_seconds:g}s, one scan per device every ~{args.scan_interval:g}s")
+    try:
+        results = asyncio.run(run_fleet(args))
+    except KeyboardInterrupt:
+        return
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "stages": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
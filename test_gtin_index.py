@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped GTIN index: file layout, lookups against the catalog
+it was built from, and remapping after an atomic replace.
+"""
+
+import os
+import struct
+
+import pytest
+
+from gtin_index import FIELDS, FORMAT_VERSION, HEADER, MAGIC, SEPARATOR, GTINIndex, build_index
+from product_catalog import ProductCatalog
+
+
+def import_products(db_path, tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    ProductCatalog(db_path).import_file(str(path))
+
+
+@pytest.fixture
+def built(tmp_path):
+    db_path = str(tmp_path / 'catalog.db')
+    import_products(db_path, tmp_path, 'off.jsonl', [
+        '{"code": "4006381333931", "product_name": "Oat Milk", "brands": "Acme", "categories": "en:dairies"}',
+        '{"code": "96385074", "product_name": "Rye", "image_url": "https://img.example/rye.jpg"}',
+        '{"code": "036000291452", "product_name": "Tissues", "generic_name": "Soft – 3 ply"}',
+    ])
+    index_path = str(tmp_path / 'gtin_index.bin')
+    return db_path, index_path, build_index(db_path, index_path)
+
+
+def test_file_layout(built):
+    _db_path, index_path, result = built
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    assert result == {'records': 3, 'size': len(data), 'seconds': result['seconds']}
+
+    magic, fmt, field_count, count, keys_offset, offsets_offset, blob_offset = HEADER.unpack_from(data)
+    assert (magic, fmt, field_count, count) == (MAGIC, FORMAT_VERSION, len(FIELDS), 3)
+    assert keys_offset == HEADER.size and keys_offset % 8 == 0
+    assert offsets_offset == keys_offset + 3 * 8
+    assert blob_offset == offsets_offset + 4 * 8
+
+    keys = struct.unpack_from('<3Q', data, keys_offset)
+    assert keys == (96385074, 36000291452, 4006381333931)
+    offsets = struct.unpack_from('<4Q', data, offsets_offset)
+    assert offsets[0] == 0 and offsets[-1] == len(data) - blob_offset
+    first = data[blob_offset + offsets[0]:blob_offset + offsets[1]].decode('utf-8')
+    assert first.split(SEPARATOR) == ['Rye', '', '', '', 'https://img.example/rye.jpg']
+
+
+def test_lookup_hits_and_misses(built):
+    _db_path, index_path, _result = built
+    index = GTINIndex(index_path)
+    assert len(index) == 3
+    assert index.lookup('4006381333931') == {
+        'found': True, 'product_name': 'Oat Milk', 'brand': 'Acme', 'category': 'en:dairies',
+        'description': None, 'image_url': None,
+    }
+    assert index.lookup('00000096385074')['product_name'] == 'Rye'
+    assert index.lookup('036000291452')['description'] == 'Soft – 3 ply'
+    # Below the first key, between keys, above the last key and not a GTIN at all
+    for barcode in ('10000000', '4006381333930', '99999999999999', 'abc'):
+        assert index.lookup(barcode) is None
+
+
+def test_deleted_products_are_left_out(built, tmp_path):
+    db_path, index_path, _result = built
+    import_products(db_path, tmp_path, 'delta.jsonl', ['{"code": "96385074", "deleted": 1}'])
+    assert build_index(db_path, index_path)['records'] == 2
+    assert GTINIndex(index_path).lookup('96385074') is None
+
+
+def test_empty_index(tmp_path):
+    db_path = str(tmp_path / 'catalog.db')
+    ProductCatalog(db_path).stats()  # creates the empty schema
+    index_path = str(tmp_path / 'gtin_index.bin')
+    assert build_index(db_path, index_path)['records'] == 0
+    index = GTINIndex(index_path)
+    assert index.available() and len(index) == 0
+    assert index.lookup('4006381333931') is None
+
+
+def test_missing_index_is_unavailable(tmp_path):
+    index = GTINIndex(str(tmp_path / 'missing.bin'))
+    assert not index.available()
+    assert index.lookup('4006381333931') is None
+
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / 'bogus.bin'
+    path.write_bytes(b'\0' * HEADER.size)
+    with pytest.raises(ValueError):
+        GTINIndex(str(path)).available()
+
+
+def test_live_reader_remaps_after_atomic_replace(built, tmp_path):
+    db_path, index_path, _result = built
+    index = GTINIndex(index_path, check_interval=0)
+    assert index.lookup('4006381333931')['product_name'] == 'Oat Milk'
+    inode = os.stat(index_path).st_ino
+
+    import_products(db_path, tmp_path, 'delta.jsonl', [
+        '{"code": "4006381333931", "product_name": "Oat Drink"}',
+        '{"code": "5000112637922", "product_name": "Cola"}',
+    ])
+    build_index(db_path, index_path)
+    assert os.stat(index_path).st_ino != inode
+
+    assert index.lookup('4006381333931')['product_name'] == 'Oat Drink'
+    assert index.lookup('5000112637922')['product_name'] == 'Cola'
+    assert len(index) == 4
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the QR description micro-batcher against a local stub LLM server.
+
+The stub speaks the OpenAI chat completions protocol, so the real OpenAI
+client and server.scan_code are exercised without leaving localhost.
+"""
+
+import asyncio
+import json
+import os
+import re
+
+from aiohttp import web
+from openai import OpenAI
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test-local-stub-llm")
+
+import server
+from server import ScanInput
+
+URLS = [
+    "https://github.com/robridge",
+    "https://www.youtube.com/watch?v=42",
+    "https://example.com/products/7",
+]
+
+
+class StubLLM:
+    """Minimal /v1/chat/completions endpoint that records every prompt."""
+
+    def __init__(self, batch_mode="json"):
+        self.batch_mode = batch_mode
+        self.calls = []
+
+    async def handle(self, request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        self.calls.append(prompt)
+
+        if "Return a JSON array" in prompt:
+            items = re.findall(r"^(\d+)\. (\S+)$", prompt, re.MULTILINE)
+            if self.batch_mode == "json":
+                content = json.dumps([
+                    {"id": int(index), "url": url, "title": f"Stub {index}",
+                     "category": "Website", "description": f"Batched description of {url}."}
+                    for index, url in items
+                ])
+            elif self.batch_mode == "partial":
+                index, url = items[0]
+                content = json.dumps([{"id": int(index), "url": url, "title": "Stub",
+                                       "category": "Website", "description": "Only one."}])
+            else:
+                content = "Sorry, I can't produce JSON today."
+        else:
+            url = re.search(r"contains this link: (\S+)\.", prompt).group(1)
+            content = f"Scanned Code: {url}\nTitle: Single\nCategory: Website\nDescription: Single description."
+
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+
+async def run_scans(batch_mode, urls):
+    """Start the stub, point the server's client at it and fire concurrent /scan calls."""
+    stub = StubLLM(batch_mode)
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    server.scan_cache.clear()
+    server.client = OpenAI(api_key="sk-test", base_url=f"http://127.0.0.1:{port}/v1", max_retries=0)
+    try:
+        results = await asyncio.gather(*(server.scan_code(ScanInput(scanned_value=url)) for url in urls))
+    finally:
+        await runner.cleanup()
+    return stub, [result["result"] for result in results]
+
+
+def test_concurrent_urls_share_one_llm_call():
+    stub, results = asyncio.run(run_scans("json", URLS))
+    assert len(stub.calls) == 1
+    for index, (url, result) in enumerate(zip(URLS, results)):
+        assert result.startswith(f"Scanned Code: {url}\nTitle: Stub {index}\n")
+    print(f"✅ {len(URLS)} URLs answered by {len(stub.calls)} LLM call")
+
+
+def test_duplicate_urls_are_coalesced():
+    stub, results = asyncio.run(run_scans("json", [URLS[0], URLS[0], URLS[1]]))
+    assert len(stub.calls) == 1
+    assert results[0] == results[1]
+    print("✅ Duplicate URLs share one batch slot")
+
+
+def test_unparseable_batch_falls_back_to_single_calls():
+    stub, results = asyncio.run(run_scans("garbage", URLS))
+    assert len(stub.calls) == 1 + len(URLS)
+    assert all("Title: Single" in result for result in results)
+    print("✅ Unparseable batch answer falls back to single calls")
+
+
+def test_partial_batch_only_retries_missing_items():
+    stub, results = asyncio.run(run_scans("partial", URLS))
+    assert len(stub.calls) == 1 + (len(URLS) - 1)
+    assert "Description: Only one." in results[0]
+    assert all("Title: Single" in result for result in results[1:])
+    print("✅ Partial batch answer only retries missing items")
+
+
+if __name__ == "__main__":
+    print("🧪 QR description micro-batching tests")
+    print("=" * 50)
+    test_concurrent_urls_share_one_llm_call()
+    test_duplicate_urls_are_coalesced()
+    test_unparseable_batch_falls_back_to_single_calls()
+    test_partial_batch_only_retries_missing_items()
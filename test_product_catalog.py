@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the streaming product catalog importer: JSONL/CSV/TSV dumps, delete
+deltas and skipping files that were already imported.
+"""
+
+import gzip
+import os
+
+import pytest
+
+from product_catalog import ProductCatalog, normalize_gtin
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ProductCatalog(str(tmp_path / 'catalog.db'))
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('4006381333931', '04006381333931'),
+    (' 96385074 ', '00000096385074'),
+    ('1234567', None),
+    ('400638133393100', None),
+    ('ABC12345', None),
+    (None, None),
+])
+def test_normalize_gtin(code, expected):
+    assert normalize_gtin(code) == expected
+
+
+def test_jsonl_import_and_lookup(catalog, tmp_path):
+    path = write(tmp_path / 'off.jsonl',
+                 '{"code": "4006381333931", "product_name": "Oat Milk", "brands": ["Acme"], "categories": "en:dairies"}\n'
+                 '\n'
+                 'not json\n'
+                 '{"code": "12", "product_name": "Too short"}\n')
+    result = catalog.import_file(path)
+    assert (result['upserted'], result['deleted'], result['invalid']) == (1, 0, 1)
+    assert catalog.lookup('04006381333931') == {
+        'found': True, 'product_name': 'Oat Milk', 'brand': 'Acme', 'category': 'en:dairies',
+        'description': None, 'image_url': None,
+    }
+    assert catalog.lookup('4006381333938') is None
+    assert catalog.lookup('not-a-code') is None
+
+
+@pytest.mark.parametrize('name, text', [
+    ('upc.csv', 'upc,title,brand\n96385074,"Rye, sliced",Bakers\n'),
+    ('upc.tsv', 'ean\tname\tbrand\n96385074\tRye, sliced\tBakers\n'),
+])
+def test_csv_and_tsv_import(catalog, tmp_path, name, text):
+    catalog.import_file(write(tmp_path / name, text))
+    product = catalog.lookup('96385074')
+    assert (product['product_name'], product['brand']) == ('Rye, sliced', 'Bakers')
+
+
+def test_gzipped_dump(catalog, tmp_path):
+    path = tmp_path / 'off.jsonl.gz'
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('{"code": "96385074", "product_name": "Rye"}\n')
+    assert catalog.import_file(str(path))['upserted'] == 1
+
+
+def test_delta_updates_keep_fields_and_delete(catalog, tmp_path):
+    catalog.import_file(write(tmp_path / 'full.jsonl',
+                              '{"code": "4006381333931", "product_name": "Oat Milk", "brands": "Acme"}\n'
+                              '{"code": "96385074", "product_name": "Rye"}\n'))
+    result = catalog.import_file(write(tmp_path / 'delta.jsonl',
+                                       '{"code": "4006381333931", "product_name": "Oat Drink"}\n'
+                                       '{"code": "96385074", "deleted": true}\n'))
+    assert (result['upserted'], result['deleted']) == (1, 1)
+    product = catalog.lookup('4006381333931')
+    assert (product['product_name'], product['brand']) == ('Oat Drink', 'Acme')
+    assert catalog.lookup('96385074') is None
+
+
+def test_unchanged_file_is_skipped(catalog, tmp_path):
+    path = write(tmp_path / 'off.jsonl', '{"code": "96385074", "product_name": "Rye"}\n')
+    assert not catalog.import_file(path)['skipped']
+    assert catalog.import_file(path) == {'file': 'off.jsonl', 'skipped': True, 'rows': 0}
+    assert not catalog.import_file(path, force=True)['skipped']
+
+    write(tmp_path / 'off.jsonl', '{"code": "96385074", "product_name": "Rye bread"}\n')
+    os.utime(path, (1_700_000_000, 1_700_000_000))
+    assert not catalog.import_file(path)['skipped']
+    assert catalog.lookup('96385074')['product_name'] == 'Rye bread'
+    assert catalog.stats()['products'] == 1
@@ -0,0 +1,292 @@
+"""
+Request-scoped tracing for the AI server.
+
+Incoming W3C `traceparent` headers (sent by the Node bridge) are continued,
+otherwise a new trace is started; the sampling decision is taken once per
+trace (parent-based, else TRACE_SAMPLE_RATE) and unsampled requests only
+carry the ids so they can still be propagated. Spans for request parsing,
+classification, provider and LLM calls and response serialization are
+kept in a context variable, so nested spans find their parent across awaits
+and asyncio.to_thread.
+
+Finished spans are exported on a background thread in the OTLP/JSON
+encoding (ExportTraceServiceRequest): appended as one JSON line per batch to
+TRACE_EXPORT_FILE and/or POSTed to OTEL_EXPORTER_OTLP_ENDPOINT/v1/traces.
+Tracing is off unless one of them is set. Tracer.shutdown() drains what is
+still queued, so the last batch is not lost when the server stops.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+
+from service_logging import get_logger
+
+logger = get_logger("tracing")
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SPAN_KINDS = {"INTERNAL": 1, "SERVER": 2, "CLIENT": 3}
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Queued behind the last span by shutdown(); the exporter thread exits when it reaches it
+_STOP = object()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "sampled", "handler_done_ns")
+
+    def __init__(self, trace_id, parent_id, name, kind="INTERNAL", sampled=True, start_ns=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.status = 0
+        self.status_message = None
+        self.sampled = sampled
+        self.handler_done_ns = None
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def fail(self, message):
+        self.status = STATUS_ERROR
+        self.status_message = str(message)[:200]
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPJsonExporter:
+    """Batches finished spans on a background thread and writes OTLP/JSON"""
+
+    def __init__(self, service_name, path=None, endpoint=None, batch_size=256, flush_interval=2.0):
+        self.path = path
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces" if endpoint else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+        self.exported = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=batch_size * 64)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, span):
+        if self._closed:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            span = self._queue.get()
+            if span is _STOP:
+                return
+            batch = [span]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is _STOP:
+                    stopping = True
+                    break
+                batch.append(span)
+            self.export(batch)
+            if stopping:
+                return
+
+    def shutdown(self, timeout=5.0):
+        """Export every span still queued and stop the exporter thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("Trace exporter queue did not drain; unexported spans are lost")
+            return
+        thread.join(timeout)
+
+    def export(self, spans):
+        payload = {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{"scope": {"name": "robridge.tracing"}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+        body = json.dumps(payload, separators=(",", ":"))
+        try:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(body + "\n")
+            if self.endpoint:
+                request = urllib.request.Request(self.endpoint, data=body.encode("utf-8"), method="POST",
+                                                 headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(request, timeout=5).close()
+            self.exported += len(spans)
+        except Exception as e:
+            self.dropped += len(spans)
+            logger.error("Trace export failed for %d spans: %s", len(spans), e, extra={"spans": len(spans)})
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate=0.1):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_env(cls, service_name):
+        path = os.getenv("TRACE_EXPORT_FILE") or None
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or None
+        exporter = OTLPJsonExporter(service_name, path, endpoint) if path or endpoint else None
+        return cls(exporter, sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0.1)))
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+    def current(self):
+        return _current_span.get()
+
+    def start_trace(self, traceparent, name):
+        """Server span for an incoming request; becomes the current span"""
+        match = TRACEPARENT.match((traceparent or "").strip().lower())
+        if match and match.group(1) != "0" * 32:
+            trace_id, parent_id = match.group(1), match.group(2)
+            sampled = int(match.group(3), 16) & 1 == 1
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < self.sample_rate
+        span = Span(trace_id, parent_id, name, "SERVER", sampled)
+        return span, _current_span.set(span)
+
+    def finish_trace(self, span, token):
+        _current_span.reset(token)
+        self._end(span)
+
+    def start_span(self, name, kind="INTERNAL", **attributes):
+        """Child of the current span that does not become current (for client calls); None when unsampled"""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return None
+        span = Span(parent.trace_id, parent.span_id, name, kind)
+        span.attributes.update(attributes)
+        return span
+
+    def end_span(self, span, **attributes):
+        if span is not None:
+            for key, value in attributes.items():
+                span.set(key, value)
+            self._end(span)
+
+    @contextlib.contextmanager
+    def span(self, name, kind="INTERNAL", **attributes):
+        """Child span of the current span for the duration of the block"""
+        span = self.start_span(name, kind, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._end(span)
+
+    def record(self, name, start_ns, end_ns, **attributes):
+        """Span for an interval that has already happened, under the current span"""
+        span = self.start_span(name, **attributes)
+        if span is not None:
+            span.start_ns = start_ns
+            self._end(span, end_ns)
+
+    def headers(self, span=None):
+        """traceparent header for an outgoing call from span (default: the current span)"""
+        span = span or _current_span.get()
+        return {"traceparent": span.traceparent} if span is not None else {}
+
+    def _end(self, span, end_ns=None):
+        span.end_ns = end_ns or time.time_ns()
+        if span.sampled and self.exporter is not None:
+            self.exporter.submit(span)
+
+    def traced_handler(self, function):
+        """
+        Wrap an async endpoint so the time before it runs (body read + pydantic
+        validation) is recorded as parse_request, and its return is marked so the
+        middleware can record serialize_response.
+        """
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            root = _current_span.get()
+            if root is None or not root.sampled:
+                return await function(*args, **kwargs)
+            self.record("parse_request", root.start_ns, time.time_ns())
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                root.handler_done_ns = time.time_ns()
+        return wrapper
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Train the local category classifier offline.
+
+Examples come from the barcodes table, the local product catalog (cached
+lookups), optional JSONL files of {"text", "category", "title"} records and a
+small seed set of well-known QR link domains. Settings are read from the
+"classifier" section of pipeline_config.json; max_classes caps the number of
+categories (the rest are trained as "Other"), which bounds training time and
+model size (see category_classifier).
+
+Usage: python train_category_classifier.py [--config pipeline_config.json] [--examples extra.jsonl ...]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from category_classifier import DEFAULT_MAX_CLASSES, OTHER_CATEGORY, CategoryClassifier, save_model, train
+
+# Well-known QR link destinations, mirroring the domain table in server.esp32_scan
+SEED_URL_EXAMPLES = [
+    ("https://www.google.com/maps/place/warehouse", "Technology Platform", "Google Services"),
+    ("https://drive.google.com/file/d/abc123/view", "Technology Platform", "Google Services"),
+    ("https://docs.google.com/forms/d/e/xyz/viewform", "Technology Platform", "Google Services"),
+    ("https://www.facebook.com/robridgelabs", "Social Media Platform", "Facebook"),
+    ("https://www.instagram.com/p/Cx12ab/", "Social Media Platform", "Instagram"),
+    ("https://twitter.com/robridge/status/1", "Social Media Platform", "Twitter/X"),
+    ("https://x.com/robridge", "Social Media Platform", "Twitter/X"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "Video Streaming Platform", "YouTube"),
+    ("https://youtu.be/dQw4w9WgXcQ", "Video Streaming Platform", "YouTube"),
+    ("https://www.linkedin.com/in/someone", "Professional Network", "LinkedIn"),
+    ("https://www.linkedin.com/company/robridge", "Professional Network", "LinkedIn"),
+    ("https://wa.me/919999999999", "Messaging Platform", "WhatsApp"),
+    ("https://chat.whatsapp.com/invite123", "Messaging Platform", "WhatsApp"),
+    ("https://github.com/robridge/scanner", "Developer Platform", "GitHub"),
+    ("https://gist.github.com/someone/abc", "Developer Platform", "GitHub"),
+    ("https://www.amazon.in/dp/B0EXAMPLE", "E-Commerce Platform", "Amazon"),
+    ("https://www.amazon.com/gp/product/B0EXAMPLE", "E-Commerce Platform", "Amazon"),
+    ("https://me-qr.com/abc123", "QR Code Generator", "QR Code Service"),
+    ("https://www.qr-code-generator.com/a1", "QR Code Generator", "QR Code Service"),
+]
+
+
+def load_barcode_examples(db_path):
+    """(product name, category, title) from the barcodes table"""
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute('''
+            SELECT product_name, barcode_data, category
+            FROM barcodes
+            WHERE category IS NOT NULL AND category NOT IN ('', 'Unknown', 'N/A')
+        ''')
+        examples = []
+        for product_name, barcode_data, category in rows:
+            text = product_name or (barcode_data if barcode_data.startswith(("http://", "https://", "www.")) else None)
+            if text:
+                examples.append((text, category.strip(), product_name or ""))
+        return examples
+    finally:
+        conn.close()
+
+
+def catalog_category(categories):
+    """Most general Open Food Facts style category, e.g. 'en:plant-based-foods,...' -> 'Plant Based Foods'"""
+    first = (categories or "").split(",")[0].strip()
+    if ":" in first:
+        first = first.split(":", 1)[1]
+    return first.replace("-", " ").strip().title() or None
+
+
+def load_catalog_examples(db_path, limit):
+    """(product name + brand, category, title) from cached product lookups in the local catalog"""
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute('''
+            SELECT product_name, brand, category
+            FROM products
+            WHERE product_name IS NOT NULL AND category IS NOT NULL
+            LIMIT ?
+        ''', (limit,))
+        examples = []
+        for product_name, brand, categories in rows:
+            category = catalog_category(categories)
+            if category:
+                examples.append((f"{product_name} {brand or ''}".strip(), category, product_name))
+        return examples
+    finally:
+        conn.close()
+
+
+def load_jsonl_examples(path):
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                examples.append((record["text"], record["category"], record.get("title", "")))
+    return examples
+
+
+def load_examples(settings, extra_files=()):
+    examples = list(SEED_URL_EXAMPLES)
+    examples += load_barcode_examples(settings["barcode_db_path"])
+    examples += load_catalog_examples(settings["catalog_db_path"], settings["max_catalog_examples"])
+    for path in extra_files:
+        examples += load_jsonl_examples(path)
+    return examples
+
+
+def split_examples(examples, test_fraction=0.1):
+    """Deterministic train/test split by text hash"""
+    train_set, test_set = [], []
+    cutoff = int(test_fraction * 1000)
+    for example in examples:
+        (test_set if zlib.crc32(example[0].encode("utf-8")) % 1000 < cutoff else train_set).append(example)
+    return train_set, test_set
+
+
+def load_settings(config_path):
+    with open(config_path, encoding="utf-8") as f:
+        return json.load(f)["classifier"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local category classifier")
+    parser.add_argument("--config", default="pipeline_config.json")
+    parser.add_argument("--examples", nargs="*", default=[], help="Extra JSONL example files")
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    examples = load_examples(settings, args.examples)
+    train_set, test_set = split_examples(examples)
+    print(f"📚 {len(examples)} examples ({len(train_set)} train / {len(test_set)} test)")
+
+    started = time.perf_counter()
+    model = train(train_set, buckets=settings["buckets"], epochs=settings["epochs"],
+                  max_classes=settings.get("max_classes", DEFAULT_MAX_CLASSES))
+    print(f"🧠 Trained {len(model['classes'])} classes in {time.perf_counter() - started:.1f}s")
+
+    save_model(model, settings["model_path"])
+    print(f"💾 Saved model to {settings['model_path']} ({os.path.getsize(settings['model_path']) / 1024:.0f} KB)")
+
+    if test_set:
+        classifier = CategoryClassifier(settings["model_path"], settings["min_confidence"])
+        # Score against the labels the model was trained on: folded and dropped categories are "Other"
+        known = set(model["classes"])
+        holdout = [(text, category if category in known else OTHER_CATEGORY) for text, category, _title in test_set]
+        correct = sum(1 for text, category in holdout if classifier.predict(text)["category"] == category)
+        print(f"✅ Holdout accuracy: {correct / len(holdout):.3f}")
+
+        # What the server actually serves locally; everything else goes to the LLM
+        confident = [(prediction["category"], category) for prediction, category in
+                     ((classifier.predict_confident(text), category) for text, category in holdout)
+                     if prediction is not None]
+        if confident:
+            confident_correct = sum(1 for predicted, category in confident if predicted == category)
+            print(f"🎯 Confident accuracy: {confident_correct / len(confident):.3f} on "
+                  f"{len(confident)}/{len(holdout)} examples ({len(confident) / len(holdout):.1%} served without the LLM)")
+        else:
+            print(f"🎯 No holdout example cleared min_confidence {settings['min_confidence']}")
+
+
+if __name__ == "__main__":
+    main()